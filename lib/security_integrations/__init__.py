@@ -1,13 +1,20 @@
 """
 Security Integrations Package
 Provides clients and utilities for integrating with security tools
+
+Classes are imported on first attribute access (PEP 562) so that importing
+one client does not pull in every vendor SDK.
 """
 
-from .crowdstrike_client import CrowdStrikeClient
-from .microsoft_client import MicrosoftSecurityClient
-from .proofpoint_client import ProofpointClient
-from .ai_agent import IncidentResponseAgent
-from .threat_hunting import ThreatHuntingEngine
+import importlib
+
+_LAZY_IMPORTS = {
+    'CrowdStrikeClient': '.crowdstrike_client',
+    'MicrosoftSecurityClient': '.microsoft_client',
+    'ProofpointClient': '.proofpoint_client',
+    'IncidentResponseAgent': '.ai_agent',
+    'ThreatHuntingEngine': '.threat_hunting',
+}
 
 __all__ = [
     'CrowdStrikeClient',
@@ -18,3 +25,16 @@ __all__ = [
 ]
 
 __version__ = '1.0.0'
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,52 @@
+"""
+In-memory caching helpers
+Bounded LRU caches with per-entry expiry shared by the security clients
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 3600):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Maximum number of entries before LRU eviction
+            ttl_seconds: Age after which an entry is discarded
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on miss or expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries"""
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop a single entry, or every entry when no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
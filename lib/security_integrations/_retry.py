@@ -0,0 +1,70 @@
+"""
+Retry helpers
+Exponential backoff with jitter for throttled or briefly unavailable APIs
+"""
+
+import asyncio
+import functools
+import logging
+import random
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: throttling and transient server-side failures
+_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    """Return the HTTP status carried by an httpx/requests error or a status_code attribute"""
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    return status
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Return the server's Retry-After hint in seconds, if it sent one"""
+    value = getattr(exc, 'retry_after', None)
+    if value is None:
+        headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+        value = headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_on_throttle(max_attempts: int = 3, base: float = 0.5, cap: float = 8.0):
+    """
+    Retry an async call on throttling or transient HTTP errors
+
+    Waits use full jitter over an exponentially growing window, are raised to
+    the server's Retry-After hint when given, and never exceed cap seconds.
+
+    Args:
+        max_attempts: Total attempts, including the first
+        base: Backoff window for the first retry, in seconds
+        cap: Longest single wait, in seconds
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    status = _status_code(e)
+                    if attempt == max_attempts or status not in _RETRY_STATUSES:
+                        raise
+                    delay = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+                    retry_after = _retry_after(e)
+                    if retry_after is not None:
+                        delay = max(delay, min(cap, retry_after))
+                    logger.warning(
+                        f"{func.__qualname__} got HTTP {status}; "
+                        f"retrying in {delay:.1f}s (attempt {attempt}/{max_attempts})"
+                    )
+                    await asyncio.sleep(delay)
+        return wrapper
+    return decorator
@@ -0,0 +1,55 @@
+"""
+Shared Secrets Manager access for the vendor clients
+
+Secret values are held in an in-process cache (aws-secretsmanager-caching),
+so constructing a client after the first one does not make a Secrets Manager
+round trip.
+"""
+
+import functools
+from typing import Dict
+
+import orjson
+
+# Secrets cached per region, and how often a cached value is refreshed
+_SECRET_CACHE_SIZE = 1024
+_SECRET_REFRESH_SECONDS = 3600
+
+
+@functools.lru_cache(maxsize=None)
+def _boto3_session():
+    """Return a boto3 session shared so botocore loads its service models once"""
+    import boto3
+    return boto3.session.Session()
+
+
+@functools.lru_cache(maxsize=4)
+def _sm_client(region_name: str):
+    """Return the process-wide Secrets Manager client for a region"""
+    return _boto3_session().client('secretsmanager', region_name=region_name)
+
+
+@functools.lru_cache(maxsize=None)
+def _secret_cache(region_name: str):
+    """Return the process-wide secret cache for a region"""
+    from aws_secretsmanager_caching import SecretCache, SecretCacheConfig
+
+    config = SecretCacheConfig(
+        max_cache_size=_SECRET_CACHE_SIZE,
+        secret_refresh_interval=_SECRET_REFRESH_SECONDS
+    )
+    return SecretCache(config=config, client=_sm_client(region_name))
+
+
+def get_secret_json(secret_id: str, region_name: str) -> Dict:
+    """
+    Get a JSON secret from Secrets Manager through the shared cache
+
+    Args:
+        secret_id: Secret name or ARN
+        region_name: AWS region holding the secret
+
+    Returns:
+        Parsed secret dictionary
+    """
+    return orjson.loads(_secret_cache(region_name).get_secret_string(secret_id))
@@ -1 +1,646 @@
-"""\nIncident Response AI Agent\nLeverages Perplexity AI for intelligent incident analysis and response\n"""\n\nimport json\nimport logging\nfrom datetime import datetime\nfrom typing import Any, Dict, List, Optional\n\nimport requests\n\nfrom .crowdstrike_client import CrowdStrikeClient\nfrom .microsoft_client import MicrosoftSecurityClient\nfrom .proofpoint_client import ProofpointClient\n\nlogger = logging.getLogger(__name__)\n\n\nclass IncidentResponseAgent:\n    """AI-powered incident response agent using Perplexity AI"""\n\n    def __init__(\n        self,\n        crowdstrike: CrowdStrikeClient,\n        microsoft: MicrosoftSecurityClient,\n        proofpoint: ProofpointClient,\n        perplexity_api_key: str\n    ):\n        """\n        Initialize incident response agent\n\n        Args:\n            crowdstrike: CrowdStrike client instance\n            microsoft: Microsoft Security client instance\n            proofpoint: Proofpoint client instance\n            perplexity_api_key: Perplexity API key for AI capabilities\n        """\n        self.crowdstrike = crowdstrike\n        self.microsoft = microsoft\n        self.proofpoint = proofpoint\n        self.perplexity_api_key = perplexity_api_key\n        self.api_url = "https://api.perplexity.ai/chat/completions"\n\n    def _call_perplexity_api(self, prompt: str, max_tokens: int = 4000) -> str:\n        """\n        Call Perplexity API with the given prompt\n        \n        Args:\n            prompt: The prompt to send to Perplexity\n            max_tokens: Maximum tokens in response\n            \n        Returns:\n            Response text from Perplexity\n        """\n        try:\n            response = requests.post(\n                self.api_url,\n                headers={\n                    "Authorization": f"Bearer {self.perplexity_api_key}",\n                    "Content-Type": "application/json"\n                },\n                json={\n                    "model": "sonar-pro",\n                    "messages": [{"role": "user", "content": prompt}],\n                    "max_tokens": max_tokens\n                },\n                timeout=60\n            )\n            response.raise_for_status()\n            return response.json()["choices"][0]["message"]["content"]\n        except requests.exceptions.RequestException as e:\n            logger.error(f"Error calling Perplexity API: {e}")\n            raise\n\n    def aggregate_incidents(\n        self,\n        cs_detections: Dict,\n        cs_incidents: Dict,\n        ms_alerts: Dict,\n        pp_events: Dict\n    ) -> List[Dict]:\n        """\n        Aggregate incidents from all security platforms\n\n        Returns:\n            List of normalized incident dictionaries\n        """\n        incidents = []\n\n        # Add CrowdStrike detections\n        for detection in cs_detections.get('detections', []):\n            incidents.append({\n                'id': detection.get('detection_id'),\n                'title': detection.get('behaviors', [{}])[0].get('scenario', 'Unknown'),\n                'description': detection.get('behaviors', [{}])[0].get('description', ''),\n                'severity': detection.get('max_severity_displayname', 'Unknown'),\n                'source': 'CrowdStrike',\n                'timestamp': detection.get('first_behavior'),\n                'raw_data': detection\n            })\n\n        # Add CrowdStrike incidents\n        for incident in cs_incidents.get('incidents', []):\n            incidents.append({\n                'id': incident.get('incident_id'),\n                'title': incident.get('name', 'Unnamed Incident'),\n                'description': incident.get('description', ''),\n                'severity': incident.get('state', 'Unknown'),\n                'source': 'CrowdStrike',\n                'timestamp': incident.get('start'),\n                'raw_data': incident\n            })\n\n        # Add Microsoft Defender alerts\n        for alert in ms_alerts.get('alerts', []):\n            incidents.append({\n                'id': alert.get('id'),\n                'title': alert.get('title', 'Unknown Alert'),\n                'description': alert.get('description', ''),\n                'severity': alert.get('severity', 'Unknown'),\n                'source': 'Microsoft Defender',\n                'timestamp': alert.get('created_datetime'),\n                'raw_data': alert\n            })\n\n        # Add Proofpoint events (high-value threats only)\n        for msg in pp_events.get('messages_blocked', []):\n            if msg.get('threatType') in ['url', 'attachment']:\n                incidents.append({\n                    'id': msg.get('GUID'),\n                    'title': f"Malicious Email Blocked: {msg.get('threatType')}",\n                    'description': msg.get('subject', ''),\n                    'severity': 'High',\n                    'source': 'Proofpoint',\n                    'timestamp': msg.get('messageTime'),\n                    'raw_data': msg\n                })\n\n        return incidents\n\n    async def analyze_incidents(self, incidents: List[Dict]) -> Dict:\n        """\n        Use AI to analyze and prioritize incidents\n\n        Args:\n            incidents: List of incident dictionaries\n\n        Returns:\n            Dictionary with prioritized incidents and analysis\n        """\n        # Prepare data for AI analysis\n        incident_summary = self._prepare_incident_summary(incidents)\n\n        # Create AI prompt\n        prompt = f"""You are a security analyst reviewing recent security incidents. Analyze the following incidents and:\n\n1. Prioritize them as High, Medium, or Low based on severity, potential impact, and risk\n2. Identify potential attack campaigns or related incidents\n3. Provide AI risk scores (0-100) for each high-priority incident\n4. Recommend specific actions for each high-priority incident\n5. Explain your reasoning\n\nIncidents to analyze:\n{json.dumps(incident_summary, indent=2)}\n\nProvide your analysis in JSON format with the following structure:\n{{\n    "high_priority": [\n        {{\n            "id": "incident_id",\n            "title": "incident_title",\n            "source": "source_platform",\n            "severity": "severity",\n            "ai_risk_score": 85,\n            "recommended_actions": ["action1", "action2"],\n            "ai_reasoning": "explanation"\n        }}\n    ],\n    "medium_priority": [...],\n    "low_priority": [...],\n    "campaigns": [\n        {{\n            "name": "Campaign name",\n            "related_incidents": ["id1", "id2"],\n            "description": "Campaign description"\n        }}\n    ]\n}}"""\n\n        try:\n            # Call Perplexity API\n            analysis_text = self._call_perplexity_api(prompt, max_tokens=4000)\n            \n            # Extract JSON from response\n            json_start = analysis_text.find('{')\n            json_end = analysis_text.rfind('}') + 1\n            analysis = json.loads(analysis_text[json_start:json_end])\n\n            return analysis\n\n        except Exception as e:\n            logger.error(f"Error in AI analysis: {e}")\n            # Return basic prioritization if AI fails\n            return self._basic_prioritization(incidents)\n\n    def _prepare_incident_summary(self, incidents: List[Dict]) -> List[Dict]:\n        """Prepare incident data for AI analysis"""\n        summary = []\n        for inc in incidents[:50]:  # Limit to avoid token limits\n            summary.append({\n                'id': inc.get('id'),\n                'title': inc.get('title'),\n                'description': inc.get('description', '')[:200],  # Truncate long descriptions\n                'severity': inc.get('severity'),\n                'source': inc.get('source'),\n                'timestamp': inc.get('timestamp')\n            })\n        return summary\n\n    def _basic_prioritization(self, incidents: List[Dict]) -> Dict:\n        """Basic prioritization if AI is unavailable"""\n        high_severity = ['Critical', 'High', 'critical', 'high']\n        medium_severity = ['Medium', 'medium']\n\n        return {\n            'high_priority': [inc for inc in incidents if inc.get('severity') in high_severity],\n            'medium_priority': [inc for inc in incidents if inc.get('severity') in medium_severity],\n            'low_priority': [inc for inc in incidents if inc.get('severity') not in high_severity + medium_severity],\n            'campaigns': []\n        }\n\n    async def investigate_incident(\n        self,\n        incident: Dict,\n        include_timeline: bool = True,\n        include_related_events: bool = True,\n        include_threat_intel: bool = True\n    ) -> Dict:\n        """\n        Perform deep investigation of an incident\n\n        Args:\n            incident: Incident dictionary\n            include_timeline: Build event timeline\n            include_related_events: Find related events\n            include_threat_intel: Lookup threat intelligence\n\n        Returns:\n            Investigation results dictionary\n        """\n        investigation = {\n            'incident_id': incident.get('id'),\n            'timeline': [],\n            'related_events': [],\n            'threat_intel': {},\n            'affected_assets': {},\n            'ai_summary': ''\n        }\n\n        # Build timeline\n        if include_timeline:\n            investigation['timeline'] = await self._build_timeline(incident)\n\n        # Find related events\n        if include_related_events:\n            investigation['related_events'] = await self._find_related_events(incident)\n\n        # Get threat intelligence\n        if include_threat_intel:\n            investigation['threat_intel'] = await self._get_threat_intelligence(incident)\n\n        # Get affected assets\n        investigation['affected_assets'] = self._extract_affected_assets(incident)\n\n        # Generate AI summary\n        investigation['ai_summary'] = await self._generate_investigation_summary(investigation)\n\n        return investigation\n\n    async def _build_timeline(self, incident: Dict) -> List[Dict]:\n        """Build event timeline for incident"""\n        timeline = []\n        # Add initial incident\n        timeline.append({\n            'timestamp': incident.get('timestamp'),\n            'description': f"Incident detected: {incident.get('title')}",\n            'source': incident.get('source'),\n            'indicators': []\n        })\n        return timeline\n\n    async def _find_related_events(self, incident: Dict) -> List[Dict]:\n        """Find events related to the incident"""\n        related = []\n        # Implementation would query all sources for related events\n        return related\n\n    async def _get_threat_intelligence(self, incident: Dict) -> Dict:\n        """Get threat intelligence for incident indicators"""\n        threat_intel = {\n            'actor': 'Unknown',\n            'ttps': [],\n            'malware_family': 'Unknown'\n        }\n        # Implementation would query threat intel sources\n        return threat_intel\n\n    def _extract_affected_assets(self, incident: Dict) -> Dict:\n        """Extract affected hosts and users from incident"""\n        return {\n            'hosts': [],\n            'users': []\n        }\n\n    async def _generate_investigation_summary(self, investigation: Dict) -> str:\n        """Generate AI summary of investigation"""\n        prompt = f"""Summarize this security incident investigation in 2-3 paragraphs:\n\n{json.dumps(investigation, indent=2, default=str)}\n\nFocus on:\n1. What happened\n2. Potential impact\n3. Key findings\n4. Recommended next steps"""\n\n        try:\n            return self._call_perplexity_api(prompt, max_tokens=1000)\n        except Exception as e:\n            logger.error(f"Error generating summary: {e}")\n            return "Investigation summary unavailable."\n\n    def generate_response_plan(\n        self,\n        incident: Dict,\n        investigation: Dict,\n        playbook: Dict\n    ) -> Dict:\n        """Generate automated response plan"""\n        return {\n            'containment': [\n                {\n                    'description': 'Isolate affected hosts',\n                    'impact': 'High - will disconnect hosts from network',\n                    'risk_level': 'Medium',\n                    'can_automate': False\n                }\n            ],\n            'eradication': [],\n            'recovery': []\n        }\n\n    async def execute_response_actions(\n        self,\n        actions: List[Dict],\n        auto_approve_safe_actions: bool = False\n    ) -> List[Dict]:\n        """Execute response actions"""\n        results = []\n        for action in actions:\n            if action.get('can_automate') or auto_approve_safe_actions:\n                results.append({\n                    'action': action['description'],\n                    'success': True,\n                    'message': 'Action completed successfully (simulated)'\n                })\n            else:\n                results.append({\n                    'action': action['description'],\n                    'success': False,\n                    'message': 'Action requires manual approval'\n                })\n        return results\n\n    def generate_incident_report(\n        self,\n        incident: Dict,\n        investigation: Dict,\n        response_actions: List[Dict],\n        include_executive_summary: bool = True,\n        include_technical_details: bool = True,\n        include_recommendations: bool = True\n    ) -> Dict:\n        """Generate comprehensive incident report"""\n        report_content = f"""# Incident Response Report\n\n## Incident Information\n- **ID**: {incident.get('id')}\n- **Title**: {incident.get('title')}\n- **Severity**: {incident.get('severity')}\n- **Source**: {incident.get('source')}\n- **Timestamp**: {incident.get('timestamp')}\n\n## Investigation Summary\n{investigation.get('ai_summary', 'No summary available')}\n\n## Response Actions Taken\n"""\n        for action in response_actions:\n            status = "✓" if action.get('success') else "✗"\n            report_content += f"- {status} {action.get('action')}: {action.get('message')}\\n"\n\n        report_content += "\\n## Recommendations\\n"\n        report_content += "- Review and update security policies\\n"\n        report_content += "- Conduct security awareness training\\n"\n        report_content += "- Monitor for similar indicators\\n"\n\n        return {\n            'incident_id': incident.get('id'),\n            'content': report_content\n        }\n
\ No newline at end of file
+"""
+Incident Response AI Agent
+Leverages Perplexity AI for intelligent incident analysis and response
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime
+from itertools import chain
+from typing import Any, Dict, List, Optional
+
+import orjson
+import requests
+
+from ._cache import TTLCache
+from .crowdstrike_client import CrowdStrikeClient
+from .microsoft_client import MicrosoftSecurityClient
+from .proofpoint_client import ProofpointClient
+
+logger = logging.getLogger(__name__)
+
+# Static prompt text is sent as a system message so the prefix of every request
+# is byte-identical and can be reused by the provider's prompt cache; only the
+# incident data in the user message changes between calls.
+_ANALYST_INSTRUCTIONS = """You are a security analyst reviewing recent security incidents. Analyze the incidents provided by the user and:
+
+1. Prioritize them as High, Medium, or Low based on severity, potential impact, and risk
+2. Identify potential attack campaigns or related incidents
+3. Provide AI risk scores (0-100) for each high-priority incident
+4. Recommend specific actions for each high-priority incident
+5. Explain your reasoning"""
+
+_ANALYSIS_SCHEMA = """Provide your analysis in JSON format with the following structure:
+{
+    "high_priority": [
+        {
+            "id": "incident_id",
+            "title": "incident_title",
+            "source": "source_platform",
+            "severity": "severity",
+            "ai_risk_score": 85,
+            "recommended_actions": ["action1", "action2"],
+            "ai_reasoning": "explanation"
+        }
+    ],
+    "medium_priority": [...],
+    "low_priority": [...],
+    "campaigns": [
+        {
+            "name": "Campaign name",
+            "related_incidents": ["id1", "id2"],
+            "description": "Campaign description"
+        }
+    ]
+}"""
+
+# Bucket index per severity for _basic_prioritization; anything else is low (2)
+_SEVERITY_BUCKETS = {
+    'Critical': 0, 'critical': 0,
+    'High': 0, 'high': 0,
+    'Medium': 1, 'medium': 1,
+}
+
+# ai_risk_score given to incidents in each _basic_prioritization bucket, so
+# they carry the same fields as model-prioritised ones
+_BASIC_RISK_SCORES = (80, 50, 20)
+
+# Incident summaries sent to the model are capped to keep prompts bounded
+_MAX_SUMMARY_INCIDENTS = 50
+_DESCRIPTION_MAX_CHARS = 200
+
+# Batches this small (including empty ones) are prioritised by severity alone
+_LLM_SKIP_THRESHOLD = 3
+
+# Proofpoint threat types worth raising as incidents
+_HIGH_VALUE_THREAT_TYPES = frozenset(('url', 'attachment'))
+
+_ANALYSIS_SYSTEM_PROMPT = f"{_ANALYST_INSTRUCTIONS}\n\n{_ANALYSIS_SCHEMA}"
+
+_ANALYSIS_PROMPT_PREFIX = "Incidents to analyze:\n"
+
+_SUMMARY_SYSTEM_PROMPT = """Summarize the security incident investigation provided by the user in 2-3 paragraphs.
+
+Focus on:
+1. What happened
+2. Potential impact
+3. Key findings
+4. Recommended next steps"""
+
+_PERPLEXITY_MODEL = "sonar-pro"
+
+# Patterns for _extract_affected_assets, applied to compact orjson output
+_HOSTNAME_FIELD_RE = re.compile(
+    rb'"(?:hostname|host_name|device_name|computer_name|deviceDnsName|hostName)":"([^"\\]+)"'
+)
+_IPV4_RE = re.compile(
+    rb'(?<![\d.])(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)(?![\d.])'
+)
+_UPN_RE = re.compile(rb'[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}')
+
+# Connections kept alive to the Perplexity API, shared by every agent instance
+_HTTP_POOL_SIZE = 32
+
+
+@functools.lru_cache(maxsize=None)
+def _perplexity_session() -> requests.Session:
+    """Return the process-wide keep-alive session for Perplexity API calls"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=_HTTP_POOL_SIZE
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+# Largest model response (from the first '{') that analyze_incidents will parse
+_MAX_RESPONSE_CHARS = 512 * 1024
+
+_json_decoder = json.JSONDecoder()
+
+
+def _decode_json_object(text: str) -> Dict:
+    """Decode the JSON object embedded in a model response in a single pass"""
+    start = text.find('{')
+    if start < 0:
+        raise ValueError("No JSON object found in response")
+    if len(text) - start > _MAX_RESPONSE_CHARS:
+        raise ValueError(f"Response exceeds {_MAX_RESPONSE_CHARS} characters")
+
+    obj, _ = _json_decoder.raw_decode(text, start)
+    return obj
+
+
+class AnalysisCache(TTLCache):
+    """Bounded LRU cache of AI responses keyed by a fingerprint of the prompt data"""
+
+    @staticmethod
+    def fingerprint(payload: Any) -> str:
+        """Return a SHA-256 fingerprint of a JSON-serializable payload"""
+        data = orjson.dumps(
+            payload,
+            default=str,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        )
+        return hashlib.sha256(data).hexdigest()
+
+
+class IncidentResponseAgent:
+    """AI-powered incident response agent using Perplexity AI"""
+
+    def __init__(
+        self,
+        crowdstrike: CrowdStrikeClient,
+        microsoft: MicrosoftSecurityClient,
+        proofpoint: ProofpointClient,
+        perplexity_api_key: str
+    ):
+        """
+        Initialize incident response agent
+
+        Args:
+            crowdstrike: CrowdStrike client instance
+            microsoft: Microsoft Security client instance
+            proofpoint: Proofpoint client instance
+            perplexity_api_key: Perplexity API key for AI capabilities
+        """
+        self.crowdstrike = crowdstrike
+        self.microsoft = microsoft
+        self.proofpoint = proofpoint
+        self.perplexity_api_key = perplexity_api_key
+        self.api_url = "https://api.perplexity.ai/chat/completions"
+        self._headers = {
+            "Authorization": f"Bearer {perplexity_api_key}",
+            "Content-Type": "application/json"
+        }
+        self.analysis_cache = AnalysisCache()
+
+    def _call_perplexity_api(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        system_prompt: Optional[str] = None
+    ) -> str:
+        """
+        Call Perplexity API with the given prompt
+        
+        Args:
+            prompt: The prompt to send to Perplexity
+            max_tokens: Maximum tokens in response
+            system_prompt: Static instructions sent ahead of the prompt
+            
+        Returns:
+            Response text from Perplexity
+        """
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+
+        try:
+            response = _perplexity_session().post(
+                self.api_url,
+                headers=self._headers,
+                data=orjson.dumps({
+                    "model": _PERPLEXITY_MODEL,
+                    "messages": messages,
+                    "max_tokens": max_tokens
+                }),
+                timeout=60
+            )
+            response.raise_for_status()
+            body = response.json()
+            usage = body.get("usage") or {}
+            logger.debug(
+                f"Perplexity usage: prompt_tokens={usage.get('prompt_tokens')}, "
+                f"completion_tokens={usage.get('completion_tokens')}"
+            )
+            return body["choices"][0]["message"]["content"]
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error calling Perplexity API: {e}")
+            raise
+
+    def aggregate_incidents(
+        self,
+        cs_detections: Dict,
+        cs_incidents: Dict,
+        ms_alerts: Dict,
+        pp_events: Dict
+    ) -> List[Dict]:
+        """
+        Aggregate incidents from all security platforms
+
+        Returns:
+            List of normalized incident dictionaries
+        """
+        incidents = []
+        append = incidents.append
+
+        # Add CrowdStrike detections
+        for detection in cs_detections.get('detections', ()):
+            g = detection.get
+            behavior = (g('behaviors') or ({},))[0]
+            append({
+                'id': g('detection_id'),
+                'title': behavior.get('scenario', 'Unknown'),
+                'description': behavior.get('description', ''),
+                'severity': g('max_severity_displayname', 'Unknown'),
+                'source': 'CrowdStrike',
+                'timestamp': g('first_behavior'),
+                'raw_data': detection
+            })
+
+        # Add CrowdStrike incidents
+        for incident in cs_incidents.get('incidents', ()):
+            g = incident.get
+            append({
+                'id': g('incident_id'),
+                'title': g('name', 'Unnamed Incident'),
+                'description': g('description', ''),
+                'severity': g('state', 'Unknown'),
+                'source': 'CrowdStrike',
+                'timestamp': g('start'),
+                'raw_data': incident
+            })
+
+        # Add Microsoft Defender alerts
+        for alert in ms_alerts.get('alerts', ()):
+            g = alert.get
+            append({
+                'id': g('id'),
+                'title': g('title', 'Unknown Alert'),
+                'description': g('description', ''),
+                'severity': g('severity', 'Unknown'),
+                'source': 'Microsoft Defender',
+                'timestamp': g('created_datetime'),
+                'raw_data': alert
+            })
+
+        # Add Proofpoint events (high-value threats only)
+        for msg in pp_events.get('messages_blocked', ()):
+            g = msg.get
+            threat_type = g('threatType')
+            if threat_type in _HIGH_VALUE_THREAT_TYPES:
+                append({
+                    'id': g('GUID'),
+                    'title': f"Malicious Email Blocked: {threat_type}",
+                    'description': g('subject', ''),
+                    'severity': 'High',
+                    'source': 'Proofpoint',
+                    'timestamp': g('messageTime'),
+                    'raw_data': msg
+                })
+
+        return incidents
+
+    async def analyze_incidents(self, incidents: List[Dict]) -> Dict:
+        """
+        Use AI to analyze and prioritize incidents
+
+        Args:
+            incidents: List of incident dictionaries
+
+        Returns:
+            Dictionary with prioritized incidents and analysis
+        """
+        # Nothing (or too little) to be worth a billed model call
+        if len(incidents) <= _LLM_SKIP_THRESHOLD:
+            return self._basic_prioritization(incidents)
+
+        # Prepare data for AI analysis
+        incident_summary = self._prepare_incident_summary(incidents)
+
+        prompt = _ANALYSIS_PROMPT_PREFIX + orjson.dumps(incident_summary).decode()
+
+        cache_key = self.analysis_cache.fingerprint(('analysis', incident_summary))
+
+        try:
+            analysis_text = self.analysis_cache.get(cache_key)
+            if analysis_text is None:
+                # Call Perplexity API
+                analysis_text = await asyncio.to_thread(
+                    self._call_perplexity_api,
+                    prompt,
+                    max_tokens=4000,
+                    system_prompt=_ANALYSIS_SYSTEM_PROMPT
+                )
+            else:
+                logger.info("Reusing cached incident analysis")
+
+            # Extract JSON from response
+            analysis = _decode_json_object(analysis_text)
+
+            self.analysis_cache.set(cache_key, analysis_text)
+            return analysis
+
+        except Exception as e:
+            logger.error(f"Error in AI analysis: {e}")
+            # Return basic prioritization if AI fails
+            return self._basic_prioritization(incidents)
+
+    def _prepare_incident_summary(self, incidents: List[Dict]) -> List[Dict]:
+        """Prepare incident data for AI analysis"""
+        trunc = _DESCRIPTION_MAX_CHARS
+        summary = []
+        for inc in incidents[:_MAX_SUMMARY_INCIDENTS]:  # Limit to avoid token limits
+            g = inc.get
+            summary.append({
+                'id': g('id'),
+                'title': g('title'),
+                'description': (g('description') or '')[:trunc],
+                'severity': g('severity'),
+                'source': g('source'),
+                'timestamp': g('timestamp')
+            })
+        return summary
+
+    def _basic_prioritization(self, incidents: List[Dict]) -> Dict:
+        """Basic prioritization if AI is unavailable"""
+        high, medium, low = [], [], []
+        buckets = (high, medium, low)
+        for inc in incidents:
+            bucket = _SEVERITY_BUCKETS.get(inc.get('severity'), 2)
+            buckets[bucket].append({
+                **inc,
+                'ai_risk_score': _BASIC_RISK_SCORES[bucket],
+                'recommended_actions': [],
+                'ai_reasoning': f"Prioritized by {inc.get('severity', 'unknown')} severity; AI analysis not run"
+            })
+
+        return {
+            'high_priority': high,
+            'medium_priority': medium,
+            'low_priority': low,
+            'campaigns': []
+        }
+
+    async def investigate_incident(
+        self,
+        incident: Dict,
+        include_timeline: bool = True,
+        include_related_events: bool = True,
+        include_threat_intel: bool = True,
+        related_events: Optional[List[Dict]] = None
+    ) -> Dict:
+        """
+        Perform deep investigation of an incident
+
+        Args:
+            incident: Incident dictionary
+            include_timeline: Build event timeline
+            include_related_events: Find related events
+            include_threat_intel: Lookup threat intelligence
+            related_events: Related events already fetched by batch_investigate;
+                skips the per-incident lookup when given
+
+        Returns:
+            Investigation results dictionary
+        """
+        investigation = {
+            'incident_id': incident.get('id'),
+            'timeline': [],
+            'related_events': [],
+            'threat_intel': {},
+            'affected_assets': {},
+            'ai_summary': ''
+        }
+
+        lookups = {}
+        if include_timeline:
+            lookups['timeline'] = self._build_timeline(incident)
+        if related_events is not None:
+            investigation['related_events'] = related_events
+        elif include_related_events:
+            lookups['related_events'] = self._find_related_events(incident)
+        if include_threat_intel:
+            lookups['threat_intel'] = self._get_threat_intelligence(incident)
+
+        # The lookups are independent, so run them concurrently; one failing
+        # source leaves its default in place rather than aborting the investigation
+        results = await asyncio.gather(*lookups.values(), return_exceptions=True)
+        for key, result in zip(lookups, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error collecting {key} for incident {incident.get('id')}: {result}")
+            else:
+                investigation[key] = result
+
+        # Get affected assets
+        investigation['affected_assets'] = self._extract_affected_assets(incident)
+
+        # Generate AI summary
+        investigation['ai_summary'] = await self._generate_investigation_summary(investigation)
+
+        return investigation
+
+    async def batch_investigate(
+        self,
+        incidents: List[Dict],
+        include_timeline: bool = True,
+        include_threat_intel: bool = True
+    ) -> List[Dict]:
+        """
+        Investigate many incidents, fetching related events in bulk
+
+        Related events are queried once per source for all hosts involved,
+        rather than once per incident, and joined back by host.
+
+        Args:
+            incidents: Incident dictionaries from aggregate_incidents
+            include_timeline: Build event timelines
+            include_threat_intel: Lookup threat intelligence
+
+        Returns:
+            Investigation results, in the same order as incidents
+        """
+        related = await self._find_related_events_bulk(incidents)
+        return await asyncio.gather(*(
+            self.investigate_incident(
+                incident,
+                include_timeline=include_timeline,
+                include_threat_intel=include_threat_intel,
+                related_events=related_events
+            )
+            for incident, related_events in zip(incidents, related)
+        ))
+
+    async def _find_related_events_bulk(self, incidents: List[Dict]) -> List[List[Dict]]:
+        """Find related events for each incident with one query per source"""
+        # source -> hostname -> indexes of incidents that touched that host
+        hosts_by_source = defaultdict(lambda: defaultdict(list))
+        for index, incident in enumerate(incidents):
+            for host in self._extract_affected_assets(incident)['hosts']:
+                if not _IPV4_RE.fullmatch(host.encode()):
+                    hosts_by_source[incident.get('source')][host].append(index)
+
+        related = [{} for _ in incidents]
+
+        # Only CrowdStrike exposes a host-scoped event query today
+        cs_hosts = hosts_by_source.get('CrowdStrike')
+        if cs_hosts:
+            result = await self.crowdstrike.get_detections_for_hosts(list(cs_hosts))
+            if 'error' in result:
+                logger.error(f"Error finding related CrowdStrike events: {result['error']}")
+            for detection in result.get('detections', []):
+                detection_id = detection.get('detection_id')
+                hostname = (detection.get('device') or {}).get('hostname')
+                for index in cs_hosts.get(hostname, ()):
+                    if detection_id != incidents[index].get('id'):
+                        related[index][detection_id] = detection
+
+        return [list(events.values()) for events in related]
+
+    async def _build_timeline(self, incident: Dict) -> List[Dict]:
+        """Build event timeline for incident"""
+        timeline = []
+        # Add initial incident
+        timeline.append({
+            'timestamp': incident.get('timestamp'),
+            'description': f"Incident detected: {incident.get('title')}",
+            'source': incident.get('source'),
+            'indicators': []
+        })
+        return timeline
+
+    async def _find_related_events(self, incident: Dict) -> List[Dict]:
+        """Find events related to the incident"""
+        related = []
+        # Implementation would query all sources for related events
+        return related
+
+    async def _get_threat_intelligence(self, incident: Dict) -> Dict:
+        """Get threat intelligence for incident indicators"""
+        threat_intel = {
+            'actor': 'Unknown',
+            'ttps': [],
+            'malware_family': 'Unknown'
+        }
+        # Implementation would query threat intel sources
+        return threat_intel
+
+    def _extract_affected_assets(self, incident: Dict) -> Dict:
+        """Extract affected hosts and users from incident"""
+        # One compiled-regex scan over the serialized raw data instead of a
+        # recursive walk of every vendor's nested schema
+        blob = orjson.dumps(
+            incident.get('raw_data') or {},
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS
+        )
+        hosts = chain(_HOSTNAME_FIELD_RE.findall(blob), _IPV4_RE.findall(blob))
+        users = _UPN_RE.findall(blob)
+        return {
+            'hosts': [h.decode() for h in dict.fromkeys(hosts)],
+            'users': [u.decode() for u in dict.fromkeys(users)]
+        }
+
+    async def _generate_investigation_summary(self, investigation: Dict) -> str:
+        """Generate AI summary of investigation"""
+        prompt = orjson.dumps(
+            investigation,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+
+        cache_key = self.analysis_cache.fingerprint(('summary', prompt))
+        cached = self.analysis_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            summary = await asyncio.to_thread(
+                self._call_perplexity_api,
+                prompt,
+                max_tokens=1000,
+                system_prompt=_SUMMARY_SYSTEM_PROMPT
+            )
+            self.analysis_cache.set(cache_key, summary)
+            return summary
+        except Exception as e:
+            logger.error(f"Error generating summary: {e}")
+            return "Investigation summary unavailable."
+
+    def generate_response_plan(
+        self,
+        incident: Dict,
+        investigation: Dict,
+        playbook: Dict
+    ) -> Dict:
+        """Generate automated response plan"""
+        return {
+            'containment': [
+                {
+                    'description': 'Isolate affected hosts',
+                    'impact': 'High - will disconnect hosts from network',
+                    'risk_level': 'Medium',
+                    'can_automate': False
+                }
+            ],
+            'eradication': [],
+            'recovery': []
+        }
+
+    async def execute_response_actions(
+        self,
+        actions: List[Dict],
+        auto_approve_safe_actions: bool = False
+    ) -> List[Dict]:
+        """Execute response actions"""
+        results = []
+        for action in actions:
+            if action.get('can_automate') or auto_approve_safe_actions:
+                results.append({
+                    'action': action['description'],
+                    'success': True,
+                    'message': 'Action completed successfully (simulated)'
+                })
+            else:
+                results.append({
+                    'action': action['description'],
+                    'success': False,
+                    'message': 'Action requires manual approval'
+                })
+        return results
+
+    def generate_incident_report(
+        self,
+        incident: Dict,
+        investigation: Dict,
+        response_actions: List[Dict],
+        include_executive_summary: bool = True,
+        include_technical_details: bool = True,
+        include_recommendations: bool = True
+    ) -> Dict:
+        """Generate comprehensive incident report"""
+        report_content = f"""# Incident Response Report
+
+## Incident Information
+- **ID**: {incident.get('id')}
+- **Title**: {incident.get('title')}
+- **Severity**: {incident.get('severity')}
+- **Source**: {incident.get('source')}
+- **Timestamp**: {incident.get('timestamp')}
+
+## Investigation Summary
+{investigation.get('ai_summary', 'No summary available')}
+
+## Response Actions Taken
+"""
+        for action in response_actions:
+            status = "✓" if action.get('success') else "✗"
+            report_content += f"- {status} {action.get('action')}: {action.get('message')}\n"
+
+        report_content += "\n## Recommendations\n"
+        report_content += "- Review and update security policies\n"
+        report_content += "- Conduct security awareness training\n"
+        report_content += "- Monitor for similar indicators\n"
+
+        return {
+            'incident_id': incident.get('id'),
+            'content': report_content
+        }
+
@@ -1 +1,178 @@
-"""\nCloud-agnostic secrets management\nSupports AWS Secrets Manager, Azure Key Vault, and GCP Secret Manager\n"""\n\nimport json\nimport logging\nimport os\nfrom typing import Dict, Optional\n\nlogger = logging.getLogger(__name__)\n\n\nclass CloudSecretsManager:\n    """\n    Unified interface for secrets management across cloud providers\n    Automatically detects cloud environment and uses appropriate service\n    """\n\n    def __init__(self, cloud_provider: Optional[str] = None):\n        """\n        Initialize secrets manager\n\n        Args:\n            cloud_provider: 'aws', 'azure', or 'gcp'. Auto-detected if not specified.\n        """\n        self.cloud_provider = cloud_provider or self._detect_cloud_provider()\n        self._init_client()\n\n    def _detect_cloud_provider(self) -> str:\n        """Auto-detect cloud provider from environment"""\n        if os.getenv('AWS_REGION') or os.getenv('AWS_DEFAULT_REGION'):\n            return 'aws'\n        elif os.getenv('AZURE_SUBSCRIPTION_ID') or os.getenv('AZURE_TENANT_ID'):\n            return 'azure'\n        elif os.getenv('GOOGLE_CLOUD_PROJECT') or os.getenv('GCP_PROJECT'):\n            return 'gcp'\n        else:\n            logger.warning("Could not auto-detect cloud provider, defaulting to AWS")\n            return 'aws'\n\n    def _init_client(self):\n        """Initialize cloud-specific secrets client"""\n        if self.cloud_provider == 'aws':\n            import boto3\n            self.client = boto3.client('secretsmanager')\n            self.get_secret = self._get_secret_aws\n        elif self.cloud_provider == 'azure':\n            from azure.identity import DefaultAzureCredential\n            from azure.keyvault.secrets import SecretClient\n            key_vault_url = os.getenv('AZURE_KEY_VAULT_URL')\n            if not key_vault_url:\n                raise ValueError("AZURE_KEY_VAULT_URL environment variable required for Azure")\n            credential = DefaultAzureCredential()\n            self.client = SecretClient(vault_url=key_vault_url, credential=credential)\n            self.get_secret = self._get_secret_azure\n        elif self.cloud_provider == 'gcp':\n            from google.cloud import secretmanager\n            self.client = secretmanager.SecretManagerServiceClient()\n            self.project_id = os.getenv('GOOGLE_CLOUD_PROJECT') or os.getenv('GCP_PROJECT')\n            if not self.project_id:\n                raise ValueError("GOOGLE_CLOUD_PROJECT environment variable required for GCP")\n            self.get_secret = self._get_secret_gcp\n        else:\n            raise ValueError(f"Unsupported cloud provider: {self.cloud_provider}")\n\n        logger.info(f"Initialized secrets manager for {self.cloud_provider}")\n\n    def _get_secret_aws(self, secret_name: str) -> Dict:\n        """Get secret from AWS Secrets Manager"""\n        try:\n            response = self.client.get_secret_value(SecretId=secret_name)\n            return json.loads(response['SecretString'])\n        except Exception as e:\n            logger.error(f"Error retrieving AWS secret {secret_name}: {e}")\n            raise\n\n    def _get_secret_azure(self, secret_name: str) -> Dict:\n        """Get secret from Azure Key Vault"""\n        try:\n            secret = self.client.get_secret(secret_name)\n            return json.loads(secret.value)\n        except Exception as e:\n            logger.error(f"Error retrieving Azure secret {secret_name}: {e}")\n            raise\n\n    def _get_secret_gcp(self, secret_name: str) -> Dict:\n        """Get secret from GCP Secret Manager"""\n        try:\n            name = f"projects/{self.project_id}/secrets/{secret_name}/versions/latest"\n            response = self.client.access_secret_version(request={"name": name})\n            payload = response.payload.data.decode('UTF-8')\n            return json.loads(payload)\n        except Exception as e:\n            logger.error(f"Error retrieving GCP secret {secret_name}: {e}")\n            raise\n\n    def get_crowdstrike_credentials(self) -> Dict:\n        """Get CrowdStrike API credentials"""\n        secret_names = {\n            'aws': 'crowdstrike/api-credentials',\n            'azure': 'crowdstrike-api-credentials',\n            'gcp': 'crowdstrike-api-credentials-prod'\n        }\n        return self.get_secret(secret_names[self.cloud_provider])\n\n    def get_microsoft_credentials(self) -> Dict:\n        """Get Microsoft API credentials"""\n        secret_names = {\n            'aws': 'microsoft/api-credentials',\n            'azure': 'microsoft-api-credentials',\n            'gcp': 'microsoft-api-credentials-prod'\n        }\n        return self.get_secret(secret_names[self.cloud_provider])\n\n    def get_proofpoint_credentials(self) -> Dict:\n        """Get Proofpoint API credentials"""\n        secret_names = {\n            'aws': 'proofpoint/api-credentials',\n            'azure': 'proofpoint-api-credentials',\n            'gcp': 'proofpoint-api-credentials-prod'\n        }\n        return self.get_secret(secret_names[self.cloud_provider])\n\n    def get_perplexity_credentials(self) -> Dict:\n        """Get Perplexity API credentials"""\n        secret_names = {\n            'aws': 'perplexity/api-credentials',\n            'azure': 'perplexity-api-credentials',\n            'gcp': 'perplexity-api-credentials-prod'\n        }\n        return self.get_secret(secret_names[self.cloud_provider])\n
\ No newline at end of file
+"""
+Cloud-agnostic secrets management
+Supports AWS Secrets Manager, Azure Key Vault, and GCP Secret Manager
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class CloudSecretsManager:
+    """
+    Unified interface for secrets management across cloud providers
+    Automatically detects cloud environment and uses appropriate service
+    """
+
+    def __init__(self, cloud_provider: Optional[str] = None, cache_ttl: float = 300):
+        """
+        Initialize secrets manager
+
+        Args:
+            cloud_provider: 'aws', 'azure', or 'gcp'. Auto-detected if not specified.
+            cache_ttl: Seconds a fetched secret is served from memory before re-fetching
+        """
+        self.cloud_provider = cloud_provider or self._detect_cloud_provider()
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[str, tuple] = {}
+        self._fetch_locks: Dict[str, threading.Lock] = {}
+        self._fetch_locks_guard = threading.Lock()
+        self._init_client()
+
+    def _detect_cloud_provider(self) -> str:
+        """Auto-detect cloud provider from environment"""
+        if os.getenv('AWS_REGION') or os.getenv('AWS_DEFAULT_REGION'):
+            return 'aws'
+        elif os.getenv('AZURE_SUBSCRIPTION_ID') or os.getenv('AZURE_TENANT_ID'):
+            return 'azure'
+        elif os.getenv('GOOGLE_CLOUD_PROJECT') or os.getenv('GCP_PROJECT'):
+            return 'gcp'
+        else:
+            logger.warning("Could not auto-detect cloud provider, defaulting to AWS")
+            return 'aws'
+
+    def _init_client(self):
+        """Initialize cloud-specific secrets client"""
+        if self.cloud_provider == 'aws':
+            import boto3
+            self.client = boto3.client('secretsmanager')
+            self._fetch_secret = self._get_secret_aws
+        elif self.cloud_provider == 'azure':
+            from azure.identity import DefaultAzureCredential
+            from azure.keyvault.secrets import SecretClient
+            key_vault_url = os.getenv('AZURE_KEY_VAULT_URL')
+            if not key_vault_url:
+                raise ValueError("AZURE_KEY_VAULT_URL environment variable required for Azure")
+            credential = DefaultAzureCredential()
+            self.client = SecretClient(vault_url=key_vault_url, credential=credential)
+            self._fetch_secret = self._get_secret_azure
+        elif self.cloud_provider == 'gcp':
+            from google.cloud import secretmanager
+            self.client = secretmanager.SecretManagerServiceClient()
+            self.project_id = os.getenv('GOOGLE_CLOUD_PROJECT') or os.getenv('GCP_PROJECT')
+            if not self.project_id:
+                raise ValueError("GOOGLE_CLOUD_PROJECT environment variable required for GCP")
+            self._fetch_secret = self._get_secret_gcp
+        else:
+            raise ValueError(f"Unsupported cloud provider: {self.cloud_provider}")
+
+        logger.info(f"Initialized secrets manager for {self.cloud_provider}")
+
+    def get_secret(self, secret_name: str) -> Dict:
+        """Get a secret, served from the in-memory cache while it is fresh"""
+        value = self._cached(secret_name)
+        if value is not None:
+            return dict(value)
+
+        # Only one fetch per secret at a time; concurrent callers reuse its result
+        with self._fetch_lock(secret_name):
+            value = self._cached(secret_name)
+            if value is None:
+                value = self._fetch_secret(secret_name)
+                self._cache[secret_name] = (value, time.monotonic() + self.cache_ttl)
+            return dict(value)
+
+    async def get_secret_async(self, secret_name: str) -> Dict:
+        """Get a secret without blocking the event loop, sharing the same cache"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_secret, secret_name)
+
+    def invalidate(self, secret_name: Optional[str] = None):
+        """Drop a cached secret (or all of them) so the next read re-fetches it"""
+        if secret_name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(secret_name, None)
+
+    def _cached(self, secret_name: str) -> Optional[Dict]:
+        """Return the cached secret value if it has not expired"""
+        entry = self._cache.get(secret_name)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    def _fetch_lock(self, secret_name: str) -> threading.Lock:
+        """Return the lock serializing fetches of a single secret"""
+        with self._fetch_locks_guard:
+            return self._fetch_locks.setdefault(secret_name, threading.Lock())
+
+    def _get_secret_aws(self, secret_name: str) -> Dict:
+        """Get secret from AWS Secrets Manager"""
+        try:
+            response = self.client.get_secret_value(SecretId=secret_name)
+            return orjson.loads(response['SecretString'])
+        except Exception as e:
+            logger.error(f"Error retrieving AWS secret {secret_name}: {e}")
+            raise
+
+    def _get_secret_azure(self, secret_name: str) -> Dict:
+        """Get secret from Azure Key Vault"""
+        try:
+            secret = self.client.get_secret(secret_name)
+            return orjson.loads(secret.value)
+        except Exception as e:
+            logger.error(f"Error retrieving Azure secret {secret_name}: {e}")
+            raise
+
+    def _get_secret_gcp(self, secret_name: str) -> Dict:
+        """Get secret from GCP Secret Manager"""
+        try:
+            name = f"projects/{self.project_id}/secrets/{secret_name}/versions/latest"
+            response = self.client.access_secret_version(request={"name": name})
+            return orjson.loads(response.payload.data)
+        except Exception as e:
+            logger.error(f"Error retrieving GCP secret {secret_name}: {e}")
+            raise
+
+    def get_crowdstrike_credentials(self) -> Dict:
+        """Get CrowdStrike API credentials"""
+        secret_names = {
+            'aws': 'crowdstrike/api-credentials',
+            'azure': 'crowdstrike-api-credentials',
+            'gcp': 'crowdstrike-api-credentials-prod'
+        }
+        return self.get_secret(secret_names[self.cloud_provider])
+
+    def get_microsoft_credentials(self) -> Dict:
+        """Get Microsoft API credentials"""
+        secret_names = {
+            'aws': 'microsoft/api-credentials',
+            'azure': 'microsoft-api-credentials',
+            'gcp': 'microsoft-api-credentials-prod'
+        }
+        return self.get_secret(secret_names[self.cloud_provider])
+
+    def get_proofpoint_credentials(self) -> Dict:
+        """Get Proofpoint API credentials"""
+        secret_names = {
+            'aws': 'proofpoint/api-credentials',
+            'azure': 'proofpoint-api-credentials',
+            'gcp': 'proofpoint-api-credentials-prod'
+        }
+        return self.get_secret(secret_names[self.cloud_provider])
+
+    def get_perplexity_credentials(self) -> Dict:
+        """Get Perplexity API credentials"""
+        secret_names = {
+            'aws': 'perplexity/api-credentials',
+            'azure': 'perplexity-api-credentials',
+            'gcp': 'perplexity-api-credentials-prod'
+        }
+        return self.get_secret(secret_names[self.cloud_provider])
@@ -1,33 +1,103 @@
 """
 CrowdStrike Falcon API Client
 Wrapper for CrowdStrike FalconPy SDK with async support
+
+FalconPy is synchronous, so every SDK call is run in a worker thread via
+asyncio.to_thread to keep the event loop free for other requests.
 """
 
-import json
+import asyncio
+import functools
 import logging
 from typing import Dict, List, Optional
 
-import boto3
-from falconpy import Detects, Hosts, Incidents, Intel, SpotlightVulnerabilities
+from ._cache import TTLCache
+from ._secrets import get_secret_json
 
 logger = logging.getLogger(__name__)
 
 
+# IDs queried per page, and IDs per details request
+_QUERY_PAGE_SIZE = 500
+_DETAILS_BATCH_SIZE = 100
+
+# Maximum paged or batched FalconPy requests in flight across the client
+_MAX_CONCURRENT_REQUESTS = 8
+
+# Threat intel for an indicator changes slowly; reuse lookups for an hour
+_INTEL_CACHE_SIZE = 10_000
+_INTEL_CACHE_TTL = 3600
+
+# Keep generated FQL filters under the API's practical length limit
+_MAX_FQL_LENGTH = 4000
+
+
+def _fql_quote(value: str) -> str:
+    """Quote a value for an FQL filter, escaping quotes and rejecting control characters"""
+    value = str(value)
+    if any(ord(char) < 32 for char in value):
+        raise ValueError(f"Invalid character in filter value: {value!r}")
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _build_fql(*predicates) -> Optional[str]:
+    """
+    Build an FQL filter from (field_and_operator, value) pairs
+
+    Pairs with an empty value are skipped; returns None when nothing remains.
+    """
+    return "+".join(
+        f"{field}{_fql_quote(value)}" for field, value in predicates if value
+    ) or None
+
+
+def _fql_in_chunks(field: str, values: List[str], max_length: int = _MAX_FQL_LENGTH) -> List[str]:
+    """
+    Build FQL set filters (field:['a','b',...]) for values
+
+    Values are split across as many filters as needed to keep each one under
+    max_length characters.
+    """
+    filters = []
+    quoted = []
+    length = len(field) + 3
+    for value in values:
+        item = _fql_quote(value)
+        if quoted and length + len(item) + 1 > max_length:
+            filters.append(f"{field}:[{','.join(quoted)}]")
+            quoted = []
+            length = len(field) + 3
+        quoted.append(item)
+        length += len(item) + 1
+    if quoted:
+        filters.append(f"{field}:[{','.join(quoted)}]")
+    return filters
+
+
+def _with_errors(result: Dict, errors: List) -> Dict:
+    """Attach errors from failed pages or detail batches to an otherwise successful result"""
+    if errors:
+        result["errors"] = errors
+    return result
+
+
 class CrowdStrikeClient:
     """CrowdStrike Falcon API client for threat detection and response"""
 
     def __init__(self, region_name: str = 'us-east-1'):
         """Initialize CrowdStrike client with credentials from Secrets Manager"""
         self.region_name = region_name
+        self._intel_cache = TTLCache(max_entries=_INTEL_CACHE_SIZE, ttl_seconds=_INTEL_CACHE_TTL)
+        # Shared by every paged query and detail batch, so concurrent callers
+        # (e.g. one query per FQL chunk) stay within one cap on worker threads
+        self._request_semaphore = asyncio.Semaphore(_MAX_CONCURRENT_REQUESTS)
         self._load_credentials()
         self._init_clients()
 
     def _load_credentials(self):
         """Load CrowdStrike API credentials from AWS Secrets Manager"""
         try:
-            secrets_client = boto3.client('secretsmanager', region_name=self.region_name)
-            secret = secrets_client.get_secret_value(SecretId='crowdstrike/api-credentials')
-            creds = json.loads(secret['SecretString'])
+            creds = get_secret_json('crowdstrike/api-credentials', self.region_name)
             self.client_id = creds['client_id']
             self.client_secret = creds['client_secret']
             logger.info("Successfully loaded CrowdStrike credentials")
@@ -38,33 +108,95 @@ class CrowdStrikeClient:
             self.client_secret = "test-client-secret"
 
     def _init_clients(self):
-        """Initialize FalconPy API clients"""
+        """Initialize FalconPy API clients sharing a single OAuth2 token"""
+        from falconpy import Detects, Hosts, Incidents, Intel, OAuth2, SpotlightVulnerabilities
+
         try:
-            self.detects = Detects(
-                client_id=self.client_id,
-                client_secret=self.client_secret
-            )
-            self.hosts = Hosts(
-                client_id=self.client_id,
-                client_secret=self.client_secret
-            )
-            self.incidents = Incidents(
-                client_id=self.client_id,
-                client_secret=self.client_secret
-            )
-            self.intel = Intel(
-                client_id=self.client_id,
-                client_secret=self.client_secret
-            )
-            self.vulnerabilities = SpotlightVulnerabilities(
+            # One token exchange serves every service class below
+            self.auth = OAuth2(
                 client_id=self.client_id,
                 client_secret=self.client_secret
             )
+            self.detects = Detects(auth_object=self.auth)
+            self.hosts = Hosts(auth_object=self.auth)
+            self.incidents = Incidents(auth_object=self.auth)
+            self.intel = Intel(auth_object=self.auth)
+            self.vulnerabilities = SpotlightVulnerabilities(auth_object=self.auth)
             logger.info("CrowdStrike API clients initialized")
         except Exception as e:
             logger.error(f"Failed to initialize CrowdStrike clients: {e}")
             raise
 
+    async def _query_all(self, query, limit: int, **params) -> Dict:
+        """
+        Run an offset-paged FalconPy query up to limit results
+
+        The first page reports the total match count; the remaining pages are
+        then requested concurrently and their IDs appended to the first
+        response's resources. Errors from failed later pages are appended to
+        the first response's errors rather than failing the whole query.
+        """
+        semaphore = self._request_semaphore
+        page_size = min(limit, _QUERY_PAGE_SIZE)
+        async with semaphore:
+            response = await asyncio.to_thread(query, limit=page_size, offset=0, **params)
+        if response['status_code'] != 200:
+            return response
+
+        resources = response['body']['resources']
+        pagination = response['body'].get('meta', {}).get('pagination', {})
+        total = min(limit, pagination.get('total', len(resources)))
+        if len(resources) < page_size or total <= page_size:
+            return response
+
+        async def fetch_page(offset: int) -> Dict:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    query, limit=min(page_size, total - offset), offset=offset, **params
+                )
+
+        pages = await asyncio.gather(*(
+            fetch_page(offset) for offset in range(page_size, total, page_size)
+        ))
+        errors = list(response['body'].get('errors') or [])
+        for page in pages:
+            if page['status_code'] != 200:
+                logger.warning(f"Skipping failed result page: {page['body'].get('errors')}")
+                errors.extend(page['body'].get('errors') or [])
+                continue
+            resources.extend(page['body']['resources'])
+        response['body']['errors'] = errors
+        return response
+
+    async def _get_details(self, fetch, ids: List[str]) -> Dict:
+        """
+        Fetch entity details for ids in concurrent batches
+
+        Returns the combined resources and any errors; a failed batch does
+        not discard the batches that succeeded.
+        """
+        semaphore = self._request_semaphore
+
+        async def fetch_batch(batch: List[str]) -> Dict:
+            async with semaphore:
+                return await asyncio.to_thread(fetch, ids=batch)
+
+        responses = await asyncio.gather(*(
+            fetch_batch(ids[i:i + _DETAILS_BATCH_SIZE])
+            for i in range(0, len(ids), _DETAILS_BATCH_SIZE)
+        ), return_exceptions=True)
+
+        resources, errors = [], []
+        for response in responses:
+            if isinstance(response, Exception):
+                logger.error(f"Error fetching details: {response}")
+                errors.append(str(response))
+            elif response['status_code'] != 200:
+                errors.extend(response['body'].get('errors') or [])
+            else:
+                resources.extend(response['body'].get('resources') or [])
+        return {"resources": resources, "errors": errors}
+
     async def get_detections(
         self,
         start_time: Optional[str] = None,
@@ -83,17 +215,15 @@ class CrowdStrikeClient:
             Dictionary with detections and count
         """
         try:
-            filters = []
-            if start_time:
-                filters.append(f"first_behavior:>='{start_time}'")
-            if severity:
-                filters.append(f"max_severity_displayname:'{severity}'")
-
-            filter_str = "+".join(filters) if filters else None
+            filter_str = _build_fql(
+                ("first_behavior:>=", start_time),
+                ("max_severity_displayname:", severity)
+            )
 
-            response = self.detects.query_detects(
-                filter=filter_str,
+            response = await self._query_all(
+                self.detects.query_detects,
                 limit=limit,
+                filter=filter_str,
                 sort="first_behavior.desc"
             )
 
@@ -104,16 +234,78 @@ class CrowdStrikeClient:
             if not detection_ids:
                 return {"detections": [], "count": 0}
 
-            details = self.detects.get_detect_summaries(ids=detection_ids)
+            details = await self._get_details(self.detects.get_detect_summaries, detection_ids)
 
-            return {
-                "detections": details['body']['resources'],
-                "count": len(details['body']['resources'])
-            }
+            return _with_errors({
+                "detections": details['resources'],
+                "count": len(details['resources'])
+            }, (response['body'].get('errors') or []) + details['errors'])
         except Exception as e:
             logger.error(f"Error getting detections: {e}")
             return {"error": str(e), "count": 0}
 
+    async def get_detections_for_hosts(
+        self,
+        hostnames: List[str],
+        start_time: Optional[str] = None,
+        limit: int = 500
+    ) -> Dict:
+        """
+        Get detections for many hosts with one set-filter query per filter chunk
+
+        Args:
+            hostnames: Hostnames to match against device.hostname
+            start_time: ISO 8601 timestamp filter
+            limit: Maximum number of results per filter chunk
+
+        Returns:
+            Dictionary with detections and count
+        """
+        hostnames = list(dict.fromkeys(h for h in hostnames if h))
+        if not hostnames:
+            return {"detections": [], "count": 0}
+
+        try:
+            time_filter = _build_fql(("first_behavior:>=", start_time))
+            filters = [
+                f"{host_filter}+{time_filter}" if time_filter else host_filter
+                for host_filter in _fql_in_chunks("device.hostname", hostnames)
+            ]
+
+            responses = await asyncio.gather(*(
+                self._query_all(
+                    self.detects.query_detects,
+                    limit=limit,
+                    filter=filter_str,
+                    sort="first_behavior.desc"
+                )
+                for filter_str in filters
+            ))
+
+            detection_ids = []
+            errors = []
+            for response in responses:
+                if response['status_code'] != 200:
+                    return {"error": response['body'].get('errors', 'Unknown error'), "count": 0}
+                detection_ids.extend(response['body']['resources'])
+                errors.extend(response['body'].get('errors') or [])
+
+            if not detection_ids:
+                return {"detections": [], "count": 0}
+
+            details = await self._get_details(
+                self.detects.get_detect_summaries,
+                list(dict.fromkeys(detection_ids))
+            )
+
+            return _with_errors({
+                "detections": details['resources'],
+                "count": len(details['resources'])
+            }, errors + details['errors'])
+        except Exception as e:
+            logger.error(f"Error getting detections for hosts: {e}")
+            return {"error": str(e), "count": 0}
+
     async def get_host_info(self, hostname: str) -> Dict:
         """
         Get detailed information about a host
@@ -125,8 +317,9 @@ class CrowdStrikeClient:
             Dictionary with host information
         """
         try:
-            query_response = self.hosts.query_devices_by_filter(
-                filter=f"hostname:'{hostname}'"
+            query_response = await asyncio.to_thread(
+                self.hosts.query_devices_by_filter,
+                filter=_build_fql(("hostname:", hostname))
             )
 
             if query_response['status_code'] != 200:
@@ -136,7 +329,7 @@ class CrowdStrikeClient:
             if not device_ids:
                 return {"error": f"Host '{hostname}' not found"}
 
-            details = self.hosts.get_device_details(ids=device_ids)
+            details = await asyncio.to_thread(self.hosts.get_device_details, ids=device_ids)
 
             return {
                 "host": details['body']['resources'][0],
@@ -164,17 +357,15 @@ class CrowdStrikeClient:
             Dictionary with incidents and count
         """
         try:
-            filters = []
-            if start_time:
-                filters.append(f"start:>='{start_time}'")
-            if status:
-                filters.append(f"status:'{status}'")
-
-            filter_str = "+".join(filters) if filters else None
+            filter_str = _build_fql(
+                ("start:>=", start_time),
+                ("status:", status)
+            )
 
-            response = self.incidents.query_incidents(
-                filter=filter_str,
+            response = await self._query_all(
+                self.incidents.query_incidents,
                 limit=limit,
+                filter=filter_str,
                 sort="start.desc"
             )
 
@@ -185,39 +376,55 @@ class CrowdStrikeClient:
             if not incident_ids:
                 return {"incidents": [], "count": 0}
 
-            details = self.incidents.get_incidents(ids=incident_ids)
+            details = await self._get_details(self.incidents.get_incidents, incident_ids)
 
-            return {
-                "incidents": details['body']['resources'],
-                "count": len(details['body']['resources'])
-            }
+            return _with_errors({
+                "incidents": details['resources'],
+                "count": len(details['resources'])
+            }, (response['body'].get('errors') or []) + details['errors'])
         except Exception as e:
             logger.error(f"Error getting incidents: {e}")
             return {"error": str(e), "count": 0}
 
-    async def get_threat_intel(self, indicator: str, indicator_type: str) -> Dict:
+    async def get_threat_intel(
+        self,
+        indicator: str,
+        indicator_type: str,
+        force_refresh: bool = False
+    ) -> Dict:
         """
         Get threat intelligence for an indicator
 
         Args:
             indicator: Indicator value (IP, domain, hash, etc.)
             indicator_type: Type of indicator
+            force_refresh: Bypass the cached result and query the API
 
         Returns:
             Dictionary with threat intelligence
         """
+        cache_key = (indicator, indicator_type)
+        if not force_refresh:
+            cached = self._intel_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
         try:
-            response = self.intel.query_indicator_entities(
-                filter=f"indicator:'{indicator}'+type:'{indicator_type}'"
+            response = await asyncio.to_thread(
+                self.intel.query_indicator_entities,
+                filter=_build_fql(("indicator:", indicator), ("type:", indicator_type))
             )
 
             if response['status_code'] != 200:
                 return {"error": response['body'].get('errors', 'Unknown error'), "count": 0}
 
-            return {
+            result = {
                 "intel": response['body']['resources'],
                 "count": len(response['body']['resources'])
             }
+            # Only successful lookups are cached so errors are retried next time
+            self._intel_cache.set(cache_key, result)
+            return dict(result)
         except Exception as e:
             logger.error(f"Error getting threat intel: {e}")
             return {"error": str(e), "count": 0}
@@ -233,9 +440,10 @@ class CrowdStrikeClient:
             Dictionary with vulnerabilities and count
         """
         try:
-            filter_str = f"host.hostname:'{hostname}'" if hostname else None
+            filter_str = _build_fql(("host.hostname:", hostname))
 
-            response = self.vulnerabilities.query_vulnerabilities(
+            response = await asyncio.to_thread(
+                self.vulnerabilities.query_vulnerabilities,
                 filter=filter_str,
                 limit=100
             )
@@ -247,12 +455,18 @@ class CrowdStrikeClient:
             if not vuln_ids:
                 return {"vulnerabilities": [], "count": 0}
 
-            details = self.vulnerabilities.get_vulnerabilities(ids=vuln_ids)
+            details = await self._get_details(self.vulnerabilities.get_vulnerabilities, vuln_ids)
 
-            return {
-                "vulnerabilities": details['body']['resources'],
-                "count": len(details['body']['resources'])
-            }
+            return _with_errors({
+                "vulnerabilities": details['resources'],
+                "count": len(details['resources'])
+            }, details['errors'])
         except Exception as e:
             logger.error(f"Error getting vulnerabilities: {e}")
             return {"error": str(e), "count": 0}
+
+
+@functools.lru_cache(maxsize=None)
+def get_crowdstrike_client(region_name: str = 'us-east-1') -> CrowdStrikeClient:
+    """Return a process-wide CrowdStrikeClient for the given region"""
+    return CrowdStrikeClient(region_name=region_name)
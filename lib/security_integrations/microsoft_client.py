@@ -1,16 +1,134 @@
 """
 Microsoft Security Tools Client
 Integrates with Microsoft Defender, Entra ID, and Purview
+
+Graph GETs issued in the same event-loop tick are coalesced into JSON $batch
+envelopes, so concurrent getter calls share one round trip.
 """
 
-import json
+import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from aiolimiter import AsyncLimiter
 
-import boto3
+from ._retry import retry_on_throttle
+from ._secrets import get_secret_json
 
 logger = logging.getLogger(__name__)
 
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+_GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+# Graph accepts at most 20 sub-requests per $batch envelope
+_GRAPH_BATCH_SIZE = 20
+
+# Graph calls in flight, and calls started per second, per client
+_MAX_CONCURRENT_REQUESTS = 20
+_MAX_REQUESTS_PER_SECOND = 10
+
+
+class GraphRequestError(Exception):
+    """Error status returned for a single Graph $batch sub-request"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[str] = None):
+        super().__init__(f"Graph request failed ({status_code}): {message}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _odata_quote(value: str) -> str:
+    """Quote a string literal for an OData $filter"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _graph_path(path: str, **params) -> str:
+    """Build a relative Graph URL with OData query parameters, skipping empty ones"""
+    query = urlencode(
+        {f"${key}": value for key, value in params.items() if value},
+        quote_via=quote,
+        safe="$',"
+    )
+    return f"{path}?{query}" if query else path
+
+
+def _serialize_alert(alert: Dict) -> Dict:
+    """Flatten a Graph security alert"""
+    user_states = alert.get('userStates') or [{}]
+    host_states = alert.get('hostStates') or [{}]
+    return {
+        "id": alert.get('id'),
+        "title": alert.get('title'),
+        "description": alert.get('description'),
+        "severity": alert.get('severity'),
+        "status": alert.get('status'),
+        "category": alert.get('category'),
+        "created_datetime": alert.get('createdDateTime'),
+        "assigned_to": alert.get('assignedTo'),
+        "user_principal_name": user_states[0].get('userPrincipalName'),
+        "host_fqdn": host_states[0].get('fqdn'),
+    }
+
+
+def _serialize_user(user: Dict) -> Dict:
+    """Flatten an Entra ID user"""
+    return {
+        "id": user.get('id'),
+        "display_name": user.get('displayName'),
+        "user_principal_name": user.get('userPrincipalName'),
+        "mail": user.get('mail'),
+        "job_title": user.get('jobTitle'),
+        "department": user.get('department'),
+        "account_enabled": user.get('accountEnabled'),
+    }
+
+
+def _serialize_risky_user(user: Dict) -> Dict:
+    """Flatten an Entra ID Protection risky user"""
+    return {
+        "id": user.get('id'),
+        "user_principal_name": user.get('userPrincipalName'),
+        "risk_level": user.get('riskLevel'),
+        "risk_state": user.get('riskState'),
+        "risk_detail": user.get('riskDetail'),
+        "risk_last_updated": user.get('riskLastUpdatedDateTime'),
+    }
+
+
+def _format_location(location: Dict) -> Optional[str]:
+    """Join a sign-in location's city and country, skipping unset parts"""
+    return ", ".join(part for part in (location.get('city'), location.get('countryOrRegion')) if part) or None
+
+
+def _serialize_sign_in(log: Dict) -> Dict:
+    """Flatten an Entra ID sign-in log entry"""
+    location = log.get('location') or {}
+    status = log.get('status') or {}
+    return {
+        "id": log.get('id'),
+        "created_datetime": log.get('createdDateTime'),
+        "user_principal_name": log.get('userPrincipalName'),
+        "app_display_name": log.get('appDisplayName'),
+        "ip_address": log.get('ipAddress'),
+        "location": _format_location(location),
+        "country_or_region": location.get('countryOrRegion'),
+        "status": status.get('errorCode', "Success"),
+        "risk_level": log.get('riskLevelAggregated'),
+    }
+
+
+def _serialize_dlp_alert(alert: Dict) -> Dict:
+    """Flatten a Purview DLP alert"""
+    return {
+        "id": alert.get('id'),
+        "title": alert.get('title'),
+        "description": alert.get('description'),
+        "severity": alert.get('severity'),
+        "status": alert.get('status'),
+        "created_datetime": alert.get('createdDateTime'),
+    }
+
 
 class MicrosoftSecurityClient:
     """Microsoft Security APIs client for Defender, Entra, and Purview"""
@@ -18,14 +136,18 @@ class MicrosoftSecurityClient:
     def __init__(self, region_name: str = 'us-east-1'):
         """Initialize Microsoft Security client with credentials from Secrets Manager"""
         self.region_name = region_name
+        self._credential = None
+        self._http = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._batch_tasks = set()
+        self._semaphore = asyncio.Semaphore(_MAX_CONCURRENT_REQUESTS)
+        self._rate_limit = AsyncLimiter(_MAX_REQUESTS_PER_SECOND, 1)
         self._load_credentials()
 
     def _load_credentials(self):
         """Load Microsoft API credentials from AWS Secrets Manager"""
         try:
-            secrets_client = boto3.client('secretsmanager', region_name=self.region_name)
-            secret = secrets_client.get_secret_value(SecretId='microsoft/api-credentials')
-            creds = json.loads(secret['SecretString'])
+            creds = get_secret_json('microsoft/api-credentials', self.region_name)
             self.tenant_id = creds['tenant_id']
             self.client_id = creds['client_id']
             self.client_secret = creds['client_secret']
@@ -37,6 +159,114 @@ class MicrosoftSecurityClient:
             self.client_id = "test-client-id"
             self.client_secret = "test-client-secret"
 
+    def _get_token(self) -> str:
+        """Get a Graph access token (cached and refreshed by azure-identity)"""
+        if self._credential is None:
+            from azure.identity import ClientSecretCredential
+            self._credential = ClientSecretCredential(
+                tenant_id=self.tenant_id,
+                client_id=self.client_id,
+                client_secret=self.client_secret
+            )
+        return self._credential.get_token(_GRAPH_SCOPE).token
+
+    def _http_client(self):
+        """Return the client's HTTP connection pool, creating it on first use"""
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(base_url=GRAPH_URL, timeout=30.0)
+        return self._http
+
+    async def _graph_batch(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Send Graph sub-requests as JSON $batch envelopes
+
+        Args:
+            requests: Sub-requests with "method" and relative "url" keys
+
+        Returns:
+            Sub-responses (with "status" and "body") in request order
+        """
+        token = await asyncio.to_thread(self._get_token)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        @retry_on_throttle()
+        async def send(chunk: List[Dict]) -> List[Dict]:
+            body = {"requests": [
+                {"id": str(index), **request} for index, request in enumerate(chunk)
+            ]}
+            async with self._semaphore, self._rate_limit:
+                response = await self._http_client().post("/$batch", json=body, headers=headers)
+            response.raise_for_status()
+            by_id = {item['id']: item for item in response.json().get('responses', [])}
+            return [
+                by_id.get(str(index), {"status": 500, "body": {"error": {"message": "Missing batch response"}}})
+                for index in range(len(chunk))
+            ]
+
+        chunks = await asyncio.gather(*(
+            send(requests[i:i + _GRAPH_BATCH_SIZE])
+            for i in range(0, len(requests), _GRAPH_BATCH_SIZE)
+        ))
+        return [response for chunk in chunks for response in chunk]
+
+    @retry_on_throttle()
+    async def _graph_get(self, url: str) -> Dict:
+        """
+        Queue a Graph GET for the next $batch envelope and wait for its result
+
+        Throttled sub-requests are re-queued, with backoff, into a later envelope.
+
+        Raises:
+            GraphRequestError: If Graph returned an error status for the sub-request
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((url, future))
+        if len(self._pending) == 1:
+            # Flush after every coroutine already scheduled this tick has queued
+            loop.call_soon(self._flush_pending)
+        response = await future
+
+        status = response.get('status', 500)
+        if status >= 400:
+            error = (response.get('body') or {}).get('error', {})
+            raise GraphRequestError(
+                status,
+                error.get('message', str(error)),
+                retry_after=(response.get('headers') or {}).get('Retry-After')
+            )
+        return response.get('body') or {}
+
+    def _flush_pending(self):
+        """Send every queued Graph GET in one batched call"""
+        pending, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._send_pending(pending))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_pending(self, pending: List[Tuple[str, asyncio.Future]]):
+        """Resolve queued futures from a single _graph_batch call"""
+        try:
+            responses = await self._graph_batch([
+                {"method": "GET", "url": url} for url, _ in pending
+            ])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), response in zip(pending, responses):
+            if not future.done():
+                future.set_result(response)
+
+    async def aclose(self):
+        """Close the client's HTTP connection pool"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
     async def get_defender_alerts(
         self,
         start_time: Optional[str] = None,
@@ -56,13 +286,30 @@ class MicrosoftSecurityClient:
         Returns:
             Dictionary with alerts and count
         """
-        # Implementation would use Microsoft Graph SDK
-        # For now, return mock data structure
         logger.info(f"Getting Defender alerts (start_time={start_time}, severity={severity})")
-        return {
-            "alerts": [],
-            "count": 0
-        }
+        try:
+            filters = []
+            if start_time:
+                filters.append(f"createdDateTime ge {start_time}")
+            if severity:
+                filters.append(f"severity eq {_odata_quote(severity)}")
+            if status:
+                filters.append(f"status eq {_odata_quote(status)}")
+
+            body = await self._graph_get(_graph_path(
+                "/security/alerts",
+                filter=" and ".join(filters),
+                top=limit,
+                orderby="createdDateTime desc"
+            ))
+            alerts = [_serialize_alert(alert) for alert in body.get('value', [])]
+            return {
+                "alerts": alerts,
+                "count": len(alerts)
+            }
+        except Exception as e:
+            logger.error(f"Error getting Defender alerts: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_entra_users(
         self,
@@ -80,10 +327,16 @@ class MicrosoftSecurityClient:
             Dictionary with users and count
         """
         logger.info(f"Getting Entra ID users (filter={filter_query})")
-        return {
-            "users": [],
-            "count": 0
-        }
+        try:
+            body = await self._graph_get(_graph_path("/users", filter=filter_query, top=limit))
+            users = [_serialize_user(user) for user in body.get('value', [])]
+            return {
+                "users": users,
+                "count": len(users)
+            }
+        except Exception as e:
+            logger.error(f"Error getting Entra users: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_risky_users(self, limit: int = 50) -> Dict:
         """
@@ -96,10 +349,20 @@ class MicrosoftSecurityClient:
             Dictionary with risky users and count
         """
         logger.info("Getting risky users from Entra ID Protection")
-        return {
-            "risky_users": [],
-            "count": 0
-        }
+        try:
+            body = await self._graph_get(_graph_path(
+                "/identityProtection/riskyUsers",
+                top=limit,
+                orderby="riskLastUpdatedDateTime desc"
+            ))
+            risky_users = [_serialize_risky_user(user) for user in body.get('value', [])]
+            return {
+                "risky_users": risky_users,
+                "count": len(risky_users)
+            }
+        except Exception as e:
+            logger.error(f"Error getting risky users: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_sign_in_logs(
         self,
@@ -119,10 +382,27 @@ class MicrosoftSecurityClient:
             Dictionary with sign-in logs and count
         """
         logger.info(f"Getting sign-in logs (user={user_principal_name}, start_time={start_time})")
-        return {
-            "sign_ins": [],
-            "count": 0
-        }
+        try:
+            filters = []
+            if user_principal_name:
+                filters.append(f"userPrincipalName eq {_odata_quote(user_principal_name)}")
+            if start_time:
+                filters.append(f"createdDateTime ge {start_time}")
+
+            body = await self._graph_get(_graph_path(
+                "/auditLogs/signIns",
+                filter=" and ".join(filters),
+                top=limit,
+                orderby="createdDateTime desc"
+            ))
+            sign_ins = [_serialize_sign_in(log) for log in body.get('value', [])]
+            return {
+                "sign_ins": sign_ins,
+                "count": len(sign_ins)
+            }
+        except Exception as e:
+            logger.error(f"Error getting sign-in logs: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_purview_dlp_alerts(self, limit: int = 50) -> Dict:
         """
@@ -135,7 +415,54 @@ class MicrosoftSecurityClient:
             Dictionary with DLP alerts and count
         """
         logger.info("Getting Purview DLP alerts")
-        return {
-            "dlp_alerts": [],
-            "count": 0
-        }
+        try:
+            body = await self._graph_get(_graph_path(
+                "/security/alerts_v2",
+                filter="serviceSource eq 'microsoftPurview'",
+                top=limit,
+                orderby="createdDateTime desc"
+            ))
+            dlp_alerts = [_serialize_dlp_alert(alert) for alert in body.get('value', [])]
+            return {
+                "dlp_alerts": dlp_alerts,
+                "count": len(dlp_alerts)
+            }
+        except Exception as e:
+            logger.error(f"Error getting Purview DLP alerts: {e}")
+            return {"error": str(e), "count": 0}
+
+    async def get_bundle(
+        self,
+        start_time: Optional[str] = None,
+        include_sign_ins: bool = True,
+        include_alerts: bool = True,
+        include_risky_users: bool = True,
+        include_dlp_alerts: bool = False
+    ) -> Dict:
+        """
+        Get several Microsoft datasets in a single Graph $batch round trip
+
+        Args:
+            start_time: ISO 8601 timestamp filter for sign-ins and alerts
+            include_sign_ins: Include Entra ID sign-in logs
+            include_alerts: Include Defender alerts
+            include_risky_users: Include Entra ID Protection risky users
+            include_dlp_alerts: Include Purview DLP alerts
+
+        Returns:
+            Dictionary with one getter result per included dataset, keyed
+            sign_ins, alerts, risky_users, and dlp_alerts
+        """
+        lookups = {}
+        if include_sign_ins:
+            lookups['sign_ins'] = self.get_sign_in_logs(start_time=start_time)
+        if include_alerts:
+            lookups['alerts'] = self.get_defender_alerts(start_time=start_time)
+        if include_risky_users:
+            lookups['risky_users'] = self.get_risky_users()
+        if include_dlp_alerts:
+            lookups['dlp_alerts'] = self.get_purview_dlp_alerts()
+
+        # Gathered in one tick, so the getters' requests share one envelope
+        results = await asyncio.gather(*lookups.values())
+        return dict(zip(lookups, results))
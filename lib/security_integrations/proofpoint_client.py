@@ -3,15 +3,22 @@ Proofpoint Security Client
 Provides email security and threat intelligence integration
 """
 
-import json
+import asyncio
 import logging
 from typing import Dict, Optional
+from urllib.parse import quote
 
-import boto3
-import requests
+from aiolimiter import AsyncLimiter
+
+from ._retry import retry_on_throttle
+from ._secrets import get_secret_json
 
 logger = logging.getLogger(__name__)
 
+# TAP requests in flight, and requests started per second, per client
+_MAX_CONCURRENT_REQUESTS = 20
+_MAX_REQUESTS_PER_SECOND = 5
+
 
 class ProofpointClient:
     """Proofpoint API client for email security and TAP"""
@@ -22,15 +29,14 @@ class ProofpointClient:
         """Initialize Proofpoint client with credentials from Secrets Manager"""
         self.region_name = region_name
         self._load_credentials()
-        self.session = requests.Session()
-        self.session.auth = (self.service_principal, self.secret)
+        self._http = None
+        self._semaphore = asyncio.Semaphore(_MAX_CONCURRENT_REQUESTS)
+        self._rate_limit = AsyncLimiter(_MAX_REQUESTS_PER_SECOND, 1)
 
     def _load_credentials(self):
         """Load Proofpoint API credentials from AWS Secrets Manager"""
         try:
-            secrets_client = boto3.client('secretsmanager', region_name=self.region_name)
-            secret = secrets_client.get_secret_value(SecretId='proofpoint/api-credentials')
-            creds = json.loads(secret['SecretString'])
+            creds = get_secret_json('proofpoint/api-credentials', self.region_name)
             self.service_principal = creds['service_principal']
             self.secret = creds['secret']
             logger.info("Successfully loaded Proofpoint credentials")
@@ -40,6 +46,39 @@ class ProofpointClient:
             self.service_principal = "test-principal"
             self.secret = "test-secret"
 
+    def _http_client(self):
+        """Return the client's HTTP/2 connection pool, creating it on first use"""
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                auth=(self.service_principal, self.secret),
+                http2=True,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+                timeout=30.0
+            )
+        return self._http
+
+    async def aclose(self):
+        """Close the client's HTTP connection pool"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    @retry_on_throttle()
+    async def _make_request(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        method: str = "GET",
+        json: Optional[Dict] = None
+    ) -> Dict:
+        """Make a TAP API request within the client's concurrency and rate limits"""
+        async with self._semaphore, self._rate_limit:
+            response = await self._http_client().request(method, endpoint, params=params, json=json)
+        response.raise_for_status()
+        return response.json()
+
     async def get_siem_events(
         self,
         interval: str = "PT1H",
@@ -58,29 +97,60 @@ class ProofpointClient:
             Dictionary with SIEM events
         """
         logger.info(f"Getting SIEM events (interval={interval}, threat_type={threat_type})")
-        return {
-            "clicks_permitted": [],
-            "clicks_blocked": [],
-            "messages_delivered": [],
-            "messages_blocked": [],
-            "total_events": 0
-        }
+        try:
+            params = {"interval": interval, "format": "json"}
+            if threat_type:
+                params["threatType"] = threat_type
+            if threat_status:
+                params["threatStatus"] = threat_status
+
+            data = await self._make_request("siem/all", params=params)
+
+            events = {
+                "clicks_permitted": data.get("clicksPermitted", []),
+                "clicks_blocked": data.get("clicksBlocked", []),
+                "messages_delivered": data.get("messagesDelivered", []),
+                "messages_blocked": data.get("messagesBlocked", []),
+            }
+            events["total_events"] = sum(len(items) for items in events.values())
+            return events
+        except Exception as e:
+            logger.error(f"Error getting SIEM events: {e}")
+            return {"error": str(e), "total_events": 0}
 
     async def get_clicks_blocked(self, interval: str = "PT1H") -> Dict:
         """Get blocked clicks on malicious URLs"""
         logger.info(f"Getting blocked clicks (interval={interval})")
-        return {
-            "clicks_blocked": [],
-            "count": 0
-        }
+        try:
+            data = await self._make_request(
+                "siem/clicks/blocked",
+                params={"interval": interval, "format": "json"}
+            )
+            clicks = data.get("clicksBlocked", [])
+            return {
+                "clicks_blocked": clicks,
+                "count": len(clicks)
+            }
+        except Exception as e:
+            logger.error(f"Error getting blocked clicks: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_messages_blocked(self, interval: str = "PT1H") -> Dict:
         """Get emails blocked by Proofpoint"""
         logger.info(f"Getting blocked messages (interval={interval})")
-        return {
-            "messages_blocked": [],
-            "count": 0
-        }
+        try:
+            data = await self._make_request(
+                "siem/messages/blocked",
+                params={"interval": interval, "format": "json"}
+            )
+            messages = data.get("messagesBlocked", [])
+            return {
+                "messages_blocked": messages,
+                "count": len(messages)
+            }
+        except Exception as e:
+            logger.error(f"Error getting blocked messages: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_messages_delivered(
         self,
@@ -89,37 +159,73 @@ class ProofpointClient:
     ) -> Dict:
         """Get potentially malicious emails that were delivered"""
         logger.info(f"Getting delivered messages (interval={interval}, threat_status={threat_status})")
-        return {
-            "messages_delivered": [],
-            "count": 0
-        }
+        try:
+            params = {"interval": interval, "format": "json"}
+            if threat_status:
+                params["threatStatus"] = threat_status
+
+            data = await self._make_request("siem/messages/delivered", params=params)
+            messages = data.get("messagesDelivered", [])
+            return {
+                "messages_delivered": messages,
+                "count": len(messages)
+            }
+        except Exception as e:
+            logger.error(f"Error getting delivered messages: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_top_clickers(self, window: int = 30) -> Dict:
         """Get users who click on malicious URLs most frequently"""
         logger.info(f"Getting top clickers (window={window} days)")
-        return {
-            "top_clickers": [],
-            "count": 0
-        }
+        try:
+            data = await self._make_request("people/top-clickers", params={"window": window})
+            users = data.get("users", [])
+            return {
+                "top_clickers": users,
+                "count": len(users)
+            }
+        except Exception as e:
+            logger.error(f"Error getting top clickers: {e}")
+            return {"error": str(e), "count": 0}
 
     async def get_vap_report(self, window: int = 30) -> Dict:
         """Get Very Attacked People (most targeted users)"""
         logger.info(f"Getting VAP report (window={window} days)")
-        return {
-            "very_attacked_people": [],
-            "count": 0
-        }
+        try:
+            data = await self._make_request("people/vap", params={"window": window})
+            users = data.get("users", [])
+            return {
+                "very_attacked_people": users,
+                "count": len(users)
+            }
+        except Exception as e:
+            logger.error(f"Error getting VAP report: {e}")
+            return {"error": str(e), "count": 0}
 
     async def decode_url(self, encoded_url: str) -> Dict:
         """Decode a Proofpoint rewritten URL"""
         logger.info(f"Decoding URL: {encoded_url[:50]}...")
-        return {
-            "decoded_urls": []
-        }
+        try:
+            data = await self._make_request(
+                "url/decode",
+                method="POST",
+                json={"urls": [encoded_url]}
+            )
+            return {
+                "decoded_urls": data.get("urls", [])
+            }
+        except Exception as e:
+            logger.error(f"Error decoding URL: {e}")
+            return {"error": str(e)}
 
     async def get_campaign_info(self, campaign_id: str) -> Dict:
         """Get information about a specific threat campaign"""
         logger.info(f"Getting campaign info for: {campaign_id}")
-        return {
-            "campaign": {}
-        }
+        try:
+            data = await self._make_request(f"campaign/{quote(campaign_id, safe='')}")
+            return {
+                "campaign": data
+            }
+        except Exception as e:
+            logger.error(f"Error getting campaign info: {e}")
+            return {"error": str(e)}
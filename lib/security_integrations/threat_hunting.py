@@ -3,22 +3,252 @@ Threat Hunting Engine
 ML-powered threat hunting with AI assistance
 """
 
+from __future__ import annotations
+
+import asyncio
+import functools
 import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import networkx as nx
-import numpy as np
-import pandas as pd
-from anthropic import Anthropic
+import orjson
 
 from .crowdstrike_client import CrowdStrikeClient
 from .microsoft_client import MicrosoftSecurityClient
 from .proofpoint_client import ProofpointClient
 
+# pandas, numpy, scipy and networkx are imported where they are used so that
+# importing this module (or the package) does not pay their load time
+if TYPE_CHECKING:
+    import networkx as nx
+    import numpy as np
+    import pandas as pd
+    from scipy import sparse
+
 logger = logging.getLogger(__name__)
 
+# Columns aggregate_data adds to every event row
+_EVENT_COLUMNS = ['timestamp', 'source', 'event_type']
+
+# Sign-in fields used by prepare_ml_features, and the feature frame it returns
+_SIGN_IN_FIELDS = ['user_principal_name', 'ip_address', 'country_or_region', 'app_display_name', 'status']
+_ML_FEATURE_COLUMNS = [
+    'login_hour',
+    'login_country_diversity',
+    'failed_login_count',
+    'successful_login_count',
+    'ip_diversity',
+    'application_diversity',
+    'user_principal_name'
+]
+
+# Sign-in status values meaning success (Graph reports errorCode 0)
+_SIGN_IN_SUCCESS_STATUSES = (0, '0', 'Success')
+
+# detect_beaconing: spectrum bins per mean interval, the spectral peak-to-mean
+# ratio marking a periodic series, and the largest interval jitter (std/mean)
+_BEACON_BINS_PER_INTERVAL = 8
+_BEACON_MIN_PEAK_RATIO = 8.0
+_BEACON_MAX_INTERVAL_CV = 0.5
+
+
+@functools.lru_cache(maxsize=None)
+def _anthropic_client():
+    """Return a process-wide async Anthropic client so its connection pool is reused"""
+    from anthropic import AsyncAnthropic
+    return AsyncAnthropic()
+
+
+# MITRE ATT&CK tactics reported by map_to_mitre_attack, in report order
+_MITRE_TACTICS = (
+    'Initial Access',
+    'Execution',
+    'Persistence',
+    'Privilege Escalation',
+    'Defense Evasion',
+    'Credential Access',
+    'Discovery',
+    'Lateral Movement',
+    'Collection',
+    'Exfiltration',
+    'Command and Control',
+)
+
+# generate_hunting_hypotheses: findings JSON budget (bytes) and list items kept per key
+_PROMPT_FINDINGS_BUDGET = 3000
+_PROMPT_MAX_ITEMS = 25
+
+# Static instructions for the hunting model calls. They go in the system
+# prompt marked for Anthropic prompt caching, so repeated calls in a hunt run
+# reuse the cached prefix and only the findings/hypothesis are new tokens.
+_HYPOTHESIS_SYSTEM_PROMPT = """As a security threat hunter, analyze the findings provided by the user and generate specific, actionable threat hunting hypotheses.
+
+Generate 3-5 specific threat hunting hypotheses, each with:
+1. A clear title
+2. Priority level (High, Medium, Low)
+3. Relevant MITRE ATT&CK tactics
+4. Detailed description of what to look for
+5. Step-by-step hunting approach
+6. Expected indicators if hypothesis is confirmed
+
+Format as JSON array:
+[
+    {
+        "title": "Hypothesis title",
+        "priority": "High",
+        "mitre_tactics": ["Initial Access", "Persistence"],
+        "description": "What we're hunting for",
+        "hunting_steps": ["Step 1", "Step 2"],
+        "expected_indicators": ["Indicator 1", "Indicator 2"]
+    }
+]"""
+
+_HUNT_SYSTEM_PROMPT = """Based on the hunting hypothesis provided by the user and available data, provide:
+1. A summary of findings
+2. Recommended next actions
+
+Provide response in this format:
+SUMMARY: [your summary]
+
+ACTIONS:
+- [action 1]
+- [action 2]"""
+
+
+def _cached_system(text: str) -> List[Dict]:
+    """Return a system prompt block marked for Anthropic prompt caching"""
+    return [{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}]
+
+
+# Decoder used to pull the hypothesis array out of a model response
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _dumps_compact(obj: Any) -> bytes:
+    """Serialize to compact JSON, handling numpy values and datetimes natively"""
+    return orjson.dumps(
+        obj,
+        default=str,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+    )
+
+
+def _summarize_for_prompt(findings: Dict, max_items: int = _PROMPT_MAX_ITEMS) -> Dict:
+    """Keep the first max_items of each list in findings and drop empty values"""
+    return {
+        key: value[:max_items] if isinstance(value, list) else value
+        for key, value in findings.items()
+        if value is not None and not (isinstance(value, (list, dict, str)) and not value)
+    }
+
+
+def _distinct_per_group(codes: np.ndarray, values: pd.Series, n_groups: int) -> np.ndarray:
+    """
+    Count distinct non-null values per group
+
+    Values are factorized to integers and each (group, value) pair packed into
+    one int64, so only integer arrays are deduplicated rather than Python
+    objects per group.
+
+    Args:
+        codes: Group code for each row, in range(n_groups)
+        values: Column to count, aligned with codes
+        n_groups: Number of groups
+
+    Returns:
+        Distinct value count for each group code
+    """
+    import numpy as np
+    import pandas as pd
+
+    value_codes, uniques = pd.factorize(values, sort=False)
+    present = value_codes >= 0
+    pairs = np.unique(codes[present].astype(np.int64) * len(uniques) + value_codes[present])
+    return np.bincount(pairs // max(len(uniques), 1), minlength=n_groups)
+
+
+def _first_json_array(text: str) -> Optional[List[Dict]]:
+    """
+    Find the first JSON array of objects embedded in free text
+
+    Each '[' is tried as the start of an array, so brackets in the model's
+    prose (citations, lists of numbers) do not break the parse.
+
+    Args:
+        text: Model response text
+
+    Returns:
+        Parsed list, or None if the text holds no non-empty array of objects
+    """
+    start = text.find('[')
+    while start >= 0:
+        try:
+            value, _ = _JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            pass
+        else:
+            if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+                return value
+        start = text.find('[', start + 1)
+    return None
+
+
+class NetworkGraph:
+    """
+    Directed host-to-host communication graph backed by a CSR adjacency matrix
+
+    Row i lists the hosts that node i connected to; values are connection
+    counts. to_networkx() and subgraph() adapt it for NetworkX-based callers
+    such as plotting.
+    """
+
+    def __init__(self, matrix: sparse.csr_matrix, nodes: List[str], protocols: Optional[Dict] = None):
+        """
+        Initialize graph
+
+        Args:
+            matrix: Square CSR adjacency matrix of connection counts
+            nodes: Node name for each matrix row/column
+            protocols: Most common protocol per source node
+        """
+        self.matrix = matrix
+        self.nodes = nodes
+        self.node_index = {node: index for index, node in enumerate(nodes)}
+        self.protocols = protocols or {}
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> 'NetworkGraph':
+        """Build a NetworkGraph from a NetworkX DiGraph"""
+        import networkx as nx
+
+        nodes = list(graph)
+        return cls(nx.to_scipy_sparse_array(graph, nodelist=nodes, format='csr'), nodes)
+
+    def number_of_nodes(self) -> int:
+        return len(self.nodes)
+
+    def number_of_edges(self) -> int:
+        return self.matrix.nnz
+
+    def out_degree(self) -> np.ndarray:
+        """Distinct targets per node"""
+        import numpy as np
+
+        return np.diff(self.matrix.indptr)
+
+    def to_networkx(self) -> nx.DiGraph:
+        """Return the graph as a NetworkX DiGraph with 'weight' edge attributes"""
+        import networkx as nx
+
+        graph = nx.from_scipy_sparse_array(self.matrix, create_using=nx.DiGraph)
+        return nx.relabel_nodes(graph, dict(enumerate(self.nodes)))
+
+    def subgraph(self, nodes: List[str]) -> nx.DiGraph:
+        """Return the NetworkX subgraph induced by nodes"""
+        indexes = [self.node_index[node] for node in nodes if node in self.node_index]
+        matrix = self.matrix[indexes][:, indexes]
+        return NetworkGraph(matrix, [self.nodes[index] for index in indexes]).to_networkx()
+
 
 class ThreatHuntingEngine:
     """ML-powered threat hunting engine with AI-assisted analysis"""
@@ -40,7 +270,11 @@ class ThreatHuntingEngine:
         self.crowdstrike = crowdstrike
         self.microsoft = microsoft
         self.proofpoint = proofpoint
-        self.anthropic = Anthropic()
+        self.anthropic = _anthropic_client()
+
+    async def aclose(self):
+        """Close the Microsoft and Proofpoint clients' HTTP connection pools"""
+        await asyncio.gather(self.microsoft.aclose(), self.proofpoint.aclose())
 
     async def collect_crowdstrike_data(
         self,
@@ -77,17 +311,17 @@ class ThreatHuntingEngine:
             'risky_users': []
         }
 
-        if include_sign_ins:
-            sign_ins = await self.microsoft.get_sign_in_logs(start_time=start_time)
-            data['sign_ins'] = sign_ins.get('sign_ins', [])
-
-        if include_alerts:
-            alerts = await self.microsoft.get_defender_alerts(start_time=start_time)
-            data['alerts'] = alerts.get('alerts', [])
-
-        if include_risky_users:
-            risky = await self.microsoft.get_risky_users()
-            data['risky_users'] = risky.get('risky_users', [])
+        # One Graph $batch round trip for all requested datasets
+        bundle = await self.microsoft.get_bundle(
+            start_time=start_time,
+            include_sign_ins=include_sign_ins,
+            include_alerts=include_alerts,
+            include_risky_users=include_risky_users
+        )
+        for key, result in bundle.items():
+            if 'error' in result:
+                logger.error(f"Error collecting Microsoft {key}: {result['error']}")
+            data[key] = result.get(key, [])
 
         return data
 
@@ -99,108 +333,139 @@ class ThreatHuntingEngine:
             'vap_users': []
         }
 
-        events = await self.proofpoint.get_siem_events(interval=interval)
-        data['total_events'] = events.get('total_events', 0)
-
-        top_clickers = await self.proofpoint.get_top_clickers()
-        data['top_clickers'] = top_clickers.get('top_clickers', [])
+        lookups = {
+            'total_events': self.proofpoint.get_siem_events(interval=interval),
+            'top_clickers': self.proofpoint.get_top_clickers(),
+            'vap_users': self.proofpoint.get_vap_report()
+        }
+        result_keys = {'vap_users': 'very_attacked_people'}
 
-        vap = await self.proofpoint.get_vap_report()
-        data['vap_users'] = vap.get('very_attacked_people', [])
+        for key, result in await self._gather_lookups('Proofpoint', lookups):
+            data[key] = result.get(result_keys.get(key, key), data[key])
 
         return data
 
+    async def collect_all_data(
+        self,
+        start_time: str,
+        interval: str
+    ) -> Tuple[Dict, Dict, Dict]:
+        """
+        Collect CrowdStrike, Microsoft, and Proofpoint data concurrently
+
+        Args:
+            start_time: ISO 8601 timestamp for CrowdStrike and Microsoft
+            interval: ISO 8601 duration for Proofpoint
+
+        Returns:
+            Tuple of (cs_data, ms_data, pp_data)
+        """
+        return tuple(await asyncio.gather(
+            self.collect_crowdstrike_data(start_time=start_time),
+            self.collect_microsoft_data(start_time=start_time),
+            self.collect_proofpoint_data(interval=interval)
+        ))
+
+    @staticmethod
+    async def _gather_lookups(source: str, lookups: Dict) -> List[Tuple[str, Dict]]:
+        """Run independent lookups concurrently, logging and dropping failures"""
+        results = await asyncio.gather(*lookups.values(), return_exceptions=True)
+        succeeded = []
+        for key, result in zip(lookups, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error collecting {source} {key}: {result}")
+            else:
+                succeeded.append((key, result))
+        return succeeded
+
     def aggregate_data(
         self,
         cs_data: Dict,
         ms_data: Dict,
         pp_data: Dict
-    ) -> List[Dict]:
-        """Aggregate data from all sources into unified format"""
-        events = []
-
-        # Add CrowdStrike detections as events
-        for detection in cs_data.get('detections', []):
-            events.append({
-                'timestamp': detection.get('first_behavior'),
-                'source': 'CrowdStrike',
-                'event_type': 'detection',
-                'data': detection
-            })
-
-        # Add Microsoft sign-ins as events
-        for signin in ms_data.get('sign_ins', []):
-            events.append({
-                'timestamp': signin.get('created_datetime'),
-                'source': 'Microsoft',
-                'event_type': 'sign_in',
-                'data': signin
-            })
+    ) -> pd.DataFrame:
+        """
+        Aggregate data from all sources into one event frame
 
-        # Add Microsoft alerts as events
-        for alert in ms_data.get('alerts', []):
-            events.append({
-                'timestamp': alert.get('created_datetime'),
-                'source': 'Microsoft',
-                'event_type': 'alert',
-                'data': alert
-            })
+        Each source list becomes a frame directly, with no per-event wrapper
+        dicts, and the frames are concatenated once.
 
-        return events
-
-    def prepare_ml_features(self, events: List[Dict]) -> pd.DataFrame:
-        """Prepare features for machine learning analysis"""
-        # Create feature dataframe
-        features = {
-            'login_hour': [],
-            'login_country_diversity': [],
-            'failed_login_count': [],
-            'successful_login_count': [],
-            'ip_diversity': [],
-            'application_diversity': [],
-            'user_principal_name': []
-        }
+        Args:
+            cs_data: Output of collect_crowdstrike_data
+            ms_data: Output of collect_microsoft_data
+            pp_data: Output of collect_proofpoint_data
 
-        # Extract features from events
-        # This is a simplified example - real implementation would be more sophisticated
-        user_sessions = {}
-
-        for event in events:
-            if event.get('event_type') == 'sign_in':
-                data = event.get('data', {})
-                user = data.get('user_principal_name', 'unknown')
-
-                if user not in user_sessions:
-                    user_sessions[user] = {
-                        'login_hours': [],
-                        'countries': set(),
-                        'ips': set(),
-                        'apps': set(),
-                        'failed': 0,
-                        'successful': 0
-                    }
-
-                # Simulate feature extraction
-                if event.get('timestamp'):
-                    try:
-                        hour = datetime.fromisoformat(event['timestamp'].replace('Z', '+00:00')).hour
-                        user_sessions[user]['login_hours'].append(hour)
-                    except:
-                        pass
-
-                user_sessions[user]['successful'] += 1
-
-        # Convert to dataframe
-        for user, session in user_sessions.items():
-            features['user_principal_name'].append(user)
-            features['login_hour'].append(np.mean(session['login_hours']) if session['login_hours'] else 12)
-            features['login_country_diversity'].append(len(session['countries']))
-            features['failed_login_count'].append(session['failed'])
-            features['successful_login_count'].append(session['successful'])
-            features['ip_diversity'].append(len(session['ips']))
-            features['application_diversity'].append(len(session['apps']))
-
-        return pd.DataFrame(features)
+        Returns:
+            One row per event: timestamp, source and event_type columns plus
+            the fields of the original record
+        """
+        import pandas as pd
+
+        sources = (
+            (cs_data.get('detections'), 'first_behavior', 'CrowdStrike', 'detection'),
+            (ms_data.get('sign_ins'), 'created_datetime', 'Microsoft', 'sign_in'),
+            (ms_data.get('alerts'), 'created_datetime', 'Microsoft', 'alert'),
+        )
+
+        frames = []
+        for records, time_field, source, event_type in sources:
+            if not records:
+                continue
+            frame = pd.DataFrame(records)
+            frames.append(frame.assign(
+                timestamp=frame[time_field] if time_field in frame else None,
+                source=source,
+                event_type=event_type
+            ))
+
+        if not frames:
+            return pd.DataFrame(columns=_EVENT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def prepare_ml_features(self, events: pd.DataFrame) -> pd.DataFrame:
+        """Prepare per-user sign-in features for machine learning analysis"""
+        import numpy as np
+        import pandas as pd
+
+        sign_ins = events[events['event_type'] == 'sign_in']
+        if sign_ins.empty:
+            return pd.DataFrame(columns=_ML_FEATURE_COLUMNS)
+
+        df = sign_ins.reindex(columns=_SIGN_IN_FIELDS)
+        codes, users = pd.factorize(df['user_principal_name'].fillna('unknown'), sort=False)
+        n_users = len(users)
+
+        # Per-user sums over contiguous arrays: np.bincount instead of
+        # per-group Python reductions
+        hours = pd.to_datetime(
+            sign_ins['timestamp'],
+            utc=True,
+            format='ISO8601',
+            errors='coerce'
+        ).dt.hour.to_numpy(dtype=float, na_value=np.nan)
+        has_hour = ~np.isnan(hours)
+        hour_totals = np.bincount(codes[has_hour], weights=hours[has_hour], minlength=n_users)
+        hour_counts = np.bincount(codes[has_hour], minlength=n_users)
+
+        failed = (df['status'].notna() & ~df['status'].isin(_SIGN_IN_SUCCESS_STATUSES)).to_numpy()
+        failed_counts = np.bincount(codes, weights=failed, minlength=n_users).astype(np.int64)
+        sign_in_counts = np.bincount(codes, minlength=n_users)
+
+        return pd.DataFrame({
+            # Users with no parseable timestamps get a neutral midday hour
+            'login_hour': np.divide(
+                hour_totals,
+                hour_counts,
+                out=np.full(n_users, 12.0),
+                where=hour_counts > 0
+            ),
+            'login_country_diversity': _distinct_per_group(codes, df['country_or_region'], n_users),
+            'failed_login_count': failed_counts,
+            'successful_login_count': sign_in_counts - failed_counts,
+            'ip_diversity': _distinct_per_group(codes, df['ip_address'], n_users),
+            'application_diversity': _distinct_per_group(codes, df['app_display_name'], n_users),
+            'user_principal_name': users
+        })
 
     def detect_beaconing(
         self,
@@ -208,9 +473,70 @@ class ThreatHuntingEngine:
         time_threshold: int = 60,
         count_threshold: int = 10
     ) -> List[Dict]:
-        """Detect C2 beaconing patterns in network traffic"""
+        """
+        Detect C2 beaconing patterns in network traffic
+
+        Connections are grouped by (host, destination_ip, destination_port).
+        A group is flagged when its arrival times show a dominant frequency
+        in their power spectrum and its inter-arrival times are regular.
+
+        Args:
+            network_df: Network events with host, destination_ip,
+                destination_port, and ISO 8601 timestamp columns
+            time_threshold: Largest mean interval, in seconds, treated as beaconing
+            count_threshold: Fewest connections needed to judge a group
+
+        Returns:
+            Beaconing patterns, most periodic first
+        """
+        import numpy as np
+        import pandas as pd
+
+        df = network_df.reindex(columns=['host', 'destination_ip', 'destination_port', 'timestamp'])
+        df = df.assign(
+            ts=pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce')
+        ).dropna(subset=['host', 'destination_ip', 'ts'])
+
         beaconing_patterns = []
-        # Implementation would analyze network traffic for periodic connections
+        groups = df.groupby(['host', 'destination_ip', 'destination_port'], dropna=False, sort=False)['ts']
+        for (host, destination_ip, destination_port), times in groups:
+            if len(times) < count_threshold:
+                continue
+
+            seconds = np.sort(times.to_numpy('datetime64[ms]').astype(np.int64)) / 1000.0
+            intervals = np.diff(seconds)
+            avg_interval = intervals.mean()
+            if avg_interval <= 0 or avg_interval > time_threshold:
+                continue
+            if intervals.std() / avg_interval > _BEACON_MAX_INTERVAL_CV:
+                continue
+
+            # Bin arrivals at a fraction of the mean interval so the signal
+            # length tracks the connection count, not the time span
+            resolution = max(1.0, avg_interval / _BEACON_BINS_PER_INTERVAL)
+            signal = np.bincount(((seconds - seconds[0]) // resolution).astype(np.int64)).astype(float)
+            power = np.abs(np.fft.rfft(signal - signal.mean())) ** 2
+            if len(power) < 2 or not power[1:].mean():
+                continue
+            periodicity = float(power[1:].max() / power[1:].mean())
+            if periodicity < _BEACON_MIN_PEAK_RATIO:
+                continue
+
+            beaconing_patterns.append({
+                'host': host,
+                'destination_ip': destination_ip,
+                # Ports read back as floats when any row lacked one
+                'destination_port': (
+                    int(destination_port)
+                    if isinstance(destination_port, float) and destination_port.is_integer()
+                    else destination_port
+                ),
+                'avg_interval': float(avg_interval),
+                'connection_count': int(len(seconds)),
+                'periodicity_score': periodicity
+            })
+
+        beaconing_patterns.sort(key=lambda pattern: pattern['periodicity_score'], reverse=True)
         return beaconing_patterns
 
     def detect_data_exfiltration(
@@ -223,66 +549,107 @@ class ThreatHuntingEngine:
         # Implementation would analyze network traffic for large data transfers
         return exfiltration_events
 
-    def build_network_graph(self, network_events: List[Dict]) -> nx.DiGraph:
-        """Build network graph of host-to-host communications"""
-        G = nx.DiGraph()
-        # Implementation would build graph from network events
-        return G
+    def build_network_graph(self, network_events: List[Dict]) -> 'NetworkGraph':
+        """
+        Build network graph of host-to-host communications
+
+        Each event contributes a host -> destination_ip edge; repeated
+        connections are summed into the edge weight.
+        """
+        import numpy as np
+        import pandas as pd
+        from scipy import sparse
+
+        df = pd.DataFrame(network_events).reindex(columns=['host', 'destination_ip', 'protocol'])
+        df = df.dropna(subset=['host', 'destination_ip'])
+
+        codes, nodes = pd.factorize(
+            pd.concat([df['host'], df['destination_ip']], ignore_index=True)
+        )
+        n_edges = len(df)
+        src, dst = codes[:n_edges], codes[n_edges:]
+        matrix = sparse.coo_matrix(
+            (np.ones(n_edges), (src, dst)),
+            shape=(len(nodes), len(nodes))
+        ).tocsr()
+
+        # Most common protocol per source host
+        protocols = (
+            df.assign(src=src)
+            .dropna(subset=['protocol'])
+            .groupby('src')['protocol']
+            .agg(lambda values: values.value_counts().index[0])
+        )
+
+        return NetworkGraph(
+            matrix,
+            list(nodes),
+            protocols={nodes[code]: protocol for code, protocol in protocols.items()}
+        )
 
     def detect_lateral_movement(
         self,
-        graph: nx.DiGraph,
+        graph: 'NetworkGraph',
         min_connections: int = 3,
         time_window_hours: int = 1
     ) -> List[Dict]:
-        """Detect lateral movement patterns"""
+        """Detect hosts fanning out to many other hosts (lateral movement patterns)"""
+        import numpy as np
+        from scipy.sparse import csgraph
+
+        if not isinstance(graph, NetworkGraph):
+            graph = NetworkGraph.from_networkx(graph)
+
+        matrix = graph.matrix
+        fan_out = graph.out_degree()
         lateral_movement_patterns = []
-        # Implementation would analyze graph for lateral movement patterns
+
+        for index in np.flatnonzero(fan_out >= min_connections):
+            targets = matrix.indices[matrix.indptr[index]:matrix.indptr[index + 1]]
+            # Hosts reachable through any number of hops, not just direct targets
+            reachable = csgraph.breadth_first_order(
+                matrix, index, directed=True, return_predecessors=False
+            )
+            host = graph.nodes[index]
+            direct = int(fan_out[index])
+            indirect = len(reachable) - 1 - direct
+            lateral_movement_patterns.append({
+                'source_host': host,
+                'target_hosts': [graph.nodes[target] for target in targets],
+                'reachable_host_count': direct + indirect,
+                'protocol': graph.protocols.get(host, 'unknown'),
+                'risk_score': min(10, 3 + direct // 2 + indirect // 5)
+            })
+
+        lateral_movement_patterns.sort(key=lambda pattern: pattern['risk_score'], reverse=True)
         return lateral_movement_patterns
 
     async def generate_hunting_hypotheses(self, findings: Dict) -> List[Dict]:
         """Generate AI-powered threat hunting hypotheses"""
-        prompt = f"""As a security threat hunter, analyze these findings and generate specific, actionable threat hunting hypotheses:
-
-Findings:
-{json.dumps(findings, indent=2, default=str)[:3000]}
+        # Shrink the findings until their compact JSON fits the prompt budget,
+        # rather than cutting the serialized text mid-document
+        max_items = _PROMPT_MAX_ITEMS
+        findings_json = _dumps_compact(_summarize_for_prompt(findings, max_items))
+        while len(findings_json) > _PROMPT_FINDINGS_BUDGET and max_items > 1:
+            max_items //= 2
+            findings_json = _dumps_compact(_summarize_for_prompt(findings, max_items))
+        findings_json = findings_json[:_PROMPT_FINDINGS_BUDGET].decode('utf-8', 'replace')
 
-Generate 3-5 specific threat hunting hypotheses, each with:
-1. A clear title
-2. Priority level (High, Medium, Low)
-3. Relevant MITRE ATT&CK tactics
-4. Detailed description of what to look for
-5. Step-by-step hunting approach
-6. Expected indicators if hypothesis is confirmed
-
-Format as JSON array:
-[
-    {{
-        "title": "Hypothesis title",
-        "priority": "High",
-        "mitre_tactics": ["Initial Access", "Persistence"],
-        "description": "What we're hunting for",
-        "hunting_steps": ["Step 1", "Step 2"],
-        "expected_indicators": ["Indicator 1", "Indicator 2"]
-    }}
-]"""
+        prompt = f"Findings:\n{findings_json}"
 
         try:
-            response = self.anthropic.messages.create(
+            async with self.anthropic.messages.stream(
                 model="claude-sonnet-4-20250514",
                 max_tokens=3000,
+                system=_cached_system(_HYPOTHESIS_SYSTEM_PROMPT),
                 messages=[{"role": "user", "content": prompt}]
-            )
-
-            response_text = response.content[0].text
-            json_start = response_text.find('[')
-            json_end = response_text.rfind(']') + 1
-
-            if json_start >= 0 and json_end > json_start:
-                hypotheses = json.loads(response_text[json_start:json_end])
-                return hypotheses
-            else:
+            ) as stream:
+                response_text = await stream.get_final_text()
+            hypotheses = _first_json_array(response_text)
+            if hypotheses is None:
+                logger.warning("No JSON hypothesis list in model response; using defaults")
                 return self._default_hypotheses()
+            return hypotheses
 
         except Exception as e:
             logger.error(f"Error generating hypotheses: {e}")
@@ -325,29 +692,19 @@ Format as JSON array:
         # Implementation would execute the hunt based on hypothesis
         # For now, return mock results
 
-        prompt = f"""Based on this hunting hypothesis and available data, provide:
-1. A summary of findings
-2. Recommended next actions
-
-Hypothesis: {hypothesis.get('title')}
-Description: {hypothesis.get('description')}
-
-Provide response in this format:
-SUMMARY: [your summary]
-
-ACTIONS:
-- [action 1]
-- [action 2]
-"""
+        prompt = (
+            f"Hypothesis: {hypothesis.get('title')}\n"
+            f"Description: {hypothesis.get('description')}"
+        )
 
         try:
-            response = self.anthropic.messages.create(
+            async with self.anthropic.messages.stream(
                 model="claude-sonnet-4-20250514",
                 max_tokens=1000,
+                system=_cached_system(_HUNT_SYSTEM_PROMPT),
                 messages=[{"role": "user", "content": prompt}]
-            )
-
-            response_text = response.content[0].text
+            ) as stream:
+                response_text = await stream.get_final_text()
 
             # Parse summary and actions
             if "SUMMARY:" in response_text:
@@ -369,27 +726,42 @@ ACTIONS:
 
         return results
 
+    async def execute_hunts(
+        self,
+        hypotheses: List[Dict],
+        data_sources: Dict,
+        max_parallel: int = 5
+    ) -> List[Dict]:
+        """
+        Execute several hunting hypotheses concurrently
+
+        Args:
+            hypotheses: Hypotheses from generate_hunting_hypotheses
+            data_sources: Collected data passed to each execute_hunt call
+            max_parallel: Most hunts (and model calls) in flight at once
+
+        Returns:
+            Hunt results, in the same order as hypotheses
+        """
+        semaphore = asyncio.Semaphore(max_parallel)
+
+        async def run(hypothesis: Dict) -> Dict:
+            async with semaphore:
+                return await self.execute_hunt(hypothesis, data_sources)
+
+        return await asyncio.gather(*(run(hypothesis) for hypothesis in hypotheses))
+
     def map_to_mitre_attack(self, findings: Dict) -> Dict:
         """Map findings to MITRE ATT&CK framework"""
-        mitre_mapping = {
-            'Initial Access': [],
-            'Execution': [],
-            'Persistence': [],
-            'Privilege Escalation': [],
-            'Defense Evasion': [],
-            'Credential Access': [],
-            'Discovery': [],
-            'Lateral Movement': [],
-            'Collection': [],
-            'Exfiltration': [],
-            'Command and Control': []
-        }
+        mitre_mapping = {tactic: [] for tactic in _MITRE_TACTICS}
 
         # Implementation would map findings to techniques
         return mitre_mapping
 
     def create_mitre_heatmap_data(self, mitre_mapping: Dict) -> pd.DataFrame:
         """Create dataframe for MITRE ATT&CK heatmap visualization"""
+        import pandas as pd
+
         # Create empty dataframe for demonstration
         return pd.DataFrame()
 
@@ -403,7 +775,7 @@ ACTIONS:
         mitre_mapping: Dict
     ) -> Dict:
         """Generate comprehensive threat hunting report"""
-        report = f"""# Threat Hunting Report
+        parts = [f"""# Threat Hunting Report
 
 ## Hunting Period
 {hunt_period}
@@ -422,17 +794,16 @@ This report summarizes proactive threat hunting activities and findings.
 
 ## MITRE ATT&CK Coverage
 The following tactics were observed during this hunting period:
-"""
+"""]
+        # Collect sections and join once rather than re-copying the report per line
         for tactic, techniques in mitre_mapping.items():
             if techniques:
-                report += f"\n### {tactic}\n"
-                for technique in techniques:
-                    report += f"- {technique.get('name', 'Unknown')}\n"
+                parts.append(f"\n### {tactic}\n")
+                parts.extend(f"- {technique.get('name', 'Unknown')}\n" for technique in techniques)
 
-        report += "\n## Recommendations\n"
-        for action in hunt_results.get('recommended_actions', []):
-            report += f"- {action}\n"
+        parts.append("\n## Recommendations\n")
+        parts.extend(f"- {action}\n" for action in hunt_results.get('recommended_actions', []))
 
         return {
-            'content': report
+            'content': ''.join(parts)
         }
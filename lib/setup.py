@@ -9,13 +9,18 @@ setup(
     install_requires=[
         "anthropic>=0.18.0",
         "boto3>=1.34.0",
+        "aws-secretsmanager-caching>=1.1.1",
         "crowdstrike-falconpy>=1.3.0",
         "azure-identity>=1.15.0",
         "msgraph-sdk>=1.1.0",
         "requests>=2.31.0",
+        "httpx[http2]>=0.25.0",
+        "aiolimiter>=1.1.0",
         "pandas>=2.0.0",
         "numpy>=1.24.0",
         "networkx>=3.1",
+        "scipy>=1.11.0",
+        "orjson>=3.9.0",
     ],
     python_requires=">=3.10",
 )
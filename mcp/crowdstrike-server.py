@@ -5,13 +5,20 @@ Provides security event detection, threat hunting, and incident response capabil
 """
 
 import asyncio
-import json
+import functools
+import hashlib
+import inspect
 import logging
-from datetime import datetime, timedelta
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
 from typing import Any, Optional
 
+import aiohttp
 import boto3
-from falconpy import Detects, Hosts, Incidents, Intel, SpotlightVulnerabilities
+import orjson
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Resource, Tool, TextContent
@@ -21,37 +28,567 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("crowdstrike-mcp-server")
 
 
+# Falcon API connection pool and timeouts
+FALCON_CONNECTION_LIMIT = 64
+FALCON_CONNECTION_LIMIT_PER_HOST = 32
+FALCON_KEEPALIVE_SECONDS = 60
+FALCON_REQUEST_TIMEOUT_SECONDS = float(os.environ.get("CROWDSTRIKE_TIMEOUT", "30"))
+FALCON_CONNECT_TIMEOUT_SECONDS = 5
+
+# Falcon API calls allowed in flight at once across all tool calls. The
+# limit starts here and adapts between the bounds from observed latency
+MAX_INFLIGHT_REQUESTS = int(os.environ.get("CROWDSTRIKE_MAX_INFLIGHT", "16"))
+MIN_CONCURRENCY = 2
+MAX_CONCURRENCY = 64
+TARGET_LATENCY_SECONDS = 0.5
+LATENCY_WINDOW = 32
+CONCURRENCY_INCREASE = 0.5
+CONCURRENCY_DECREASE = 0.5
+
+# Responses meaning Falcon is overloaded; each one cuts the concurrency limit
+OVERLOAD_STATUSES = frozenset((429, 502, 503))
+
+# Falcon API calls allowed per minute across every endpoint. Falcon's limit
+# applies to the API client as a whole, so one bucket paces all requests and a
+# cold burst of batched requests is queued here rather than rejected
+FALCON_REQUESTS_PER_MINUTE = int(os.environ.get("CROWDSTRIKE_REQUESTS_PER_MINUTE", "6000"))
+
+# Pause new requests when X-RateLimit-Remaining drops to this share of
+# X-RateLimit-Limit (or this many calls), before Falcon starts returning 429s
+RATE_LIMIT_LOW_FRACTION = 0.1
+RATE_LIMIT_LOW_REMAINING = 2
+RATE_LIMIT_MIN_PAUSE_SECONDS = 1.0
+
+# Retries for transient failures: attempts in total, and the backoff base and cap
+RETRY_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 30.0
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# Response cache: entries kept per lookup, and seconds each kind of result stays fresh
+RESPONSE_CACHE_SIZE = 512
+ALERT_CACHE_TTL = 60
+HOST_CACHE_TTL = 300
+VULNERABILITY_CACHE_TTL = 300
+INTEL_CACHE_TTL = 3600
+
+# IDs per entity-details request; larger ID lists are fetched in concurrent batches
+DETAILS_BATCH_SIZE = 100
+
+# IDs per query page when paginating; within every query endpoint's maximum
+QUERY_PAGE_SIZE = 400
+
+# Falcon API operations used by the tools (falconpy operation name -> method, path)
+ENDPOINTS = {
+    "query_detects": ("GET", "/detects/queries/detects/v1"),
+    "get_detect_summaries": ("POST", "/detects/entities/summaries/GET/v1"),
+    "query_devices_by_filter": ("GET", "/devices/queries/devices/v1"),
+    "get_device_details": ("POST", "/devices/entities/devices/v2"),
+    "query_incidents": ("GET", "/incidents/queries/incidents/v1"),
+    "get_incidents": ("POST", "/incidents/entities/incidents/GET/v1"),
+    "query_indicator_entities": ("GET", "/intel/combined/indicators/v1"),
+    "query_vulnerabilities": ("GET", "/spotlight/queries/vulnerabilities/v1"),
+    "get_vulnerabilities": ("GET", "/spotlight/entities/vulnerabilities/v2"),
+}
+
+# Refresh the OAuth2 token this long before Falcon says it expires
+TOKEN_REFRESH_MARGIN_SECONDS = 60
+
+# Re-read the API credentials this often so secret rotations are picked up
+CREDENTIAL_REFRESH_SECONDS = 300
+
+
+# Hit/miss counters per cached lookup, served by the crowdstrike://debug/cache resource
+_cache_stats: dict = {}
+
+
+def async_lru_ttl(maxsize: int, ttl: float):
+    """
+    Cache an async lookup's results in memory for ttl seconds, evicting LRU entries
+
+    Keys are SHA-256 digests of the call arguments after binding them to the
+    signature with defaults applied, so get_detections() and
+    get_detections(limit=100) share an entry, and raw indicators and
+    hostnames are not kept as cache keys. Concurrent calls that miss on the
+    same key share one in-flight lookup. Results carrying "error" or
+    "errors" are never cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        entries = OrderedDict()
+        # Key -> lookup in progress, shared by concurrent identical calls
+        pending = {}
+        stats = _cache_stats.setdefault(func.__name__, {"hits": 0, "misses": 0, "size": 0})
+
+        async def fill(key: str, self, args: tuple, kwargs: dict):
+            try:
+                result = await func(self, *args, **kwargs)
+                if "error" in result or "errors" in result:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = (time.monotonic() + ttl, result)
+                    entries.move_to_end(key)
+                    if len(entries) > maxsize:
+                        entries.popitem(last=False)
+                stats["size"] = len(entries)
+                return result
+            finally:
+                pending.pop(key, None)
+
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = hashlib.sha256(
+                orjson.dumps(list(bound.arguments.values())[1:], default=str)
+            ).hexdigest()
+            entry = entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                entries.move_to_end(key)
+                stats["hits"] += 1
+                return entry[1]
+
+            task = pending.get(key)
+            if task is None:
+                stats["misses"] += 1
+                task = pending[key] = asyncio.create_task(fill(key, self, args, kwargs))
+            else:
+                stats["hits"] += 1
+            # Shielded so one caller giving up does not cancel the lookup for the others
+            return await asyncio.shield(task)
+        return wrapper
+    return decorator
+
+
+@functools.lru_cache(maxsize=256)
+def _build_filter(*predicates: tuple) -> Optional[str]:
+    """
+    Build an FQL filter from (field and operator, value) pairs, skipping unset values
+
+    Values are quoted with backslashes and apostrophes escaped, so a hostname
+    or indicator containing a quote cannot change the filter.
+
+    Args:
+        predicates: Pairs such as ("first_behavior:>=", "2024-01-01T00:00:00Z")
+
+    Returns:
+        Predicates joined with '+', or None if every value is unset
+    """
+    filter_str = "+".join(
+        "{}'{}'".format(field, str(value).replace("\\", "\\\\").replace("'", "\\'"))
+        for field, value in predicates
+        if value
+    )
+    return filter_str or None
+
+
+@functools.lru_cache(maxsize=None)
+def _secrets_client():
+    """Return the process-wide Secrets Manager client, created on first use"""
+    return boto3.client('secretsmanager')
+
+
+def _params(**params) -> dict:
+    """Drop unset query parameters; aiohttp rejects None values"""
+    return {key: value for key, value in params.items() if value is not None}
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive-increase / multiplicative-decrease control
+
+    While the mean latency over the last LATENCY_WINDOW calls stays at or
+    under the target, each call raises the limit by CONCURRENCY_INCREASE.
+    A slow window, a throttling response or a dropped connection multiplies
+    it by CONCURRENCY_DECREASE. The window is cleared after each decrease, so
+    one slow stretch is only penalised once.
+    """
+
+    def __init__(self, initial: int):
+        self.limit = float(min(MAX_CONCURRENCY, max(MIN_CONCURRENCY, initial)))
+        self._in_flight = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self._in_flight -= 1
+            # The limit may have grown since the waiters queued
+            self._condition.notify(max(1, int(self.limit) - self._in_flight))
+
+    def record(self, latency: float, overloaded: bool = False):
+        """Adjust the limit from one finished call"""
+        if overloaded:
+            self._decrease()
+            return
+        self._latencies.append(latency)
+        if len(self._latencies) < LATENCY_WINDOW:
+            return
+        if sum(self._latencies) / LATENCY_WINDOW <= TARGET_LATENCY_SECONDS:
+            self.limit = min(MAX_CONCURRENCY, self.limit + CONCURRENCY_INCREASE)
+        else:
+            self._decrease()
+
+    def _decrease(self):
+        self.limit = max(MIN_CONCURRENCY, self.limit * CONCURRENCY_DECREASE)
+        self._latencies.clear()
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: steady rate_per_second with bursts of up to burst calls"""
+
+    def __init__(self, rate_per_second: float, burst: float):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    async def acquire(self):
+        """Take one token, waiting until the bucket has refilled enough"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        # Reserve the token now; a negative balance is the wait owed, so
+        # concurrent callers queue behind each other in arrival order
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+def _retry_after(headers, default: float) -> float:
+    """Seconds to wait from a Retry-After header, capped, or default if absent"""
+    try:
+        return min(RETRY_MAX_SECONDS, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
+
+
+def _timeout_response(method: str, path: str) -> dict:
+    """Falcon-shaped error response for a request that ran out of time"""
+    message = f"{method} {path} timed out after {FALCON_REQUEST_TIMEOUT_SECONDS:g}s"
+    logger.error(message)
+    return {"status_code": 504, "headers": {}, "body": {"errors": [{"code": 504, "message": message}]}}
+
+
+def _decode_body(status: int, raw: bytes) -> dict:
+    """
+    Decode a Falcon response body
+
+    A body that is not JSON, such as the HTML page a load balancer sends with
+    a 502 or 503, becomes a Falcon-shaped error carrying the status, so retry
+    and overload handling still see the response.
+    """
+    try:
+        return (orjson.loads(raw) if raw else None) or {}
+    except orjson.JSONDecodeError:
+        message = raw.decode(errors="replace").strip()[:200] or f"HTTP {status}"
+        return {"errors": [{"code": status, "message": message}]}
+
+
+def _with_errors(result: dict, errors: list) -> dict:
+    """Attach errors from failed detail batches to an otherwise successful result"""
+    if errors:
+        result["errors"] = errors
+    return result
+
+
 class CrowdStrikeClient:
-    """CrowdStrike Falcon API client wrapper"""
+    """CrowdStrike Falcon REST API client using one pooled aiohttp session"""
+
+    BASE_URL = "https://api.crowdstrike.com"
 
     def __init__(self):
         self.client_id = None
         self.client_secret = None
-        self._load_credentials()
-
-        # Initialize Falcon API clients
-        self.detects = Detects(client_id=self.client_id, client_secret=self.client_secret)
-        self.hosts = Hosts(client_id=self.client_id, client_secret=self.client_secret)
-        self.incidents = Incidents(client_id=self.client_id, client_secret=self.client_secret)
-        self.intel = Intel(client_id=self.client_id, client_secret=self.client_secret)
-        self.vulnerabilities = SpotlightVulnerabilities(
-            client_id=self.client_id,
-            client_secret=self.client_secret
-        )
-
-    def _load_credentials(self):
+        self.base_url = self.BASE_URL
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._warmup: Optional[asyncio.Task] = None
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._credentials_expire_at = 0.0
+        self._token_lock = asyncio.Lock()
+        self._limiter = AdaptiveLimiter(MAX_INFLIGHT_REQUESTS)
+        self._pause_until = 0.0
+        self._bucket = TokenBucket(FALCON_REQUESTS_PER_MINUTE / 60, max(1.0, FALCON_REQUESTS_PER_MINUTE / 60))
+
+    async def connect(self):
+        """Open the pooled HTTP session used for every Falcon API call"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=FALCON_CONNECTION_LIMIT,
+                    limit_per_host=FALCON_CONNECTION_LIMIT_PER_HOST,
+                    keepalive_timeout=FALCON_KEEPALIVE_SECONDS
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=FALCON_REQUEST_TIMEOUT_SECONDS,
+                    connect=FALCON_CONNECT_TIMEOUT_SECONDS
+                )
+            )
+
+    async def init(self):
+        """
+        Load credentials and fetch a token ahead of the first tool call
+
+        Failures are logged rather than raised; ensure_auth tries again when
+        a tool first needs the API.
+        """
+        try:
+            await self.ensure_auth()
+        except Exception as e:
+            logger.warning(f"CrowdStrike authentication deferred to first call: {e}")
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections"""
+        if self._warmup is not None:
+            self._warmup.cancel()
+            self._warmup = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "CrowdStrikeClient":
+        """Open the session and authenticate in the background while the caller starts up"""
+        await self.connect()
+        self._warmup = asyncio.create_task(self.init())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def ensure_auth(self) -> str:
+        """
+        Return a valid OAuth2 bearer token
+
+        Credentials are loaded from Secrets Manager on first use rather than at
+        startup and re-read every CREDENTIAL_REFRESH_SECONDS; the token is
+        refreshed shortly before it expires or when the credentials change.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._token_lock:
+            if self.client_id is None or loop.time() >= self._credentials_expire_at:
+                # boto3 blocks; keep the event loop serving while AWS responds
+                try:
+                    await loop.run_in_executor(None, self._sync_load_credentials)
+                except Exception:
+                    if self.client_id is None:
+                        raise
+                    logger.warning("Keeping previous CrowdStrike credentials after refresh failed")
+                self._credentials_expire_at = loop.time() + CREDENTIAL_REFRESH_SECONDS
+            if self._token is None or loop.time() >= self._token_expires_at:
+                async with self._session.post(
+                    f"{self.base_url}/oauth2/token",
+                    data={"client_id": self.client_id, "client_secret": self.client_secret}
+                ) as response:
+                    response.raise_for_status()
+                    token = await response.json()
+                self._token = token["access_token"]
+                self._token_expires_at = (
+                    loop.time() + token.get("expires_in", 1800) - TOKEN_REFRESH_MARGIN_SECONDS
+                )
+            return self._token
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        json: Optional[dict] = None
+    ) -> dict:
+        """
+        Call a Falcon API endpoint
+
+        Returns a dict shaped like a falconpy response: status_code, headers
+        and the decoded JSON body (resources, errors, meta).
+        """
+        if self._session is None:
+            await self.connect()
+        headers = {"Authorization": f"Bearer {await self.ensure_auth()}"}
+        pause = self._pause_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        await self._bucket.acquire()
+        loop = asyncio.get_running_loop()
+        # Each call holds its slot only until its own response is read, so a
+        # finished request admits the next one without waiting on its batch
+        async with self._limiter:
+            started = loop.time()
+            try:
+                async with self._session.request(
+                    method, f"{self.base_url}{path}", params=params, json=json, headers=headers
+                ) as response:
+                    body = _decode_body(response.status, await response.read())
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                self._limiter.record(loop.time() - started, overloaded=True)
+                raise
+            self._limiter.record(
+                loop.time() - started, overloaded=response.status in OVERLOAD_STATUSES
+            )
+            self._check_rate_limit(response.headers)
+            if response.status == 401:
+                # Token revoked or expired early; fetch a new one next call
+                self._token = None
+            return {"status_code": response.status, "headers": response.headers, "body": body}
+
+    def _check_rate_limit(self, headers):
+        """Pause new requests when Falcon reports the rate limit is nearly used up"""
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+        except (KeyError, ValueError):
+            return
+        if limit > 0 and (remaining <= RATE_LIMIT_LOW_REMAINING or remaining / limit < RATE_LIMIT_LOW_FRACTION):
+            pause = max(RATE_LIMIT_MIN_PAUSE_SECONDS, 60 / limit)
+            self._pause_until = max(self._pause_until, time.monotonic() + pause)
+            logger.warning(f"Falcon rate limit low ({remaining}/{limit} left); pausing requests for {pause:.1f}s")
+
+    async def _request_with_retry(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        json: Optional[dict] = None
+    ) -> dict:
+        """
+        Call a Falcon API endpoint, retrying throttling, 5xx and connection errors
+
+        Waits honour Retry-After when Falcon sends it, and otherwise back off
+        exponentially with jitter. The last attempt's response or error is
+        returned or raised as-is.
+        """
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1) + random.random())
+            try:
+                response = await self._request(method, path, params=params, json=json)
+            except asyncio.TimeoutError:
+                if attempt == RETRY_ATTEMPTS:
+                    return _timeout_response(method, path)
+                delay = backoff
+                logger.warning(f"{method} {path} timed out; retrying in {delay:.1f}s")
+            except aiohttp.ClientConnectionError as e:
+                if attempt == RETRY_ATTEMPTS:
+                    raise
+                delay = backoff
+                logger.warning(f"{method} {path} failed ({e}); retrying in {delay:.1f}s")
+            else:
+                status = response['status_code']
+                if status not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS:
+                    return response
+                delay = _retry_after(response['headers'], backoff)
+                logger.warning(f"{method} {path} returned {status}; retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _get_details(self, method: str, path: str, ids: list) -> dict:
+        """
+        Fetch entity details for ids, batching them into concurrent requests
+
+        Returns the combined resources and any errors; a failed batch does
+        not discard the batches that succeeded.
+        """
+        batches = [ids[i:i + DETAILS_BATCH_SIZE] for i in range(0, len(ids), DETAILS_BATCH_SIZE)]
+        if method == "GET":
+            requests = (self._request_with_retry(method, path, params={"ids": batch}) for batch in batches)
+        else:
+            requests = (self._request_with_retry(method, path, json={"ids": batch}) for batch in batches)
+        responses = await asyncio.gather(*requests, return_exceptions=True)
+
+        resources, errors = [], []
+        for response in responses:
+            if isinstance(response, Exception):
+                logger.error(f"Error fetching {path}: {response}")
+                errors.append(str(response))
+            elif response['status_code'] != 200:
+                errors.extend(response['body'].get('errors') or [])
+            else:
+                resources.extend(response['body'].get('resources') or [])
+        return {"resources": resources, "errors": errors}
+
+    async def _query_with_details(
+        self,
+        query: str,
+        details: str,
+        params: dict,
+        total: int
+    ) -> dict:
+        """
+        Page through an ID query and fetch the details for up to total IDs
+
+        Each page's details are fetched in a background task while the next
+        page is queried, so the two round trips overlap. Offset pagination
+        and Spotlight's "after" cursor are both followed.
+
+        Args:
+            query: ENDPOINTS name of the ID query
+            details: ENDPOINTS name of the details lookup
+            params: Query parameters (filter, sort) shared by every page
+            total: Most IDs to fetch
+
+        Returns:
+            Dict with resources and errors, or with error if the first page failed
+        """
+        detail_tasks = []
+        errors = []
+        fetched = 0
+        after = None
+        try:
+            while fetched < total:
+                page_params = dict(params, limit=min(QUERY_PAGE_SIZE, total - fetched))
+                if after:
+                    page_params["after"] = after
+                elif fetched:
+                    page_params["offset"] = fetched
+
+                response = await self._request_with_retry(*ENDPOINTS[query], params=page_params)
+                if response['status_code'] != 200:
+                    if not detail_tasks:
+                        return {"error": response['body'].get('errors')}
+                    errors.extend(response['body'].get('errors') or [])
+                    break
+
+                ids = response['body'].get('resources') or []
+                if not ids:
+                    break
+                detail_tasks.append(asyncio.create_task(self._get_details(*ENDPOINTS[details], ids)))
+                fetched += len(ids)
+
+                pagination = (response['body'].get('meta') or {}).get('pagination') or {}
+                after = pagination.get('after')
+                if not after and fetched >= pagination.get('total', fetched):
+                    break
+
+            resources = []
+            for page in await asyncio.gather(*detail_tasks):
+                resources.extend(page['resources'])
+                errors.extend(page['errors'])
+            return {"resources": resources, "errors": errors}
+        except BaseException:
+            for task in detail_tasks:
+                task.cancel()
+            raise
+
+    def _sync_load_credentials(self):
         """Load CrowdStrike credentials from AWS Secrets Manager"""
         try:
-            secrets_client = boto3.client('secretsmanager')
-            secret = secrets_client.get_secret_value(SecretId='crowdstrike/api-credentials')
-            creds = json.loads(secret['SecretString'])
+            secret = _secrets_client().get_secret_value(SecretId='crowdstrike/api-credentials')
+            creds = orjson.loads(secret['SecretString'])
+            if (creds['client_id'], creds['client_secret']) != (self.client_id, self.client_secret):
+                # Rotated (or first) credentials need a new token
+                self._token = None
             self.client_id = creds['client_id']
             self.client_secret = creds['client_secret']
+            self.base_url = creds.get('base_url', self.BASE_URL)
             logger.info("Successfully loaded CrowdStrike credentials")
         except Exception as e:
             logger.error(f"Failed to load credentials: {e}")
             raise
 
+    @async_lru_ttl(maxsize=RESPONSE_CACHE_SIZE, ttl=ALERT_CACHE_TTL)
     async def get_detections(
         self,
         start_time: Optional[str] = None,
@@ -60,47 +597,36 @@ class CrowdStrikeClient:
     ) -> dict:
         """Get security detections from CrowdStrike"""
         try:
-            # Build filter
-            filters = []
-            if start_time:
-                filters.append(f"first_behavior:>='{start_time}'")
-            if severity:
-                filters.append(f"max_severity_displayname:'{severity}'")
-
-            filter_str = "+".join(filters) if filters else None
-
-            # Query detection IDs
-            response = self.detects.query_detects(
-                filter=filter_str,
-                limit=limit,
-                sort="first_behavior.desc"
+            filter_str = _build_filter(
+                ("first_behavior:>=", start_time),
+                ("max_severity_displayname:", severity)
             )
 
-            if response['status_code'] != 200:
-                return {"error": response['body']['errors']}
-
-            detection_ids = response['body']['resources']
-
-            if not detection_ids:
-                return {"detections": [], "count": 0}
-
-            # Get detection details
-            details = self.detects.get_detect_summaries(ids=detection_ids)
+            details = await self._query_with_details(
+                "query_detects",
+                "get_detect_summaries",
+                _params(filter=filter_str, sort="first_behavior.desc"),
+                limit
+            )
+            if "error" in details:
+                return details
 
-            return {
-                "detections": details['body']['resources'],
-                "count": len(details['body']['resources'])
-            }
+            return _with_errors({
+                "detections": details['resources'],
+                "count": len(details['resources'])
+            }, details['errors'])
         except Exception as e:
             logger.error(f"Error getting detections: {e}")
             return {"error": str(e)}
 
+    @async_lru_ttl(maxsize=RESPONSE_CACHE_SIZE, ttl=HOST_CACHE_TTL)
     async def get_host_info(self, hostname: str) -> dict:
         """Get detailed information about a host"""
         try:
             # Search for host
-            query_response = self.hosts.query_devices_by_filter(
-                filter=f"hostname:'{hostname}'"
+            query_response = await self._request_with_retry(
+                *ENDPOINTS["query_devices_by_filter"],
+                params={"filter": _build_filter(("hostname:", hostname))}
             )
 
             if query_response['status_code'] != 200:
@@ -112,7 +638,9 @@ class CrowdStrikeClient:
                 return {"error": f"Host '{hostname}' not found"}
 
             # Get host details
-            details = self.hosts.get_device_details(ids=device_ids)
+            details = await self._request_with_retry(
+                *ENDPOINTS["get_device_details"], json={"ids": device_ids}
+            )
 
             return {
                 "host": details['body']['resources'][0],
@@ -122,6 +650,7 @@ class CrowdStrikeClient:
             logger.error(f"Error getting host info: {e}")
             return {"error": str(e)}
 
+    @async_lru_ttl(maxsize=RESPONSE_CACHE_SIZE, ttl=ALERT_CACHE_TTL)
     async def get_incidents(
         self,
         start_time: Optional[str] = None,
@@ -130,45 +659,32 @@ class CrowdStrikeClient:
     ) -> dict:
         """Get security incidents"""
         try:
-            filters = []
-            if start_time:
-                filters.append(f"start:>='{start_time}'")
-            if status:
-                filters.append(f"status:'{status}'")
-
-            filter_str = "+".join(filters) if filters else None
-
-            # Query incident IDs
-            response = self.incidents.query_incidents(
-                filter=filter_str,
-                limit=limit,
-                sort="start.desc"
-            )
-
-            if response['status_code'] != 200:
-                return {"error": response['body']['errors']}
-
-            incident_ids = response['body']['resources']
+            filter_str = _build_filter(("start:>=", start_time), ("status:", status))
 
-            if not incident_ids:
-                return {"incidents": [], "count": 0}
-
-            # Get incident details
-            details = self.incidents.get_incidents(ids=incident_ids)
+            details = await self._query_with_details(
+                "query_incidents",
+                "get_incidents",
+                _params(filter=filter_str, sort="start.desc"),
+                limit
+            )
+            if "error" in details:
+                return details
 
-            return {
-                "incidents": details['body']['resources'],
-                "count": len(details['body']['resources'])
-            }
+            return _with_errors({
+                "incidents": details['resources'],
+                "count": len(details['resources'])
+            }, details['errors'])
         except Exception as e:
             logger.error(f"Error getting incidents: {e}")
             return {"error": str(e)}
 
+    @async_lru_ttl(maxsize=RESPONSE_CACHE_SIZE, ttl=INTEL_CACHE_TTL)
     async def get_threat_intel(self, indicator: str, indicator_type: str) -> dict:
         """Get threat intelligence for an indicator"""
         try:
-            response = self.intel.query_indicator_entities(
-                filter=f"indicator:'{indicator}'+type:'{indicator_type}'"
+            response = await self._request_with_retry(
+                *ENDPOINTS["query_indicator_entities"],
+                params={"filter": _build_filter(("indicator:", indicator), ("type:", indicator_type))}
             )
 
             if response['status_code'] != 200:
@@ -182,34 +698,49 @@ class CrowdStrikeClient:
             logger.error(f"Error getting threat intel: {e}")
             return {"error": str(e)}
 
-    async def get_vulnerabilities(self, hostname: Optional[str] = None) -> dict:
+    @async_lru_ttl(maxsize=RESPONSE_CACHE_SIZE, ttl=VULNERABILITY_CACHE_TTL)
+    async def get_vulnerabilities(self, hostname: Optional[str] = None, limit: int = 100) -> dict:
         """Get vulnerability information"""
         try:
-            filter_str = f"host.hostname:'{hostname}'" if hostname else None
+            filter_str = _build_filter(("host.hostname:", hostname))
 
-            response = self.vulnerabilities.query_vulnerabilities(
-                filter=filter_str,
-                limit=100
+            details = await self._query_with_details(
+                "query_vulnerabilities",
+                "get_vulnerabilities",
+                _params(filter=filter_str),
+                limit
             )
+            if "error" in details:
+                return details
 
-            if response['status_code'] != 200:
-                return {"error": response['body']['errors']}
+            return _with_errors({
+                "vulnerabilities": details['resources'],
+                "count": len(details['resources'])
+            }, details['errors'])
+        except Exception as e:
+            logger.error(f"Error getting vulnerabilities: {e}")
+            return {"error": str(e)}
 
-            vuln_ids = response['body']['resources']
 
-            if not vuln_ids:
-                return {"vulnerabilities": [], "count": 0}
+# Record list in each list tool's result, for the ndjson response format
+NDJSON_RECORD_KEYS = {
+    "get_detections": "detections",
+    "get_incidents": "incidents",
+    "get_vulnerabilities": "vulnerabilities",
+}
 
-            # Get vulnerability details
-            details = self.vulnerabilities.get_vulnerabilities(ids=vuln_ids)
 
-            return {
-                "vulnerabilities": details['body']['resources'],
-                "count": len(details['body']['resources'])
-            }
-        except Exception as e:
-            logger.error(f"Error getting vulnerabilities: {e}")
-            return {"error": str(e)}
+def _format_result(name: str, result: dict, response_format: Optional[str]) -> str:
+    """
+    Serialize a tool result as pretty JSON, or as NDJSON when requested
+
+    NDJSON writes each record compactly on its own line, skipping the
+    indented copy of the whole result. Error results are always JSON.
+    """
+    records = result.get(NDJSON_RECORD_KEYS.get(name)) if response_format == "ndjson" else None
+    if records is None or "error" in result:
+        return orjson.dumps(result, default=str, option=orjson.OPT_INDENT_2).decode()
+    return b"\n".join(orjson.dumps(record, default=str) for record in records).decode()
 
 
 # Initialize MCP server
@@ -217,177 +748,242 @@ app = Server("crowdstrike-security")
 crowdstrike = CrowdStrikeClient()
 
 
+# Resources and tools never change, so they are built once at import
+RESOURCES = (
+    Resource(
+        uri="crowdstrike://detections",
+        name="Security Detections",
+        mimeType="application/json",
+        description="Real-time security detections from CrowdStrike Falcon"
+    ),
+    Resource(
+        uri="crowdstrike://incidents",
+        name="Security Incidents",
+        mimeType="application/json",
+        description="Security incidents requiring investigation"
+    ),
+    Resource(
+        uri="crowdstrike://hosts",
+        name="Host Information",
+        mimeType="application/json",
+        description="Endpoint device information and status"
+    ),
+    Resource(
+        uri="crowdstrike://vulnerabilities",
+        name="Vulnerabilities",
+        mimeType="application/json",
+        description="System vulnerabilities and exposures"
+    ),
+    Resource(
+        uri="crowdstrike://debug/cache",
+        name="Response Cache Statistics",
+        mimeType="application/json",
+        description="Hit, miss and size counters for the Falcon response cache"
+    ),
+)
+
+
 @app.list_resources()
 async def list_resources() -> list[Resource]:
     """List available CrowdStrike resources"""
-    return [
-        Resource(
-            uri="crowdstrike://detections",
-            name="Security Detections",
-            mimeType="application/json",
-            description="Real-time security detections from CrowdStrike Falcon"
-        ),
-        Resource(
-            uri="crowdstrike://incidents",
-            name="Security Incidents",
-            mimeType="application/json",
-            description="Security incidents requiring investigation"
-        ),
-        Resource(
-            uri="crowdstrike://hosts",
-            name="Host Information",
-            mimeType="application/json",
-            description="Endpoint device information and status"
-        ),
-        Resource(
-            uri="crowdstrike://vulnerabilities",
-            name="Vulnerabilities",
-            mimeType="application/json",
-            description="System vulnerabilities and exposures"
-        ),
-    ]
-
-
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available CrowdStrike tools"""
-    return [
-        Tool(
-            name="get_detections",
-            description="Get recent security detections with optional filtering",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "start_time": {
-                        "type": "string",
-                        "description": "ISO 8601 timestamp (e.g., 2024-01-01T00:00:00Z)"
-                    },
-                    "severity": {
-                        "type": "string",
-                        "enum": ["Critical", "High", "Medium", "Low"],
-                        "description": "Filter by severity level"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Maximum number of results (default: 100)",
-                        "default": 100
-                    }
+    return list(RESOURCES)
+
+
+@app.read_resource()
+async def read_resource(uri: Any) -> str:
+    """Read a CrowdStrike resource"""
+    if str(uri) == "crowdstrike://debug/cache":
+        return orjson.dumps(_cache_stats, option=orjson.OPT_INDENT_2).decode()
+    raise ValueError(f"Unknown resource: {uri}")
+
+
+TOOLS = (
+    Tool(
+        name="get_detections",
+        description="Get recent security detections with optional filtering",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "start_time": {
+                    "type": "string",
+                    "description": "ISO 8601 timestamp (e.g., 2024-01-01T00:00:00Z)"
+                },
+                "severity": {
+                    "type": "string",
+                    "enum": ["Critical", "High", "Medium", "Low"],
+                    "description": "Filter by severity level"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results (default: 100)",
+                    "default": 100
+                },
+                "format": {
+                    "type": "string",
+                    "enum": ["json", "ndjson"],
+                    "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                    "default": "json"
                 }
             }
-        ),
-        Tool(
-            name="get_host_info",
-            description="Get detailed information about a specific host",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "hostname": {
-                        "type": "string",
-                        "description": "Hostname to query"
-                    }
+        }
+    ),
+    Tool(
+        name="get_host_info",
+        description="Get detailed information about a specific host",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "hostname": {
+                    "type": "string",
+                    "description": "Hostname to query"
+                }
+            },
+            "required": ["hostname"]
+        }
+    ),
+    Tool(
+        name="get_incidents",
+        description="Get security incidents with optional filtering",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "start_time": {
+                    "type": "string",
+                    "description": "ISO 8601 timestamp"
                 },
-                "required": ["hostname"]
-            }
-        ),
-        Tool(
-            name="get_incidents",
-            description="Get security incidents with optional filtering",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "start_time": {
-                        "type": "string",
-                        "description": "ISO 8601 timestamp"
-                    },
-                    "status": {
-                        "type": "string",
-                        "enum": ["New", "In Progress", "Closed"],
-                        "description": "Filter by incident status"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Maximum number of results (default: 50)",
-                        "default": 50
-                    }
+                "status": {
+                    "type": "string",
+                    "enum": ["New", "In Progress", "Closed"],
+                    "description": "Filter by incident status"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results (default: 50)",
+                    "default": 50
+                },
+                "format": {
+                    "type": "string",
+                    "enum": ["json", "ndjson"],
+                    "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                    "default": "json"
                 }
             }
-        ),
-        Tool(
-            name="get_threat_intel",
-            description="Get threat intelligence for an indicator (IP, domain, hash, etc.)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "indicator": {
-                        "type": "string",
-                        "description": "The indicator value (IP, domain, hash, etc.)"
-                    },
-                    "indicator_type": {
-                        "type": "string",
-                        "enum": ["ip_address", "domain", "md5", "sha256", "url"],
-                        "description": "Type of indicator"
-                    }
+        }
+    ),
+    Tool(
+        name="get_threat_intel",
+        description="Get threat intelligence for an indicator (IP, domain, hash, etc.)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "indicator": {
+                    "type": "string",
+                    "description": "The indicator value (IP, domain, hash, etc.)"
                 },
-                "required": ["indicator", "indicator_type"]
-            }
-        ),
-        Tool(
-            name="get_vulnerabilities",
-            description="Get vulnerability information, optionally filtered by hostname",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "hostname": {
-                        "type": "string",
-                        "description": "Filter by specific hostname (optional)"
-                    }
+                "indicator_type": {
+                    "type": "string",
+                    "enum": ["ip_address", "domain", "md5", "sha256", "url"],
+                    "description": "Type of indicator"
+                }
+            },
+            "required": ["indicator", "indicator_type"]
+        }
+    ),
+    Tool(
+        name="get_vulnerabilities",
+        description="Get vulnerability information, optionally filtered by hostname",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "hostname": {
+                    "type": "string",
+                    "description": "Filter by specific hostname (optional)"
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of results (default: 100)",
+                    "default": 100
+                },
+                "format": {
+                    "type": "string",
+                    "enum": ["json", "ndjson"],
+                    "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                    "default": "json"
                 }
             }
-        ),
-    ]
+        }
+    ),
+)
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available CrowdStrike tools"""
+    return list(TOOLS)
+
+
+@functools.lru_cache(maxsize=256)
+def _normalize_timestamp(value: str) -> str:
+    """
+    Validate an ISO 8601 timestamp and normalize it to UTC, e.g. 2024-01-01T00:00:00Z
+
+    Timestamps without an offset are taken as UTC. Raises ValueError for
+    anything that is not ISO 8601, before a request is sent to Falcon.
+    """
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.replace(tzinfo=None).isoformat(timespec="seconds") + "Z"
+
+
+# Tool name -> (client method, arguments it accepts); omitted arguments
+# fall back to the method's own defaults
+TOOL_HANDLERS = {
+    "get_detections": (crowdstrike.get_detections, ("start_time", "severity", "limit")),
+    "get_host_info": (crowdstrike.get_host_info, ("hostname",)),
+    "get_incidents": (crowdstrike.get_incidents, ("start_time", "status", "limit")),
+    "get_threat_intel": (crowdstrike.get_threat_intel, ("indicator", "indicator_type")),
+    "get_vulnerabilities": (crowdstrike.get_vulnerabilities, ("hostname", "limit")),
+}
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     """Handle tool calls"""
     try:
-        if name == "get_detections":
-            result = await crowdstrike.get_detections(
-                start_time=arguments.get("start_time"),
-                severity=arguments.get("severity"),
-                limit=arguments.get("limit", 100)
-            )
-        elif name == "get_host_info":
-            result = await crowdstrike.get_host_info(arguments["hostname"])
-        elif name == "get_incidents":
-            result = await crowdstrike.get_incidents(
-                start_time=arguments.get("start_time"),
-                status=arguments.get("status"),
-                limit=arguments.get("limit", 50)
-            )
-        elif name == "get_threat_intel":
-            result = await crowdstrike.get_threat_intel(
-                arguments["indicator"],
-                arguments["indicator_type"]
-            )
-        elif name == "get_vulnerabilities":
-            result = await crowdstrike.get_vulnerabilities(
-                hostname=arguments.get("hostname")
-            )
-        else:
+        arguments = dict(arguments or {})
+        if arguments.get("start_time"):
+            try:
+                arguments["start_time"] = _normalize_timestamp(arguments["start_time"])
+            except (AttributeError, TypeError, ValueError):
+                result = {"error": f"Invalid start_time {arguments['start_time']!r}; expected ISO 8601"}
+                return [TextContent(type="text", text=orjson.dumps(result).decode())]
+
+        handler, keys = TOOL_HANDLERS.get(name, (None, ()))
+        if handler is None:
             result = {"error": f"Unknown tool: {name}"}
+        else:
+            result = await handler(**{key: arguments[key] for key in keys if key in arguments})
 
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=_format_result(name, result, arguments.get("format")))]
     except Exception as e:
         logger.error(f"Error calling tool {name}: {e}")
-        return [TextContent(type="text", text=json.dumps({"error": str(e)}))]
+        return [TextContent(type="text", text=orjson.dumps({"error": str(e)}).decode())]
 
 
 async def main():
     """Run the MCP server"""
-    async with stdio_server() as (read_stream, write_stream):
+    # The client authenticates while the stdio transport starts, and its
+    # pooled connections are closed however the server exits
+    async with crowdstrike, stdio_server() as (read_stream, write_stream):
         await app.run(read_stream, write_stream, app.create_initialization_options())
 
 
 if __name__ == "__main__":
+    # uvloop schedules the many concurrent Falcon requests faster where available
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     asyncio.run(main())
@@ -5,16 +5,33 @@ Integrates with Microsoft Defender, Entra ID, and Purview
 """
 
 import asyncio
-import json
+import functools
 import logging
+import operator
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 import boto3
+import httpx
+import orjson
 from azure.identity import ClientSecretCredential
-from msgraph import GraphServiceClient
+from kiota_authentication_azure.azure_identity_authentication_provider import (
+    AzureIdentityAuthenticationProvider
+)
+from msgraph import GraphRequestAdapter, GraphServiceClient
+from msgraph_core import GraphClientFactory
+from msgraph.generated.audit_logs.sign_ins.sign_ins_request_builder import SignInsRequestBuilder
+from msgraph.generated.identity_protection.risky_users.risky_users_request_builder import (
+    RiskyUsersRequestBuilder
+)
 from msgraph.generated.models.alert import Alert
 from msgraph.generated.security.alerts.alerts_request_builder import AlertsRequestBuilder
+from msgraph.generated.security.alerts_v2.alerts_v2_request_builder import AlertsV2RequestBuilder
+from msgraph.generated.users.users_request_builder import UsersRequestBuilder
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Resource, Tool, TextContent
@@ -24,6 +41,336 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("microsoft-security-mcp-server")
 
 
+# Graph connection pool shared by every Graph client, and its timeouts
+# (the SDK's own defaults)
+GRAPH_MAX_CONNECTIONS = 100
+GRAPH_MAX_KEEPALIVE_CONNECTIONS = 20
+GRAPH_REQUEST_TIMEOUT_SECONDS = 100
+GRAPH_CONNECT_TIMEOUT_SECONDS = 30
+
+# Outbound Graph requests per second allowed by the client-side throttle,
+# with bursts of up to the same number, so bursts of tool calls are paced
+# rather than answered with 429s and SDK retry backoff
+GRAPH_REQUESTS_PER_SECOND = float(os.environ.get("MICROSOFT_GRAPH_RPS", "15"))
+
+# Throttle tokens taken per request, by request builder path; audit-log
+# queries are throttled hardest by Graph
+GRAPH_REQUEST_COSTS = {
+    "security.alerts": 1,
+    "users": 1,
+    "identity_protection.risky_users": 1,
+    "audit_logs.sign_ins": 3,
+    "security.alerts_v2": 1,
+}
+
+# Records requested per Graph page ($top); larger limits follow @odata.nextLink.
+# Within the maximum page size of every endpoint queried
+GRAPH_PAGE_SIZE = 500
+
+# Fields fetched ($select) for endpoints that support projection, so Graph
+# sends only what the tools return
+ALERT_SELECT = [
+    "id", "title", "description", "severity", "status", "category",
+    "createdDateTime", "assignedTo", "userStates", "hostStates",
+]
+USER_SELECT = [
+    "id", "displayName", "userPrincipalName", "mail", "jobTitle", "department", "accountEnabled",
+]
+
+# Alerts raised by Purview among the unified security alerts
+PURVIEW_DLP_FILTER = "serviceSource eq 'microsoftPurview'"
+
+# Serialized tool responses kept in memory, and seconds each stays fresh.
+# Set MICROSOFT_RESPONSE_CACHE_TTL=0 to always query Graph
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = float(os.environ.get("MICROSOFT_RESPONSE_CACHE_TTL", "30"))
+
+# Tools called with no arguments by dashboards, refreshed into the response
+# cache in the background every PREWARM_INTERVAL_SECONDS (0 disables). The
+# default refreshes just before the default cache TTL runs out
+PREWARM_TOOLS = ("get_defender_alerts", "get_risky_users")
+PREWARM_INTERVAL_SECONDS = float(os.environ.get("MICROSOFT_PREWARM_INTERVAL", "25"))
+
+# Re-read the API credentials this often so secret rotations are picked up
+CREDENTIAL_REFRESH_SECONDS = 300
+
+# (tool name, canonical arguments) -> (expiry, serialized response)
+_response_cache = OrderedDict()
+
+
+@functools.lru_cache(maxsize=None)
+def _secrets_client():
+    """Return the process-wide Secrets Manager client, created on first use"""
+    return boto3.client('secretsmanager')
+
+
+@functools.lru_cache(maxsize=None)
+def _graph_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide Graph HTTP client, created on first use
+
+    Every GraphServiceClient sends through this one pool, so TCP and TLS
+    connections are reused across queries and tenants instead of each
+    client opening its own.
+    """
+    client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=GRAPH_MAX_CONNECTIONS,
+            max_keepalive_connections=GRAPH_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        timeout=httpx.Timeout(GRAPH_REQUEST_TIMEOUT_SECONDS, connect=GRAPH_CONNECT_TIMEOUT_SECONDS)
+    )
+    # Adds the SDK's retry, redirect and telemetry middleware to the pooled client
+    return GraphClientFactory.create_with_default_middleware(client=client)
+
+
+# Serialized records. Slotted dataclasses are smaller than per-record dicts
+# and orjson writes them directly, without building an intermediate dict
+
+
+@dataclass(slots=True)
+class AlertRow:
+    """Defender alert returned by get_defender_alerts"""
+
+    id: Optional[str]
+    title: Optional[str]
+    description: Optional[str]
+    severity: Any
+    status: Any
+    category: Optional[str]
+    created_datetime: Optional[str]
+    assigned_to: Optional[str]
+    user_principal_name: Optional[str]
+    host_fqdn: Optional[str]
+
+
+@dataclass(slots=True)
+class UserRow:
+    """Entra ID user returned by get_entra_users"""
+
+    id: Optional[str]
+    display_name: Optional[str]
+    user_principal_name: Optional[str]
+    mail: Optional[str]
+    job_title: Optional[str]
+    department: Optional[str]
+    account_enabled: Optional[bool]
+
+
+@dataclass(slots=True)
+class RiskyUserRow:
+    """Risky user returned by get_risky_users"""
+
+    id: Optional[str]
+    user_principal_name: Optional[str]
+    risk_level: Any
+    risk_state: Any
+    risk_detail: Any
+    risk_last_updated: Optional[str]
+
+
+@dataclass(slots=True)
+class SignInRow:
+    """Sign-in event returned by get_sign_in_logs"""
+
+    id: Optional[str]
+    created_datetime: Optional[str]
+    user_principal_name: Optional[str]
+    app_display_name: Optional[str]
+    ip_address: Optional[str]
+    location: Optional[str]
+    status: Any
+    risk_level: Any
+
+
+@dataclass(slots=True)
+class DlpAlertRow:
+    """Purview DLP alert returned by get_purview_dlp_alerts"""
+
+    id: Optional[str]
+    title: Optional[str]
+    description: Optional[str]
+    severity: Any
+    status: Any
+    created_datetime: Optional[str]
+
+
+@functools.lru_cache(maxsize=1024)
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    """
+    Format a Graph timestamp as ISO 8601, or None if unset
+
+    Records in a page often share timestamps (sign-in bursts, alert storms),
+    so formatted strings are cached and reused.
+    """
+    return value.isoformat() if value else None
+
+
+# Sign-in fields read in one call per record, instead of an attribute lookup each
+_sign_in_fields = operator.attrgetter(
+    "id", "created_date_time", "user_principal_name", "app_display_name",
+    "ip_address", "location", "status", "risk_level_aggregated"
+)
+_location_fields = operator.attrgetter("city", "country_or_region")
+
+
+def _format_location(location: Any) -> Optional[str]:
+    """Join a sign-in location's city and country, skipping unset parts"""
+    if location is None:
+        return None
+    return ", ".join(part for part in _location_fields(location) if part) or None
+
+
+def _revision(items: list) -> Optional[tuple]:
+    """Return the (id, @odata.etag) pairs of Graph records, or None if any lacks an etag"""
+    revision = tuple((item.id, (item.additional_data or {}).get("@odata.etag")) for item in items)
+    if any(etag is None for _, etag in revision):
+        return None
+    return revision
+
+
+def _serialize_user(user: Any) -> UserRow:
+    """Serialize an Entra ID user to a row"""
+    return UserRow(
+        id=user.id,
+        display_name=user.display_name,
+        user_principal_name=user.user_principal_name,
+        mail=user.mail,
+        job_title=user.job_title,
+        department=user.department,
+        account_enabled=user.account_enabled,
+    )
+
+
+def _serialize_risky_user(user: Any) -> RiskyUserRow:
+    """Serialize a risky user to a row"""
+    return RiskyUserRow(
+        id=user.id,
+        user_principal_name=user.user_principal_name,
+        risk_level=user.risk_level,
+        risk_state=user.risk_state,
+        risk_detail=user.risk_detail,
+        risk_last_updated=_isoformat(user.risk_last_updated_date_time),
+    )
+
+
+def _serialize_dlp_alert(alert: Any) -> DlpAlertRow:
+    """Serialize a Purview DLP alert to a row"""
+    return DlpAlertRow(
+        id=alert.id,
+        title=alert.title,
+        description=alert.description,
+        severity=alert.severity,
+        status=alert.status,
+        created_datetime=_isoformat(alert.created_date_time),
+    )
+
+
+def _serialize_sign_in(log: Any) -> SignInRow:
+    """Serialize a sign-in event to a row"""
+    (sign_in_id, created, user_principal_name, app_display_name,
+     ip_address, location, status, risk_level) = _sign_in_fields(log)
+    return SignInRow(
+        id=sign_in_id,
+        created_datetime=_isoformat(created),
+        user_principal_name=user_principal_name,
+        app_display_name=app_display_name,
+        ip_address=ip_address,
+        location=_format_location(location),
+        status=status.error_code if status else "Success",
+        risk_level=risk_level,
+    )
+
+
+def _serialize_alert(alert: Alert) -> AlertRow:
+    """Serialize a Defender alert to a row"""
+    return AlertRow(
+        id=alert.id,
+        title=alert.title,
+        description=alert.description,
+        severity=alert.severity,
+        status=alert.status,
+        category=alert.category,
+        created_datetime=_isoformat(alert.created_date_time),
+        assigned_to=alert.assigned_to,
+        user_principal_name=alert.user_states[0].user_principal_name if alert.user_states else None,
+        host_fqdn=alert.host_states[0].fqdn if alert.host_states else None,
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _eq_filter(*predicates: tuple) -> Optional[str]:
+    """
+    Build an OData equality filter from (field, value) pairs, skipping unset values
+
+    Values are quoted with apostrophes doubled, so a value containing a quote
+    cannot change the filter. The tools only take a few distinct values, so
+    fragments are built once and reused.
+
+    Args:
+        predicates: Pairs such as ("severity", "high")
+
+    Returns:
+        Predicates joined with 'and', or None if every value is unset
+    """
+    filter_str = " and ".join(
+        "{} eq '{}'".format(field, str(value).replace("'", "''"))
+        for field, value in predicates
+        if value
+    )
+    return filter_str or None
+
+
+def _created_since(start_time: Optional[str], filter_str: Optional[str]) -> Optional[str]:
+    """Prefix a filter with a createdDateTime lower bound when start_time is set"""
+    if not start_time:
+        return filter_str
+    time_filter = f"createdDateTime ge {start_time}"
+    return f"{time_filter} and {filter_str}" if filter_str else time_filter
+
+
+@functools.lru_cache(maxsize=16)
+def _build_graph_client(tenant_id: str, client_id: str, client_secret: str) -> GraphServiceClient:
+    """
+    Return the Graph client for a tenant's app registration, built once and reused
+
+    Clients are keyed by credentials, so a rotated secret gets a fresh client
+    while the stale one ages out of the cache. All of them share the pooled
+    HTTP client.
+    """
+    credential = ClientSecretCredential(
+        tenant_id=tenant_id,
+        client_id=client_id,
+        client_secret=client_secret
+    )
+    adapter = GraphRequestAdapter(
+        AzureIdentityAuthenticationProvider(credential),
+        client=_graph_http_client()
+    )
+    return GraphServiceClient(request_adapter=adapter)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: steady rate_per_second with bursts of up to burst tokens"""
+
+    def __init__(self, rate_per_second: float, burst: float):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    async def acquire(self, cost: float = 1):
+        """Take cost tokens, waiting until the bucket has refilled enough"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        # Reserve the tokens now; a negative balance is the wait owed, so
+        # concurrent callers queue behind each other in arrival order
+        self.tokens -= cost
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
 class MicrosoftSecurityClient:
     """Microsoft Security APIs client wrapper"""
 
@@ -31,22 +378,39 @@ class MicrosoftSecurityClient:
         self.tenant_id = None
         self.client_id = None
         self.client_secret = None
-        self._load_credentials()
 
-        # Initialize Microsoft Graph client
-        credential = ClientSecretCredential(
-            tenant_id=self.tenant_id,
-            client_id=self.client_id,
-            client_secret=self.client_secret
-        )
-        self.graph_client = GraphServiceClient(credential)
-
-    def _load_credentials(self):
+        self._credentials_expire_at = 0.0
+        self._credentials_lock = asyncio.Lock()
+        self._throttler = TokenBucket(GRAPH_REQUESTS_PER_SECOND, GRAPH_REQUESTS_PER_SECOND)
+        # Query name -> (entity revisions, rows) from its last serialization
+        self._revisions = {}
+
+    async def _graph(self) -> GraphServiceClient:
+        """
+        Return the cached Graph client for the current credentials
+
+        Credentials are loaded from Secrets Manager on first use rather than at
+        startup and re-read every CREDENTIAL_REFRESH_SECONDS, so rotations are
+        picked up without a restart.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._credentials_lock:
+            if self.client_id is None or loop.time() >= self._credentials_expire_at:
+                # boto3 blocks; keep the event loop serving while AWS responds
+                try:
+                    await loop.run_in_executor(None, self._sync_load_credentials)
+                except Exception:
+                    if self.client_id is None:
+                        raise
+                    logger.warning("Keeping previous Microsoft credentials after refresh failed")
+                self._credentials_expire_at = loop.time() + CREDENTIAL_REFRESH_SECONDS
+        return _build_graph_client(self.tenant_id, self.client_id, self.client_secret)
+
+    def _sync_load_credentials(self):
         """Load Microsoft credentials from AWS Secrets Manager"""
         try:
-            secrets_client = boto3.client('secretsmanager')
-            secret = secrets_client.get_secret_value(SecretId='microsoft/api-credentials')
-            creds = json.loads(secret['SecretString'])
+            secret = _secrets_client().get_secret_value(SecretId='microsoft/api-credentials')
+            creds = orjson.loads(secret['SecretString'])
             self.tenant_id = creds['tenant_id']
             self.client_id = creds['client_id']
             self.client_secret = creds['client_secret']
@@ -55,6 +419,74 @@ class MicrosoftSecurityClient:
             logger.error(f"Failed to load credentials: {e}")
             raise
 
+    async def _get_pages(self, path: str, request_config: Any, limit: int) -> list:
+        """
+        Run a Graph list query, following @odata.nextLink until limit records are fetched
+
+        Args:
+            path: Attribute path of the collection's request builder, e.g. "security.alerts"
+            request_config: Request configuration for the first page
+            limit: Maximum records to return
+
+        Returns:
+            Up to limit records, in the order Graph returned them
+        """
+        builder = operator.attrgetter(path)(await self._graph())
+        cost = GRAPH_REQUEST_COSTS[path]
+        await self._throttler.acquire(cost)
+        page = await builder.get(request_configuration=request_config)
+        items = list(page.value or [])
+        while page.odata_next_link and len(items) < limit:
+            await self._throttler.acquire(cost)
+            page = await builder.with_url(page.odata_next_link).get()
+            items.extend(page.value or [])
+        return items[:limit]
+
+    def _rows(self, query: str, items: list, serializer: Callable) -> list:
+        """
+        Serialize Graph records, reusing the last rows when nothing has changed
+
+        When every record carries an @odata.etag and the (id, etag) pairs
+        match the query's previous result, the previous rows are returned
+        as-is and no record is serialized again.
+        """
+        revision = _revision(items)
+        previous = self._revisions.get(query)
+        if revision is not None and previous is not None and previous[0] == revision:
+            return previous[1]
+        rows = [serializer(item) for item in items]
+        if revision is not None:
+            self._revisions[query] = (revision, rows)
+        return rows
+
+    async def _query(
+        self,
+        key: str,
+        path: str,
+        request_config: Any,
+        limit: int,
+        serializer: Callable
+    ) -> dict:
+        """
+        Fetch and serialize a Graph collection as {key: rows, "count": n}
+
+        Args:
+            key: Result key for the rows, also naming the query's cached revision
+            path: Attribute path of the collection's request builder
+            request_config: Request configuration for the first page
+            limit: Maximum records to return
+            serializer: Builds one row from one Graph record
+
+        Returns:
+            The rows and their count, or {"error": ...} if the query failed
+        """
+        try:
+            items = await self._get_pages(path, request_config, limit)
+            return {key: self._rows(key, items, serializer), "count": len(items)}
+        except Exception as e:
+            logger.error(f"Error querying {path}: {e}")
+            return {"error": str(e)}
+
     async def get_defender_alerts(
         self,
         start_time: Optional[str] = None,
@@ -63,53 +495,19 @@ class MicrosoftSecurityClient:
         limit: int = 100
     ) -> dict:
         """Get Microsoft Defender alerts"""
-        try:
-            # Build filter query
-            filters = []
-            if start_time:
-                filters.append(f"createdDateTime ge {start_time}")
-            if severity:
-                filters.append(f"severity eq '{severity}'")
-            if status:
-                filters.append(f"status eq '{status}'")
-
-            filter_str = " and ".join(filters) if filters else None
-
-            # Query alerts
-            request_config = AlertsRequestBuilder.AlertsRequestBuilderGetRequestConfiguration(
-                query_parameters=AlertsRequestBuilder.AlertsRequestBuilderGetQueryParameters(
-                    filter=filter_str,
-                    top=limit,
-                    orderby=["createdDateTime desc"]
-                )
-            )
-
-            alerts = await self.graph_client.security.alerts.get(
-                request_configuration=request_config
+        filter_str = _created_since(
+            start_time, _eq_filter(("severity", severity), ("status", status))
+        )
+        request_config = AlertsRequestBuilder.AlertsRequestBuilderGetRequestConfiguration(
+            query_parameters=AlertsRequestBuilder.AlertsRequestBuilderGetQueryParameters(
+                filter=filter_str,
+                top=min(limit, GRAPH_PAGE_SIZE),
+                count=False,
+                orderby=["createdDateTime desc"],
+                select=ALERT_SELECT
             )
-
-            return {
-                "alerts": [self._serialize_alert(alert) for alert in alerts.value],
-                "count": len(alerts.value)
-            }
-        except Exception as e:
-            logger.error(f"Error getting Defender alerts: {e}")
-            return {"error": str(e)}
-
-    def _serialize_alert(self, alert: Alert) -> dict:
-        """Serialize alert object to dict"""
-        return {
-            "id": alert.id,
-            "title": alert.title,
-            "description": alert.description,
-            "severity": alert.severity,
-            "status": alert.status,
-            "category": alert.category,
-            "created_datetime": alert.created_date_time.isoformat() if alert.created_date_time else None,
-            "assigned_to": alert.assigned_to,
-            "user_principal_name": alert.user_states[0].user_principal_name if alert.user_states else None,
-            "host_fqdn": alert.host_states[0].fqdn if alert.host_states else None,
-        }
+        )
+        return await self._query("alerts", "security.alerts", request_config, limit, _serialize_alert)
 
     async def get_entra_users(
         self,
@@ -117,66 +515,28 @@ class MicrosoftSecurityClient:
         limit: int = 100
     ) -> dict:
         """Get Entra ID (Azure AD) users"""
-        try:
-            from msgraph.generated.users.users_request_builder import UsersRequestBuilder
-
-            request_config = UsersRequestBuilder.UsersRequestBuilderGetRequestConfiguration(
-                query_parameters=UsersRequestBuilder.UsersRequestBuilderGetQueryParameters(
-                    filter=filter_query,
-                    top=limit
-                )
+        request_config = UsersRequestBuilder.UsersRequestBuilderGetRequestConfiguration(
+            query_parameters=UsersRequestBuilder.UsersRequestBuilderGetQueryParameters(
+                filter=filter_query,
+                top=min(limit, GRAPH_PAGE_SIZE),
+                count=False,
+                select=USER_SELECT
             )
-
-            users = await self.graph_client.users.get(request_configuration=request_config)
-
-            return {
-                "users": [{
-                    "id": user.id,
-                    "display_name": user.display_name,
-                    "user_principal_name": user.user_principal_name,
-                    "mail": user.mail,
-                    "job_title": user.job_title,
-                    "department": user.department,
-                    "account_enabled": user.account_enabled,
-                } for user in users.value],
-                "count": len(users.value)
-            }
-        except Exception as e:
-            logger.error(f"Error getting Entra users: {e}")
-            return {"error": str(e)}
+        )
+        return await self._query("users", "users", request_config, limit, _serialize_user)
 
     async def get_risky_users(self, limit: int = 50) -> dict:
         """Get risky users from Entra ID Protection"""
-        try:
-            from msgraph.generated.identity_protection.risky_users.risky_users_request_builder import (
-                RiskyUsersRequestBuilder
-            )
-
-            request_config = RiskyUsersRequestBuilder.RiskyUsersRequestBuilderGetRequestConfiguration(
-                query_parameters=RiskyUsersRequestBuilder.RiskyUsersRequestBuilderGetQueryParameters(
-                    top=limit,
-                    orderby=["riskLastUpdatedDateTime desc"]
-                )
-            )
-
-            risky_users = await self.graph_client.identity_protection.risky_users.get(
-                request_configuration=request_config
+        request_config = RiskyUsersRequestBuilder.RiskyUsersRequestBuilderGetRequestConfiguration(
+            query_parameters=RiskyUsersRequestBuilder.RiskyUsersRequestBuilderGetQueryParameters(
+                top=min(limit, GRAPH_PAGE_SIZE),
+                count=False,
+                orderby=["riskLastUpdatedDateTime desc"]
             )
-
-            return {
-                "risky_users": [{
-                    "id": user.id,
-                    "user_principal_name": user.user_principal_name,
-                    "risk_level": user.risk_level,
-                    "risk_state": user.risk_state,
-                    "risk_detail": user.risk_detail,
-                    "risk_last_updated": user.risk_last_updated_date_time.isoformat() if user.risk_last_updated_date_time else None,
-                } for user in risky_users.value],
-                "count": len(risky_users.value)
-            }
-        except Exception as e:
-            logger.error(f"Error getting risky users: {e}")
-            return {"error": str(e)}
+        )
+        return await self._query(
+            "risky_users", "identity_protection.risky_users", request_config, limit, _serialize_risky_user
+        )
 
     async def get_sign_in_logs(
         self,
@@ -185,87 +545,63 @@ class MicrosoftSecurityClient:
         limit: int = 100
     ) -> dict:
         """Get sign-in logs from Entra ID"""
-        try:
-            from msgraph.generated.audit_logs.sign_ins.sign_ins_request_builder import (
-                SignInsRequestBuilder
-            )
-
-            filters = []
-            if user_principal_name:
-                filters.append(f"userPrincipalName eq '{user_principal_name}'")
-            if start_time:
-                filters.append(f"createdDateTime ge {start_time}")
-
-            filter_str = " and ".join(filters) if filters else None
-
-            request_config = SignInsRequestBuilder.SignInsRequestBuilderGetRequestConfiguration(
-                query_parameters=SignInsRequestBuilder.SignInsRequestBuilderGetQueryParameters(
-                    filter=filter_str,
-                    top=limit,
-                    orderby=["createdDateTime desc"]
-                )
-            )
-
-            sign_ins = await self.graph_client.audit_logs.sign_ins.get(
-                request_configuration=request_config
+        filter_str = _created_since(
+            start_time, _eq_filter(("userPrincipalName", user_principal_name))
+        )
+        request_config = SignInsRequestBuilder.SignInsRequestBuilderGetRequestConfiguration(
+            query_parameters=SignInsRequestBuilder.SignInsRequestBuilderGetQueryParameters(
+                filter=filter_str,
+                top=min(limit, GRAPH_PAGE_SIZE),
+                count=False,
+                orderby=["createdDateTime desc"]
             )
-
-            return {
-                "sign_ins": [{
-                    "id": log.id,
-                    "created_datetime": log.created_date_time.isoformat() if log.created_date_time else None,
-                    "user_principal_name": log.user_principal_name,
-                    "app_display_name": log.app_display_name,
-                    "ip_address": log.ip_address,
-                    "location": f"{log.location.city}, {log.location.country_or_region}" if log.location else None,
-                    "status": log.status.error_code if log.status else "Success",
-                    "risk_level": log.risk_level_aggregated,
-                } for log in sign_ins.value],
-                "count": len(sign_ins.value)
-            }
-        except Exception as e:
-            logger.error(f"Error getting sign-in logs: {e}")
-            return {"error": str(e)}
+        )
+        return await self._query("sign_ins", "audit_logs.sign_ins", request_config, limit, _serialize_sign_in)
 
     async def get_purview_dlp_alerts(self, limit: int = 50) -> dict:
         """Get Data Loss Prevention alerts from Purview"""
-        try:
-            # Note: This requires Microsoft 365 Compliance API permissions
-            from msgraph.generated.security.alerts_v2.alerts_v2_request_builder import (
-                AlertsV2RequestBuilder
+        # Note: This requires Microsoft 365 Compliance API permissions
+        request_config = AlertsV2RequestBuilder.AlertsV2RequestBuilderGetRequestConfiguration(
+            query_parameters=AlertsV2RequestBuilder.AlertsV2RequestBuilderGetQueryParameters(
+                filter=PURVIEW_DLP_FILTER,
+                top=min(limit, GRAPH_PAGE_SIZE),
+                count=False,
+                orderby=["createdDateTime desc"]
             )
+        )
+        return await self._query("dlp_alerts", "security.alerts_v2", request_config, limit, _serialize_dlp_alert)
+
+    async def get_security_overview(self, limit: int = 50) -> dict:
+        """Get Defender, Entra ID and Purview data in one call, querying Graph concurrently"""
+        sections = ("defender_alerts", "entra_users", "risky_users", "sign_ins", "dlp_alerts")
+        results = await asyncio.gather(
+            self.get_defender_alerts(limit=limit),
+            self.get_entra_users(limit=limit),
+            self.get_risky_users(limit=limit),
+            self.get_sign_in_logs(limit=limit),
+            self.get_purview_dlp_alerts(limit=limit),
+            return_exceptions=True
+        )
+        # One failed query is reported in its section without losing the others
+        return {
+            section: {"error": str(result)} if isinstance(result, BaseException) else result
+            for section, result in zip(sections, results)
+        }
 
-            request_config = AlertsV2RequestBuilder.AlertsV2RequestBuilderGetRequestConfiguration(
-                query_parameters=AlertsV2RequestBuilder.AlertsV2RequestBuilderGetQueryParameters(
-                    filter="serviceSource eq 'microsoftPurview'",
-                    top=limit,
-                    orderby=["createdDateTime desc"]
-                )
-            )
 
-            alerts = await self.graph_client.security.alerts_v2.get(
-                request_configuration=request_config
-            )
+# Initialize MCP server
+app = Server("microsoft-security")
 
-            return {
-                "dlp_alerts": [{
-                    "id": alert.id,
-                    "title": alert.title,
-                    "description": alert.description,
-                    "severity": alert.severity,
-                    "status": alert.status,
-                    "created_datetime": alert.created_date_time.isoformat() if alert.created_date_time else None,
-                } for alert in alerts.value],
-                "count": len(alerts.value)
-            }
-        except Exception as e:
-            logger.error(f"Error getting Purview DLP alerts: {e}")
-            return {"error": str(e)}
 
+@functools.lru_cache(maxsize=None)
+def get_client() -> MicrosoftSecurityClient:
+    """
+    Return the process-wide Microsoft client, created on first tool call
 
-# Initialize MCP server
-app = Server("microsoft-security")
-microsoft = MicrosoftSecurityClient()
+    The client loads its credentials on its first Graph query, so server
+    startup and resource/tool listings never contact AWS.
+    """
+    return MicrosoftSecurityClient()
 
 
 @app.list_resources()
@@ -332,6 +668,12 @@ async def list_tools() -> list[Tool]:
                     "limit": {
                         "type": "integer",
                         "default": 100
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "ndjson"],
+                        "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                        "default": "json"
                     }
                 }
             }
@@ -349,6 +691,12 @@ async def list_tools() -> list[Tool]:
                     "limit": {
                         "type": "integer",
                         "default": 100
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "ndjson"],
+                        "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                        "default": "json"
                     }
                 }
             }
@@ -362,6 +710,12 @@ async def list_tools() -> list[Tool]:
                     "limit": {
                         "type": "integer",
                         "default": 50
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "ndjson"],
+                        "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                        "default": "json"
                     }
                 }
             }
@@ -383,6 +737,12 @@ async def list_tools() -> list[Tool]:
                     "limit": {
                         "type": "integer",
                         "default": 100
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "ndjson"],
+                        "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                        "default": "json"
                     }
                 }
             }
@@ -396,6 +756,26 @@ async def list_tools() -> list[Tool]:
                     "limit": {
                         "type": "integer",
                         "default": 50
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["json", "ndjson"],
+                        "description": "Pretty JSON (default) or newline-delimited JSON, one record per line",
+                        "default": "json"
+                    }
+                }
+            }
+        ),
+        Tool(
+            name="get_security_overview",
+            description="Get Defender alerts, Entra users, risky users, sign-ins and Purview DLP alerts in one call",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum records per section",
+                        "default": 50
                     }
                 }
             }
@@ -403,49 +783,137 @@ async def list_tools() -> list[Tool]:
     ]
 
 
+def _has_error(result: dict) -> bool:
+    """Whether a tool result, or any section of a composite result, is an error"""
+    return "error" in result or any(
+        isinstance(section, dict) and "error" in section for section in result.values()
+    )
+
+
+# Record list in each list tool's result, written one per line for format="ndjson"
+NDJSON_RECORD_KEYS = {
+    "get_defender_alerts": "alerts",
+    "get_entra_users": "users",
+    "get_risky_users": "risky_users",
+    "get_sign_in_logs": "sign_ins",
+    "get_purview_dlp_alerts": "dlp_alerts",
+}
+
+
+# Tool name -> (client method, argument names passed through when given);
+# omitted arguments take the method's defaults
+TOOL_HANDLERS = {
+    "get_defender_alerts": (
+        MicrosoftSecurityClient.get_defender_alerts, ("start_time", "severity", "status", "limit")
+    ),
+    "get_entra_users": (MicrosoftSecurityClient.get_entra_users, ("filter_query", "limit")),
+    "get_risky_users": (MicrosoftSecurityClient.get_risky_users, ("limit",)),
+    "get_sign_in_logs": (
+        MicrosoftSecurityClient.get_sign_in_logs, ("user_principal_name", "start_time", "limit")
+    ),
+    "get_purview_dlp_alerts": (MicrosoftSecurityClient.get_purview_dlp_alerts, ("limit",)),
+    "get_security_overview": (MicrosoftSecurityClient.get_security_overview, ("limit",)),
+}
+
+
+async def _run_tool(name: str, arguments: dict) -> dict:
+    """Run a tool against Graph and return its unserialized result"""
+    handler, keys = TOOL_HANDLERS.get(name, (None, ()))
+    if handler is None:
+        return {"error": f"Unknown tool: {name}"}
+    return await handler(get_client(), **{key: arguments[key] for key in keys if key in arguments})
+
+
+def _serialize(name: str, result: dict, response_format: Optional[str] = None) -> str:
+    """
+    Serialize a tool result as pretty JSON, or as NDJSON when requested
+
+    NDJSON writes each record compactly on its own line, skipping the
+    indented copy of the whole result. Error results are always JSON.
+    """
+    records = result.get(NDJSON_RECORD_KEYS.get(name)) if response_format == "ndjson" else None
+    if records is None or "error" in result:
+        return orjson.dumps(result, default=str, option=orjson.OPT_INDENT_2).decode()
+    return b"\n".join(orjson.dumps(record, default=str) for record in records).decode()
+
+
+def _cache_key(name: str, arguments: Any) -> tuple:
+    """Response cache key: the tool name and its arguments with keys sorted"""
+    return (name, orjson.dumps(arguments or {}, default=str, option=orjson.OPT_SORT_KEYS))
+
+
+def _cache_response(key: tuple, text: str):
+    """Keep a serialized response for RESPONSE_CACHE_TTL seconds, evicting the LRU entry when full"""
+    _response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, text)
+    _response_cache.move_to_end(key)
+    if len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+
+async def _refresh_responses():
+    """
+    Keep the no-argument dashboard tool responses warm in the response cache
+
+    Runs every PREWARM_INTERVAL_SECONDS once a tool call has created the
+    client, so startup stays free of AWS and Graph calls. A result equal to
+    the previous refresh reuses its serialized text instead of serializing
+    again.
+    """
+    previous = {}
+    while True:
+        await asyncio.sleep(PREWARM_INTERVAL_SECONDS)
+        if not get_client.cache_info().currsize:
+            continue
+        for name in PREWARM_TOOLS:
+            try:
+                result = await _run_tool(name, {})
+            except Exception as e:
+                logger.warning(f"Error refreshing {name}: {e}")
+                continue
+            if _has_error(result):
+                continue
+            last = previous.get(name)
+            if last is None or last[0] != result:
+                last = previous[name] = (result, _serialize(name, result))
+            _cache_response(_cache_key(name, {}), last[1])
+
+
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
-    """Handle tool calls"""
+    """Handle tool calls, serving repeated calls from the response cache"""
     try:
-        if name == "get_defender_alerts":
-            result = await microsoft.get_defender_alerts(
-                start_time=arguments.get("start_time"),
-                severity=arguments.get("severity"),
-                status=arguments.get("status"),
-                limit=arguments.get("limit", 100)
-            )
-        elif name == "get_entra_users":
-            result = await microsoft.get_entra_users(
-                filter_query=arguments.get("filter_query"),
-                limit=arguments.get("limit", 100)
-            )
-        elif name == "get_risky_users":
-            result = await microsoft.get_risky_users(
-                limit=arguments.get("limit", 50)
-            )
-        elif name == "get_sign_in_logs":
-            result = await microsoft.get_sign_in_logs(
-                user_principal_name=arguments.get("user_principal_name"),
-                start_time=arguments.get("start_time"),
-                limit=arguments.get("limit", 100)
-            )
-        elif name == "get_purview_dlp_alerts":
-            result = await microsoft.get_purview_dlp_alerts(
-                limit=arguments.get("limit", 50)
-            )
-        else:
-            result = {"error": f"Unknown tool: {name}"}
-
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        key = _cache_key(name, arguments)
+        entry = _response_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _response_cache.move_to_end(key)
+            return [TextContent(type="text", text=entry[1])]
+
+        arguments = arguments or {}
+        result = await _run_tool(name, arguments)
+        text = _serialize(name, result, arguments.get("format"))
+        # Errors are never cached, so a failed call is retried on the next request
+        if RESPONSE_CACHE_TTL > 0 and not _has_error(result):
+            _cache_response(key, text)
+        return [TextContent(type="text", text=text)]
     except Exception as e:
         logger.error(f"Error calling tool {name}: {e}")
-        return [TextContent(type="text", text=json.dumps({"error": str(e)}))]
+        return [TextContent(type="text", text=orjson.dumps({"error": str(e)}).decode())]
 
 
 async def main():
     """Run the MCP server"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+    refresher = None
+    if RESPONSE_CACHE_TTL > 0 and PREWARM_INTERVAL_SECONDS > 0:
+        refresher = asyncio.create_task(_refresh_responses())
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+    finally:
+        if refresher is not None:
+            refresher.cancel()
+        # Close pooled Graph connections, if any tool call opened them
+        if _graph_http_client.cache_info().currsize:
+            await _graph_http_client().aclose()
 
 
 if __name__ == "__main__":
@@ -5,14 +5,18 @@ Provides email security, threat intelligence, and TAP (Targeted Attack Protectio
 """
 
 import asyncio
-import json
+import functools
 import logging
+import os
+import random
+import time
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Optional
 from urllib.parse import urljoin
 
-import boto3
-import requests
+import aiohttp
+import orjson
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Resource, Tool, TextContent
@@ -22,49 +26,507 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("proofpoint-mcp-server")
 
 
+# TAP API connection pool and timeout. Every call goes to one host, so the
+# per-host limit matches the most requests the concurrency limiter admits,
+# and idle connections are kept long enough to span gaps between tool calls
+PROOFPOINT_CONNECTION_LIMIT = 100
+PROOFPOINT_CONNECTION_LIMIT_PER_HOST = 32
+PROOFPOINT_KEEPALIVE_SECONDS = 60
+PROOFPOINT_DNS_CACHE_SECONDS = 300
+PROOFPOINT_REQUEST_TIMEOUT_SECONDS = 30
+
+# Sent with every TAP API call. Day-long SIEM windows can run to several MB of
+# JSON, so ask for it compressed; aiohttp decompresses transparently
+PROOFPOINT_DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate", "Accept": "application/json"}
+
+# TAP API calls allowed per rolling minute, so bursts of tool calls are
+# queued here instead of being answered with 429s
+PROOFPOINT_REQUESTS_PER_MINUTE = int(os.environ.get("PROOFPOINT_REQUESTS_PER_MINUTE", "60"))
+
+# TAP API calls allowed in flight at once. The limit starts here and adapts
+# between the bounds from observed latency
+MAX_INFLIGHT_REQUESTS = int(os.environ.get("PROOFPOINT_MAX_INFLIGHT", "8"))
+MIN_CONCURRENCY = 2
+MAX_CONCURRENCY = 32
+TARGET_LATENCY_SECONDS = 2.0
+LATENCY_WINDOW = 50
+CONCURRENCY_INCREASE = 0.5
+CONCURRENCY_DECREASE = 0.5
+
+# Responses meaning Proofpoint is overloaded; each one cuts the concurrency limit
+OVERLOAD_STATUSES = frozenset((429, 502, 503))
+
+# Pause new requests when X-RateLimit-Remaining drops to this share of
+# X-RateLimit-Limit (or this many calls), before Proofpoint starts returning 429s
+RATE_LIMIT_LOW_FRACTION = 0.1
+RATE_LIMIT_LOW_REMAINING = 2
+RATE_LIMIT_MIN_PAUSE_SECONDS = 1.0
+
+# Retries for throttling and transient gateway errors: attempts in total,
+# and the backoff base and cap
+RETRY_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 16.0
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+# SIEM event streams fetched concurrently by get_siem_events:
+# (endpoint, response field, result key)
+SIEM_STREAMS = (
+    ("siem/clicks/permitted", "clicksPermitted", "clicks_permitted"),
+    ("siem/clicks/blocked", "clicksBlocked", "clicks_blocked"),
+    ("siem/messages/delivered", "messagesDelivered", "messages_delivered"),
+    ("siem/messages/blocked", "messagesBlocked", "messages_blocked"),
+)
+
+# Accepted threat filters. call_tool rejects anything else before a request
+# is sent, rather than spending a round trip on Proofpoint's 400
+THREAT_TYPES = frozenset(("url", "attachment", "messageText"))
+THREAT_STATUSES = frozenset(("active", "cleared", "falsePositive"))
+
+# Events returned per SIEM stream unless the caller asks for more; a day-long
+# window can hold thousands, far more than a tool response should carry
+SIEM_EVENT_LIMIT = 100
+
+# Response cache for endpoints whose answers change slowly: entries kept, and
+# seconds each stays fresh by endpoint prefix. SIEM queries cover a moving
+# time window and are never cached
+RESPONSE_CACHE_SIZE = 4096
+RESPONSE_CACHE_TTLS = {
+    "url/decode": 86400,
+    "campaign/": 3600,
+    "people/": 3600,
+}
+
+# url/decode lookups arriving within this window are sent as one request of
+# up to DECODE_BATCH_SIZE comma-separated URLs
+DECODE_BATCH_SIZE = 50
+DECODE_BATCH_INTERVAL_SECONDS = 0.01
+
+# Credentials are held for this long, and re-read in the background this
+# much earlier, so a rotated secret is picked up without blocking a request
+CREDENTIAL_TTL_SECONDS = 3600
+CREDENTIAL_REFRESH_MARGIN_SECONDS = 60
+
+
+@functools.lru_cache(maxsize=None)
+def _secrets_client():
+    """Return the process-wide Secrets Manager client, created on first use"""
+    # Imported here so the server answers the MCP handshake without waiting on
+    # boto3, and never loads it when credentials come from the environment
+    import boto3
+    return boto3.client('secretsmanager')
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive-increase / multiplicative-decrease control
+
+    While the mean latency over the last LATENCY_WINDOW calls stays at or
+    under the target, each call raises the limit by CONCURRENCY_INCREASE.
+    A slow window, a throttling response or a dropped connection multiplies
+    it by CONCURRENCY_DECREASE. The window is cleared after each decrease, so
+    one slow stretch is only penalised once.
+    """
+
+    def __init__(self, initial: int):
+        self.limit = float(min(MAX_CONCURRENCY, max(MIN_CONCURRENCY, initial)))
+        self._in_flight = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._condition:
+            self._in_flight -= 1
+            # The limit may have grown since the waiters queued
+            self._condition.notify(max(1, int(self.limit) - self._in_flight))
+
+    def record(self, latency: float, overloaded: bool = False):
+        """Adjust the limit from one finished call"""
+        if overloaded:
+            self._decrease()
+            return
+        self._latencies.append(latency)
+        if len(self._latencies) < LATENCY_WINDOW:
+            return
+        if sum(self._latencies) / LATENCY_WINDOW <= TARGET_LATENCY_SECONDS:
+            self.limit = min(MAX_CONCURRENCY, self.limit + CONCURRENCY_INCREASE)
+        else:
+            self._decrease()
+
+    def _decrease(self):
+        self.limit = max(MIN_CONCURRENCY, self.limit * CONCURRENCY_DECREASE)
+        self._latencies.clear()
+
+
+class SlidingWindowLimiter:
+    """Allow at most max_requests calls in any rolling window of window_seconds"""
+
+    def __init__(self, max_requests: int, window_seconds: float = 60.0):
+        self.max_requests = max_requests
+        self.window = window_seconds
+        self._sent = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until another call fits in the window, then record it"""
+        # The lock queues waiters in arrival order while the oldest call ages out
+        async with self._lock:
+            now = time.monotonic()
+            while self._sent and self._sent[0] <= now - self.window:
+                self._sent.popleft()
+            if len(self._sent) >= self.max_requests:
+                await asyncio.sleep(self._sent[0] + self.window - now)
+                self._sent.popleft()
+                now = time.monotonic()
+            self._sent.append(now)
+
+
+class DecodeBatcher:
+    """
+    Coalesce concurrent url/decode lookups into batched requests
+
+    Lookups queue for up to DECODE_BATCH_INTERVAL_SECONDS, then up to
+    DECODE_BATCH_SIZE distinct URLs are decoded in one request and each
+    caller receives the entry matching its own URL.
+    """
+
+    def __init__(self, fetch: Callable[[str, dict], Awaitable[dict]]):
+        self._fetch = fetch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        # Batches being sent; the loop only holds weak references to tasks
+        self._sending: set[asyncio.Task] = set()
+
+    async def submit(self, endpoint: str, params: dict) -> dict:
+        """Decode params["urls"] as part of the next batch; same shape as a url/decode response"""
+        encoded_url = params["urls"]
+        if "," in encoded_url:
+            # Cannot be told apart from the batch separator; send it alone
+            return await self._fetch(endpoint, params)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._collect(endpoint))
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((encoded_url, future))
+        return await future
+
+    async def _collect(self, endpoint: str):
+        """Gather queued lookups into batches and send each without waiting for the last"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + DECODE_BATCH_INTERVAL_SECONDS
+            while len(batch) < DECODE_BATCH_SIZE:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._send(endpoint, batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, endpoint: str, batch: list):
+        """Decode one batch and resolve each caller's future with its own entry"""
+        urls = list(dict.fromkeys(encoded_url for encoded_url, _ in batch))
+        try:
+            data = await self._fetch(endpoint, {"urls": ",".join(urls)})
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            data = {"error": str(e)}
+        decoded = {entry.get("encodedUrl"): entry for entry in data.get("urls", [])}
+        for encoded_url, future in batch:
+            if future.done():
+                continue
+            if "error" in data:
+                future.set_result(data)
+            else:
+                entry = decoded.get(encoded_url)
+                future.set_result({"urls": [entry] if entry else []})
+
+    def close(self):
+        """Stop collecting batches and cancel the ones still being sent"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for task in self._sending:
+            task.cancel()
+
+
+def _cache_ttl(endpoint: str) -> Optional[float]:
+    """Seconds a response from endpoint may be cached, or None if it must not be"""
+    for prefix, ttl in RESPONSE_CACHE_TTLS.items():
+        if endpoint.startswith(prefix):
+            return ttl
+    return None
+
+
+def _retry_after(headers, default: float) -> float:
+    """Seconds to wait from a Retry-After header, capped, or default if absent"""
+    try:
+        return min(RETRY_MAX_SECONDS, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return default
+
+
+@functools.lru_cache(maxsize=256)
+def _endpoint_url(base_url: str, endpoint: str) -> str:
+    """Return the full URL of a TAP API endpoint, joined once per endpoint rather than per call"""
+    return urljoin(base_url, endpoint)
+
+
+def _project(events: list, fields: Optional[list[str]], limit: int) -> list:
+    """Return the first limit events, keeping only the named fields of each when fields is given"""
+    events = events[:limit]
+    if fields:
+        events = [{key: event[key] for key in fields if key in event} for event in events]
+    return events
+
+
 class ProofpointClient:
-    """Proofpoint API client wrapper"""
+    """Proofpoint TAP API client using one pooled aiohttp session"""
 
     BASE_URL = "https://tap-api-v2.proofpoint.com/v2/"
 
     def __init__(self):
         self.service_principal = None
         self.secret = None
-        self._load_credentials()
-        self.session = requests.Session()
-        self.session.auth = (self.service_principal, self.secret)
+        self._auth: Optional[aiohttp.BasicAuth] = None
+        self._credentials_lock = asyncio.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._limiter = SlidingWindowLimiter(PROOFPOINT_REQUESTS_PER_MINUTE)
+        self._concurrency = AdaptiveLimiter(MAX_INFLIGHT_REQUESTS)
+        self._pause_until = 0.0
+        # (endpoint, sorted params) -> (expiry, decoded response)
+        self._cache = OrderedDict()
+        # Request key -> fetch in progress, shared by concurrent identical requests
+        self._pending = {}
+        self._decoder = DecodeBatcher(self._fetch)
 
     def _load_credentials(self):
-        """Load Proofpoint credentials from AWS Secrets Manager"""
+        """
+        Load Proofpoint credentials from PROOFPOINT_SP and PROOFPOINT_SECRET
+        when both are set, and otherwise from AWS Secrets Manager
+        """
         try:
-            secrets_client = boto3.client('secretsmanager')
-            secret = secrets_client.get_secret_value(SecretId='proofpoint/api-credentials')
-            creds = json.loads(secret['SecretString'])
-            self.service_principal = creds['service_principal']
-            self.secret = creds['secret']
+            service_principal = os.environ.get("PROOFPOINT_SP")
+            secret = os.environ.get("PROOFPOINT_SECRET")
+            if not (service_principal and secret):
+                response = _secrets_client().get_secret_value(SecretId='proofpoint/api-credentials')
+                creds = orjson.loads(response['SecretString'])
+                service_principal, secret = creds['service_principal'], creds['secret']
+            self.service_principal = service_principal
+            self.secret = secret
+            self._auth = aiohttp.BasicAuth(self.service_principal, self.secret)
             logger.info("Successfully loaded Proofpoint credentials")
         except Exception as e:
             logger.error(f"Failed to load credentials: {e}")
             raise
 
-    def _make_request(self, endpoint: str, params: Optional[dict] = None) -> dict:
-        """Make API request to Proofpoint"""
+    async def refresh_credentials(self):
+        """Re-read the credentials from Secrets Manager without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._load_credentials)
+
+    async def ensure_credentials(self) -> aiohttp.BasicAuth:
+        """Return the API credentials, loading them on first use rather than at import"""
+        if self._auth is None:
+            async with self._credentials_lock:
+                if self._auth is None:
+                    await self.refresh_credentials()
+        return self._auth
+
+    async def init(self):
+        """
+        Load credentials ahead of the first tool call
+
+        Failures are logged rather than raised; ensure_credentials tries again
+        when a tool first needs the API.
+        """
         try:
-            url = urljoin(self.BASE_URL, endpoint)
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            return {"error": str(e)}
+            await self.ensure_credentials()
+        except Exception as e:
+            logger.warning(f"Proofpoint credential load deferred to first call: {e}")
+
+    async def refresh_credentials_forever(self):
+        """Re-read the credentials shortly before each CREDENTIAL_TTL_SECONDS period ends"""
+        while True:
+            await asyncio.sleep(CREDENTIAL_TTL_SECONDS - CREDENTIAL_REFRESH_MARGIN_SECONDS)
+            try:
+                await self.refresh_credentials()
+            except Exception:
+                logger.warning("Keeping previous Proofpoint credentials after refresh failed")
+
+    async def connect(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session used for every TAP API call, opening it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=PROOFPOINT_CONNECTION_LIMIT,
+                    limit_per_host=PROOFPOINT_CONNECTION_LIMIT_PER_HOST,
+                    keepalive_timeout=PROOFPOINT_KEEPALIVE_SECONDS,
+                    ttl_dns_cache=PROOFPOINT_DNS_CACHE_SECONDS,
+                    enable_cleanup_closed=True
+                ),
+                timeout=aiohttp.ClientTimeout(total=PROOFPOINT_REQUEST_TIMEOUT_SECONDS),
+                headers=PROOFPOINT_DEFAULT_HEADERS
+            )
+        return self._session
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections"""
+        self._decoder.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, url: str, params: Optional[dict]) -> dict:
+        """
+        GET a TAP API URL and decode the JSON body, raising for error statuses
+
+        A 401 means the secret may have been rotated since it was loaded, so
+        the credentials are re-read and the request is sent once more.
+        """
+        session = await self.connect()
+        await self.ensure_credentials()
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            pause = self._pause_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await self._limiter.acquire()
+            async with self._concurrency:
+                started = loop.time()
+                # A dropped connection or timeout counts as overload, like a 429
+                overloaded = True
+                try:
+                    async with session.get(url, params=params, auth=self._auth) as response:
+                        overloaded = response.status in OVERLOAD_STATUSES
+                        self._check_rate_limit(response.status, response.headers)
+                        if response.status != 401 or attempt > 0:
+                            response.raise_for_status()
+                            # SIEM endpoints answer 204 with no body when a window has no events
+                            body = await response.read()
+                            return orjson.loads(body) if body else {}
+                finally:
+                    self._concurrency.record(loop.time() - started, overloaded=overloaded)
+            logger.warning("Proofpoint rejected the credentials; reloading them")
+            await self.refresh_credentials()
+
+    def _check_rate_limit(self, status: int, headers):
+        """Pause new requests after a 429, or when Proofpoint reports the rate limit is nearly used up"""
+        pause = 0.0
+        if status == 429:
+            pause = _retry_after(headers, RATE_LIMIT_MIN_PAUSE_SECONDS)
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+        except (KeyError, ValueError):
+            pass
+        else:
+            if limit > 0 and (remaining <= RATE_LIMIT_LOW_REMAINING or remaining / limit < RATE_LIMIT_LOW_FRACTION):
+                pause = max(pause, RATE_LIMIT_MIN_PAUSE_SECONDS, 60 / limit)
+                logger.warning(f"Proofpoint rate limit low ({remaining}/{limit} left); pausing requests for {pause:.1f}s")
+        if pause > 0:
+            self._pause_until = max(self._pause_until, time.monotonic() + pause)
+
+    async def _make_request(
+        self,
+        endpoint: str,
+        params: Optional[dict] = None,
+        fetch: Optional[Callable[[str, Optional[dict]], Awaitable[dict]]] = None
+    ) -> dict:
+        """
+        Make API request to Proofpoint, serving slow-changing endpoints from cache
+
+        Concurrent identical requests to any endpoint wait for the first one
+        and share its response. Error responses are not cached.
+
+        Args:
+            endpoint: Path under BASE_URL
+            params: Query parameters
+            fetch: Called with (endpoint, params) on a cache miss instead of
+                sending the request directly, e.g. to batch it
+        """
+        fetch = fetch or self._fetch
+        ttl = _cache_ttl(endpoint)
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        if ttl is not None:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return entry[1]
+        task = self._pending.get(key)
+        if task is None:
+            task = self._pending[key] = asyncio.create_task(
+                self._fetch_and_cache(key, endpoint, params, ttl, fetch)
+            )
+        # Shielded so one caller giving up does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _fetch_and_cache(
+        self,
+        key: tuple,
+        endpoint: str,
+        params: Optional[dict],
+        ttl: Optional[float],
+        fetch: Callable[[str, Optional[dict]], Awaitable[dict]]
+    ) -> dict:
+        """Fetch an endpoint, keeping a successful response for ttl seconds when ttl is given"""
+        try:
+            data = await fetch(endpoint, params)
+            if ttl is not None and "error" not in data:
+                self._cache[key] = (time.monotonic() + ttl, data)
+                self._cache.move_to_end(key)
+                if len(self._cache) > RESPONSE_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            return data
+        finally:
+            self._pending.pop(key, None)
+
+    async def _fetch(self, endpoint: str, params: Optional[dict] = None) -> dict:
+        """
+        GET a TAP API endpoint, retrying throttling and gateway errors
+
+        Waits honour Retry-After when Proofpoint sends it, and otherwise back
+        off exponentially with jitter, without blocking other tool calls.
+        """
+        url = _endpoint_url(self.BASE_URL, endpoint)
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1) + random.random())
+            try:
+                return await self._get(url, params)
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS:
+                    logger.error(f"API request failed: {e}")
+                    return {"error": str(e)}
+                delay = _retry_after(e.headers or {}, backoff)
+                logger.warning(f"GET {endpoint} returned {e.status}; retrying in {delay:.1f}s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"API request failed: {e}")
+                return {"error": str(e) or type(e).__name__}
+            await asyncio.sleep(delay)
 
     async def get_siem_events(
         self,
         interval: str = "PT1H",
         threat_type: Optional[str] = None,
-        threat_status: Optional[str] = None
+        threat_status: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        limit: int = SIEM_EVENT_LIMIT
     ) -> dict:
-        """Get SIEM events from Proofpoint TAP"""
+        """
+        Get SIEM events from Proofpoint TAP
+
+        Each stream is cut to its first limit events, and to the named fields
+        of each event when fields is given; total_events counts them all.
+        """
         try:
             params = {"interval": interval, "format": "json"}
 
@@ -73,56 +535,71 @@ class ProofpointClient:
             if threat_status:
                 params["threatStatus"] = threat_status
 
-            data = self._make_request("siem/all", params=params)
-
-            if "error" in data:
-                return data
-
-            return {
-                "clicks_permitted": data.get("clicksPermitted", []),
-                "clicks_blocked": data.get("clicksBlocked", []),
-                "messages_delivered": data.get("messagesDelivered", []),
-                "messages_blocked": data.get("messagesBlocked", []),
-                "total_events": (
-                    len(data.get("clicksPermitted", [])) +
-                    len(data.get("clicksBlocked", [])) +
-                    len(data.get("messagesDelivered", [])) +
-                    len(data.get("messagesBlocked", []))
-                )
-            }
+            # Clicks only ever carry URL threats, so other threat types skip them
+            streams = [
+                stream for stream in SIEM_STREAMS
+                if not (threat_type and threat_type != "url" and stream[1].startswith("clicks"))
+            ]
+            responses = await asyncio.gather(
+                *(self._make_request(endpoint, params=params) for endpoint, _, _ in streams)
+            )
+            for data in responses:
+                if "error" in data:
+                    return data
+
+            result = {key: [] for _, _, key in SIEM_STREAMS}
+            total = 0
+            for (_, field, key), data in zip(streams, responses):
+                events = data.get(field, [])
+                total += len(events)
+                result[key] = _project(events, fields, limit)
+            result["total_events"] = total
+            return result
         except Exception as e:
             logger.error(f"Error getting SIEM events: {e}")
             return {"error": str(e)}
 
-    async def get_clicks_blocked(self, interval: str = "PT1H") -> dict:
+    async def get_clicks_blocked(
+        self,
+        interval: str = "PT1H",
+        fields: Optional[list[str]] = None,
+        limit: int = SIEM_EVENT_LIMIT
+    ) -> dict:
         """Get blocked clicks from Proofpoint TAP"""
         try:
             params = {"interval": interval, "format": "json"}
-            data = self._make_request("siem/clicks/blocked", params=params)
+            data = await self._make_request("siem/clicks/blocked", params=params)
 
             if "error" in data:
                 return data
 
+            events = data.get("clicksBlocked", [])
             return {
-                "clicks_blocked": data.get("clicksBlocked", []),
-                "count": len(data.get("clicksBlocked", []))
+                "clicks_blocked": _project(events, fields, limit),
+                "count": len(events)
             }
         except Exception as e:
             logger.error(f"Error getting blocked clicks: {e}")
             return {"error": str(e)}
 
-    async def get_messages_blocked(self, interval: str = "PT1H") -> dict:
+    async def get_messages_blocked(
+        self,
+        interval: str = "PT1H",
+        fields: Optional[list[str]] = None,
+        limit: int = SIEM_EVENT_LIMIT
+    ) -> dict:
         """Get blocked messages from Proofpoint TAP"""
         try:
             params = {"interval": interval, "format": "json"}
-            data = self._make_request("siem/messages/blocked", params=params)
+            data = await self._make_request("siem/messages/blocked", params=params)
 
             if "error" in data:
                 return data
 
+            events = data.get("messagesBlocked", [])
             return {
-                "messages_blocked": data.get("messagesBlocked", []),
-                "count": len(data.get("messagesBlocked", []))
+                "messages_blocked": _project(events, fields, limit),
+                "count": len(events)
             }
         except Exception as e:
             logger.error(f"Error getting blocked messages: {e}")
@@ -131,7 +608,9 @@ class ProofpointClient:
     async def get_messages_delivered(
         self,
         interval: str = "PT1H",
-        threat_status: Optional[str] = None
+        threat_status: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+        limit: int = SIEM_EVENT_LIMIT
     ) -> dict:
         """Get delivered messages (potentially with threats) from Proofpoint TAP"""
         try:
@@ -140,14 +619,15 @@ class ProofpointClient:
             if threat_status:
                 params["threatStatus"] = threat_status
 
-            data = self._make_request("siem/messages/delivered", params=params)
+            data = await self._make_request("siem/messages/delivered", params=params)
 
             if "error" in data:
                 return data
 
+            events = data.get("messagesDelivered", [])
             return {
-                "messages_delivered": data.get("messagesDelivered", []),
-                "count": len(data.get("messagesDelivered", []))
+                "messages_delivered": _project(events, fields, limit),
+                "count": len(events)
             }
         except Exception as e:
             logger.error(f"Error getting delivered messages: {e}")
@@ -157,7 +637,7 @@ class ProofpointClient:
         """Get top clickers on malicious URLs"""
         try:
             params = {"window": window}
-            data = self._make_request("people/top-clickers", params=params)
+            data = await self._make_request("people/top-clickers", params=params)
 
             if "error" in data:
                 return data
@@ -174,7 +654,7 @@ class ProofpointClient:
         """Get Very Attacked People (VAP) report"""
         try:
             params = {"window": window}
-            data = self._make_request("people/vap", params=params)
+            data = await self._make_request("people/vap", params=params)
 
             if "error" in data:
                 return data
@@ -188,10 +668,10 @@ class ProofpointClient:
             return {"error": str(e)}
 
     async def decode_url(self, encoded_url: str) -> dict:
-        """Decode a Proofpoint rewritten URL"""
+        """Decode a Proofpoint rewritten URL, batched with other concurrent lookups"""
         try:
             params = {"urls": encoded_url}
-            data = self._make_request("url/decode", params=params)
+            data = await self._make_request("url/decode", params=params, fetch=self._decoder.submit)
 
             if "error" in data:
                 return data
@@ -206,7 +686,7 @@ class ProofpointClient:
     async def get_campaign_info(self, campaign_id: str) -> dict:
         """Get information about a specific campaign"""
         try:
-            data = self._make_request(f"campaign/{campaign_id}")
+            data = await self._make_request(f"campaign/{campaign_id}")
 
             if "error" in data:
                 return data
@@ -224,225 +704,266 @@ app = Server("proofpoint-security")
 proofpoint = ProofpointClient()
 
 
+# Resources and tools never change, so they are built once at import
+
+# Input properties shared by the SIEM event tools
+EVENT_FIELDS_PROPERTY = {
+    "type": "array",
+    "items": {"type": "string"},
+    "description": "Event fields to return (e.g., sender, recipient, threatsInfoMap, url); all fields when omitted"
+}
+EVENT_LIMIT_PROPERTY = {
+    "type": "integer",
+    "minimum": 1,
+    "description": "Most events to return per event type; counts still cover every event",
+    "default": SIEM_EVENT_LIMIT
+}
+RESOURCES = (
+    Resource(
+        uri="proofpoint://siem/events",
+        name="SIEM Events",
+        mimeType="application/json",
+        description="Security events from Proofpoint TAP"
+    ),
+    Resource(
+        uri="proofpoint://messages/blocked",
+        name="Blocked Messages",
+        mimeType="application/json",
+        description="Emails blocked by Proofpoint"
+    ),
+    Resource(
+        uri="proofpoint://messages/delivered",
+        name="Delivered Messages",
+        mimeType="application/json",
+        description="Potentially malicious emails that were delivered"
+    ),
+    Resource(
+        uri="proofpoint://people/top-clickers",
+        name="Top Clickers",
+        mimeType="application/json",
+        description="Users who click on malicious URLs most frequently"
+    ),
+    Resource(
+        uri="proofpoint://people/vap",
+        name="Very Attacked People",
+        mimeType="application/json",
+        description="Users targeted most frequently by attackers"
+    ),
+)
+
+
 @app.list_resources()
 async def list_resources() -> list[Resource]:
     """List available Proofpoint resources"""
-    return [
-        Resource(
-            uri="proofpoint://siem/events",
-            name="SIEM Events",
-            mimeType="application/json",
-            description="Security events from Proofpoint TAP"
-        ),
-        Resource(
-            uri="proofpoint://messages/blocked",
-            name="Blocked Messages",
-            mimeType="application/json",
-            description="Emails blocked by Proofpoint"
-        ),
-        Resource(
-            uri="proofpoint://messages/delivered",
-            name="Delivered Messages",
-            mimeType="application/json",
-            description="Potentially malicious emails that were delivered"
-        ),
-        Resource(
-            uri="proofpoint://people/top-clickers",
-            name="Top Clickers",
-            mimeType="application/json",
-            description="Users who click on malicious URLs most frequently"
-        ),
-        Resource(
-            uri="proofpoint://people/vap",
-            name="Very Attacked People",
-            mimeType="application/json",
-            description="Users targeted most frequently by attackers"
-        ),
-    ]
-
-
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available Proofpoint tools"""
-    return [
-        Tool(
-            name="get_siem_events",
-            description="Get all SIEM events from Proofpoint TAP",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "interval": {
-                        "type": "string",
-                        "description": "ISO 8601 duration (e.g., PT1H for 1 hour, PT24H for 24 hours)",
-                        "default": "PT1H"
-                    },
-                    "threat_type": {
-                        "type": "string",
-                        "enum": ["url", "attachment", "messageText"],
-                        "description": "Filter by threat type"
-                    },
-                    "threat_status": {
-                        "type": "string",
-                        "enum": ["active", "cleared", "falsePositive"],
-                        "description": "Filter by threat status"
-                    }
-                }
+    return list(RESOURCES)
+
+
+TOOLS = (
+    Tool(
+        name="get_siem_events",
+        description="Get all SIEM events from Proofpoint TAP",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "interval": {
+                    "type": "string",
+                    "description": "ISO 8601 duration (e.g., PT1H for 1 hour, PT24H for 24 hours)",
+                    "default": "PT1H"
+                },
+                "threat_type": {
+                    "type": "string",
+                    "enum": sorted(THREAT_TYPES),
+                    "description": "Filter by threat type"
+                },
+                "threat_status": {
+                    "type": "string",
+                    "enum": sorted(THREAT_STATUSES),
+                    "description": "Filter by threat status"
+                },
+                "fields": EVENT_FIELDS_PROPERTY,
+                "limit": EVENT_LIMIT_PROPERTY
             }
-        ),
-        Tool(
-            name="get_clicks_blocked",
-            description="Get blocked clicks on malicious URLs",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "interval": {
-                        "type": "string",
-                        "description": "ISO 8601 duration",
-                        "default": "PT1H"
-                    }
-                }
+        }
+    ),
+    Tool(
+        name="get_clicks_blocked",
+        description="Get blocked clicks on malicious URLs",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "interval": {
+                    "type": "string",
+                    "description": "ISO 8601 duration",
+                    "default": "PT1H"
+                },
+                "fields": EVENT_FIELDS_PROPERTY,
+                "limit": EVENT_LIMIT_PROPERTY
             }
-        ),
-        Tool(
-            name="get_messages_blocked",
-            description="Get emails blocked by Proofpoint",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "interval": {
-                        "type": "string",
-                        "description": "ISO 8601 duration",
-                        "default": "PT1H"
-                    }
-                }
+        }
+    ),
+    Tool(
+        name="get_messages_blocked",
+        description="Get emails blocked by Proofpoint",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "interval": {
+                    "type": "string",
+                    "description": "ISO 8601 duration",
+                    "default": "PT1H"
+                },
+                "fields": EVENT_FIELDS_PROPERTY,
+                "limit": EVENT_LIMIT_PROPERTY
             }
-        ),
-        Tool(
-            name="get_messages_delivered",
-            description="Get potentially malicious emails that were delivered",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "interval": {
-                        "type": "string",
-                        "description": "ISO 8601 duration",
-                        "default": "PT1H"
-                    },
-                    "threat_status": {
-                        "type": "string",
-                        "enum": ["active", "cleared", "falsePositive"],
-                        "description": "Filter by threat status"
-                    }
-                }
+        }
+    ),
+    Tool(
+        name="get_messages_delivered",
+        description="Get potentially malicious emails that were delivered",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "interval": {
+                    "type": "string",
+                    "description": "ISO 8601 duration",
+                    "default": "PT1H"
+                },
+                "threat_status": {
+                    "type": "string",
+                    "enum": sorted(THREAT_STATUSES),
+                    "description": "Filter by threat status"
+                },
+                "fields": EVENT_FIELDS_PROPERTY,
+                "limit": EVENT_LIMIT_PROPERTY
             }
-        ),
-        Tool(
-            name="get_top_clickers",
-            description="Get users who click on malicious URLs most frequently",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "window": {
-                        "type": "integer",
-                        "description": "Number of days to look back (default: 30)",
-                        "default": 30
-                    }
+        }
+    ),
+    Tool(
+        name="get_top_clickers",
+        description="Get users who click on malicious URLs most frequently",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "window": {
+                    "type": "integer",
+                    "description": "Number of days to look back (default: 30)",
+                    "default": 30
                 }
             }
-        ),
-        Tool(
-            name="get_vap_report",
-            description="Get Very Attacked People (most targeted users)",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "window": {
-                        "type": "integer",
-                        "description": "Number of days to look back (default: 30)",
-                        "default": 30
-                    }
+        }
+    ),
+    Tool(
+        name="get_vap_report",
+        description="Get Very Attacked People (most targeted users)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "window": {
+                    "type": "integer",
+                    "description": "Number of days to look back (default: 30)",
+                    "default": 30
                 }
             }
-        ),
-        Tool(
-            name="decode_url",
-            description="Decode a Proofpoint rewritten URL",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "encoded_url": {
-                        "type": "string",
-                        "description": "Proofpoint encoded URL to decode"
-                    }
-                },
-                "required": ["encoded_url"]
-            }
-        ),
-        Tool(
-            name="get_campaign_info",
-            description="Get information about a specific threat campaign",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "campaign_id": {
-                        "type": "string",
-                        "description": "Campaign ID"
-                    }
-                },
-                "required": ["campaign_id"]
-            }
-        ),
-    ]
+        }
+    ),
+    Tool(
+        name="decode_url",
+        description="Decode a Proofpoint rewritten URL",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "encoded_url": {
+                    "type": "string",
+                    "description": "Proofpoint encoded URL to decode"
+                }
+            },
+            "required": ["encoded_url"]
+        }
+    ),
+    Tool(
+        name="get_campaign_info",
+        description="Get information about a specific threat campaign",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "campaign_id": {
+                    "type": "string",
+                    "description": "Campaign ID"
+                }
+            },
+            "required": ["campaign_id"]
+        }
+    ),
+)
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available Proofpoint tools"""
+    return list(TOOLS)
+
+
+TOOL_HANDLERS = {
+    "get_siem_events": (proofpoint.get_siem_events, ("interval", "threat_type", "threat_status", "fields", "limit")),
+    "get_clicks_blocked": (proofpoint.get_clicks_blocked, ("interval", "fields", "limit")),
+    "get_messages_blocked": (proofpoint.get_messages_blocked, ("interval", "fields", "limit")),
+    "get_messages_delivered": (proofpoint.get_messages_delivered, ("interval", "threat_status", "fields", "limit")),
+    "get_top_clickers": (proofpoint.get_top_clickers, ("window",)),
+    "get_vap_report": (proofpoint.get_vap_report, ("window",)),
+    "decode_url": (proofpoint.decode_url, ("encoded_url",)),
+    "get_campaign_info": (proofpoint.get_campaign_info, ("campaign_id",)),
+}
+
+# Arguments limited to a fixed set of values, checked before dispatch
+ARGUMENT_CHOICES = {
+    "threat_type": THREAT_TYPES,
+    "threat_status": THREAT_STATUSES,
+}
+
+
+def _invalid_argument(keys: tuple, arguments: dict) -> Optional[str]:
+    """Return an error message for the first argument outside its ARGUMENT_CHOICES, if any"""
+    for key in keys:
+        value = arguments.get(key)
+        # Empty values mean no filter, as in the client methods
+        if value and key in ARGUMENT_CHOICES and not (isinstance(value, str) and value in ARGUMENT_CHOICES[key]):
+            return f"Invalid {key}: {value!r}; expected one of {', '.join(sorted(ARGUMENT_CHOICES[key]))}"
+    return None
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     """Handle tool calls"""
     try:
-        if name == "get_siem_events":
-            result = await proofpoint.get_siem_events(
-                interval=arguments.get("interval", "PT1H"),
-                threat_type=arguments.get("threat_type"),
-                threat_status=arguments.get("threat_status")
-            )
-        elif name == "get_clicks_blocked":
-            result = await proofpoint.get_clicks_blocked(
-                interval=arguments.get("interval", "PT1H")
-            )
-        elif name == "get_messages_blocked":
-            result = await proofpoint.get_messages_blocked(
-                interval=arguments.get("interval", "PT1H")
-            )
-        elif name == "get_messages_delivered":
-            result = await proofpoint.get_messages_delivered(
-                interval=arguments.get("interval", "PT1H"),
-                threat_status=arguments.get("threat_status")
-            )
-        elif name == "get_top_clickers":
-            result = await proofpoint.get_top_clickers(
-                window=arguments.get("window", 30)
-            )
-        elif name == "get_vap_report":
-            result = await proofpoint.get_vap_report(
-                window=arguments.get("window", 30)
-            )
-        elif name == "decode_url":
-            result = await proofpoint.decode_url(arguments["encoded_url"])
-        elif name == "get_campaign_info":
-            result = await proofpoint.get_campaign_info(arguments["campaign_id"])
-        else:
+        arguments = arguments or {}
+        handler, keys = TOOL_HANDLERS.get(name, (None, ()))
+        invalid = _invalid_argument(keys, arguments)
+        if handler is None:
             result = {"error": f"Unknown tool: {name}"}
+        elif invalid is not None:
+            # Rejected here, before a request is spent on Proofpoint's 400
+            result = {"error": invalid}
+        else:
+            # Omitted arguments take the method's defaults
+            result = await handler(**{key: arguments[key] for key in keys if key in arguments})
 
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=orjson.dumps(result, default=str, option=orjson.OPT_INDENT_2).decode())]
     except Exception as e:
         logger.error(f"Error calling tool {name}: {e}")
-        return [TextContent(type="text", text=json.dumps({"error": str(e)}))]
+        return [TextContent(type="text", text=orjson.dumps({"error": str(e)}).decode())]
 
 
 async def main():
     """Run the MCP server"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+    warmup = asyncio.create_task(proofpoint.init())
+    refresher = asyncio.create_task(proofpoint.refresh_credentials_forever())
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+    finally:
+        warmup.cancel()
+        refresher.cancel()
+        await proofpoint.close()
 
 
 if __name__ == "__main__":